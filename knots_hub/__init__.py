@@ -13,15 +13,29 @@ __all__ = [
     "get_cli",
     "BaseParser",
 ]
+from . import _utils
 from . import constants
 from .constants import Environ
 from .constants import OS
 from . import filesystem
 from .filesystem import HubLocalFilesystem
 from .filesystem import is_runtime_from_local_install
-from . import config
-from .config import HubConfig
-from . import installer
-from .installer import is_hub_up_to_date
-from .cli import get_cli
-from .cli import BaseParser
+
+# those are only imported on first access so lean entry points, like the
+# fast launcher, don't pay the import cost of the whole package.
+_LAZY_ATTRIBUTES = {
+    "config": ("knots_hub.config", None),
+    "HubConfig": ("knots_hub.config", "HubConfig"),
+    "installer": ("knots_hub.installer", None),
+    "is_hub_up_to_date": ("knots_hub.installer", "is_hub_up_to_date"),
+    "cli": ("knots_hub.cli", None),
+    "get_cli": ("knots_hub.cli", "get_cli"),
+    "BaseParser": ("knots_hub.cli", "BaseParser"),
+}
+
+
+__getattr__ = _utils.make_lazy_getattr(globals(), _LAZY_ATTRIBUTES)
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
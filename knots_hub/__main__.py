@@ -8,6 +8,7 @@ import knots_hub
 from knots_hub.constants import OS
 from knots_hub.constants import IS_APP_FROZEN
 from knots_hub.constants import INTERPRETER_PATH
+from knots_hub._launcher import fast_launch
 from knots_hub._logging import configure_logging
 
 LOGGER = logging.getLogger(__name__)
@@ -32,6 +33,7 @@ def main(argv: Optional[list[str]] = None, logging_configuration: bool = False):
             log_level=log_level,
             log_path=filesystem.log_path,
             disable_coloring=cli.no_coloring,
+            queue_size=config.log_queue_size,
         )
 
     exe: Path = INTERPRETER_PATH
@@ -63,4 +65,8 @@ def main(argv: Optional[list[str]] = None, logging_configuration: bool = False):
 
 
 if __name__ == "__main__":
+    # skip the full runtime when we can directly restart to the local install
+    _exitcode = fast_launch()  # pragma: no cover
+    if _exitcode is not None:  # pragma: no cover
+        sys.exit(_exitcode)
     main(logging_configuration=True)  # pragma: no cover
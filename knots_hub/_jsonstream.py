@@ -0,0 +1,223 @@
+"""
+Read and write json incrementally, without holding the whole document in memory.
+"""
+
+import json
+import re
+import typing
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+
+_WHITESPACES = re.compile(r"[ \t\n\r]*")
+_NUMBER_CHARS = "0123456789.eE+-"
+
+# number of items encoded before being written to the file
+_WRITE_BATCH_SIZE = 1024
+
+
+class JsonStreamReader:
+    """
+    Decode a json document from a text file, one value at a time.
+
+    Only the values requested are decoded, and the file is read by chunks as needed.
+
+    Args:
+        file: text file object opened for reading.
+        chunk_size: number of characters read from the file at once.
+    """
+
+    def __init__(self, file: typing.TextIO, chunk_size: int = 64 * 1024):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """
+        Read the next chunk of the file, dropping the already decoded part of the buffer.
+
+        Returns:
+            False if the end of the file was reached.
+        """
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Get the next non-whitespace character without consuming it, or an empty string at the end.
+        """
+        while True:
+            buffer = self._buffer
+            pos = _WHITESPACES.match(buffer, self._pos).end()
+            self._pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected '{char}' but found '{found}' in json stream")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """
+        Decode the next value entirely.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # the value may be incomplete in the buffer
+                if self._fill():
+                    continue
+                raise
+            # a number may continue in the next chunk, like "12." followed by "5"
+            if (
+                not self._eof
+                and not self._buffer[end:].strip(_NUMBER_CHARS)
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def iter_array(self) -> Iterator[Any]:
+        """
+        Decode the next array, one item at a time.
+        """
+        self._expect("[")
+        if self.peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            char = self.peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(
+                    f"Expected ',' or ']' but found '{char}' in json stream"
+                )
+
+    def iter_keys(self) -> Iterator[str]:
+        """
+        Decode the keys of the next object, one at a time.
+
+        The value of each key must be consumed, with any of the read methods,
+        before getting the next key.
+        """
+        self._expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError(
+                    f"Expected a string key but found '{key}' in json stream"
+                )
+            self._expect(":")
+            yield key
+            char = self.peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(
+                    f"Expected ',' or '}}' but found '{char}' in json stream"
+                )
+
+    def iter_items(self) -> Iterator[tuple[str, Any]]:
+        """
+        Decode the next object, one key and value at a time.
+        """
+        for key in self.iter_keys():
+            yield key, self.read_value()
+
+
+class StreamedList:
+    """
+    A json array whose items are only encoded when written.
+
+    Args:
+        items: json-compatible items, iterated once.
+    """
+
+    def __init__(self, items: Iterable[Any]):
+        self.items = items
+
+
+class StreamedDict:
+    """
+    A json object whose items are only encoded when written.
+
+    Args:
+        items: string keys with their json-compatible value, iterated once.
+    """
+
+    def __init__(self, items: Iterable[tuple[str, Any]]):
+        self.items = items
+
+
+def _write_batched(file: typing.TextIO, encoded: Iterator[str], indent: str):
+    separator = ",\n" + indent
+    batch = []
+    first = True
+    for item in encoded:
+        batch.append(item)
+        if len(batch) >= _WRITE_BATCH_SIZE:
+            file.write(("\n" + indent if first else separator) + separator.join(batch))
+            batch.clear()
+            first = False
+    if batch:
+        file.write(("\n" + indent if first else separator) + separator.join(batch))
+
+
+def dump(items: Iterable[tuple[str, Any]], file: typing.TextIO):
+    """
+    Write a json object to the given file, with each of its array or object values
+    encoded one item at a time.
+
+    Args:
+        items:
+            keys with their value: a json-compatible value, a :class:`StreamedList`
+            or a :class:`StreamedDict`.
+        file: text file object opened for writing.
+    """
+    encoder = json.JSONEncoder(ensure_ascii=True)
+    encode = encoder.encode
+    indent = " " * 4
+    file.write("{")
+    first = True
+    for key, value in items:
+        file.write(("\n" if first else ",\n") + indent + encode(key) + ": ")
+        first = False
+        if isinstance(value, StreamedList):
+            file.write("[")
+            _write_batched(file, (encode(item) for item in value.items), indent * 2)
+            file.write("\n" + indent + "]")
+        elif isinstance(value, StreamedDict):
+            file.write("{")
+            _write_batched(
+                file,
+                (f"{encode(k)}: {encode(v)}" for k, v in value.items),
+                indent * 2,
+            )
+            file.write("\n" + indent + "}")
+        else:
+            file.write(encode(value))
+    file.write("\n}")
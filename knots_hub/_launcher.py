@@ -0,0 +1,137 @@
+"""
+A lean entry point handing off to the local hub install as fast as possible.
+
+Only the standard library and the lightest knots_hub modules are used, so the
+server runtime doesn't pay the import cost of the full hub and its dependencies
+when the local install is already up-to-date.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+from knots_hub import serializelib
+from knots_hub.config import HubConfig
+from knots_hub.constants import Environ
+from knots_hub.filesystem import HubLocalFilesystem
+from knots_hub.filesystem import find_hub_executable
+from knots_hub.filesystem import is_runtime_from_local_install
+
+LOGGER = logging.getLogger(__name__)
+
+# commands that must be executed by the server runtime
+_SERVER_COMMANDS = ["uninstall", "mirror"]
+
+
+def _read_hubrecord_content(
+    config: HubConfig,
+    filesystem: HubLocalFilesystem,
+) -> Optional[dict]:
+    """
+    Get the json-compatible content of the hub install record, or None if it cannot be read.
+
+    We don't use HubInstallRecord to avoid importing the installer package, and
+    the statestore module, with sqlite3, is only imported if the records are
+    stored in a database.
+    """
+    hubrecord_path = filesystem.hubinstall_record_path
+    if not config.use_sqlite_state:
+        try:
+            return serializelib.loads(hubrecord_path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+    import sqlite3
+    from knots_hub.statestore import SqliteStateStore
+
+    try:
+        with SqliteStateStore(filesystem.state_database_path) as store:
+            return store.read_content(hubrecord_path)
+    except (OSError, ValueError, sqlite3.Error):
+        return None
+
+
+def get_fast_launch_executable(
+    argv: list[str],
+    config: HubConfig,
+    filesystem: HubLocalFilesystem,
+) -> Optional[Path]:
+    """
+    Get the local hub executable to directly hand off to, if the full hub runtime is not needed.
+
+    The full hub runtime is needed as soon as there is something to install or any
+    doubt about the state of the local install.
+
+    Args:
+        argv: command line arguments the hub was started with.
+        config: user-defined runtime configuration of the hub
+        filesystem: collection of paths for storing runtime data
+
+    Returns:
+        filesystem path to an existing file or None if the full hub runtime is needed.
+    """
+    if os.getenv(Environ.DISABLE_FAST_LAUNCH):
+        return None
+    if int(os.getenv(Environ.IS_RESTARTED, 0)):
+        return None
+    command = next((arg for arg in argv if not arg.startswith("-")), None)
+    if command in _SERVER_COMMANDS:
+        return None
+
+    installer = config.installer
+    if not installer:
+        return None
+    if is_runtime_from_local_install(config.local_install_path):
+        return None
+
+    hubrecord = _read_hubrecord_content(config, filesystem)
+    try:
+        installed_version = hubrecord["installed_version"]
+        installed_path = Path(hubrecord["installed_path"])
+    except (KeyError, TypeError):
+        return None
+
+    if installed_version != installer.version:
+        return None
+
+    if not installed_path.is_dir():
+        return None
+
+    return find_hub_executable(installed_path)
+
+
+def fast_launch(argv: Optional[list[str]] = None) -> Optional[int]:
+    """
+    Hand off to the local hub executable if the local install is up-to-date.
+
+    Args:
+        argv: command line arguments. from sys.argv if not provided
+
+    Returns:
+        the exit code of the local hub or None if the full hub runtime must be started.
+    """
+    argv: list[str] = sys.argv[1:] if argv is None else argv.copy()
+
+    try:
+        config = HubConfig.from_environment()
+    except Exception:
+        # the full runtime will report the issue
+        return None
+
+    filesystem = HubLocalFilesystem()
+    exe_path = get_fast_launch_executable(argv, config, filesystem)
+    if not exe_path:
+        return None
+
+    environ = os.environ.copy()
+    environ[Environ.IS_RESTARTED] = "1"
+    # this is an undocumented env var only used for internal testing
+    asshell: bool = bool(os.getenv("KNOTS_HUB_RESTART_AS_SHELL", False))
+
+    command = [str(exe_path)] + argv
+    LOGGER.debug(f"subprocess.run({command})")
+    result = subprocess.run(command, shell=asshell, env=environ)
+    return result.returncode
@@ -1,8 +1,13 @@
+import contextlib
+import contextvars
 import enum
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
 from pathlib import Path
+from typing import Optional
 from typing import Union
 
 
@@ -36,6 +41,21 @@ class Colors(enum.Enum):
 
 
 class ColoredFormatter(logging.Formatter):
+    """
+    Format log records with a format string that can use the :class:`Colors` names as fields.
+
+    A ``level_color`` field is also available, with the color of the record level.
+
+    The color fields are substituted in the format string once, at creation,
+    so there is a ready-to-use template for each level and formatting a record
+    costs the same as with a regular :class:`logging.Formatter`.
+
+    Args:
+        disable_coloring: True to substitute all the color fields with an empty string.
+        fmt: format string, see :class:`logging.Formatter`.
+        datefmt: date format string, see :class:`logging.Formatter`.
+        style: format string style, see :class:`logging.Formatter`.
+    """
 
     COLOR_BY_LEVEL = {
         logging.DEBUG: Colors.white_faint,
@@ -45,26 +65,106 @@ class ColoredFormatter(logging.Formatter):
         logging.CRITICAL: Colors.red_bold,
     }
 
-    def __init__(self, disable_coloring: bool = False, *args, **kwargs):
-        super().__init__(*args, **kwargs)
+    # how a field is written in the format string of each style
+    _FIELD_BY_STYLE = {
+        "%": "%({})s",
+        "{": "{{{}}}",
+        "$": "${{{}}}",
+    }
+
+    def __init__(
+        self,
+        disable_coloring: bool = False,
+        fmt: Optional[str] = None,
+        datefmt: Optional[str] = None,
+        style: str = "%",
+        *args,
+        **kwargs,
+    ):
+        super().__init__(fmt, datefmt, style, *args, **kwargs)
         self._disable_coloring = disable_coloring
+        self._reset = "" if disable_coloring else Colors.reset.value
+        fmt = self._style._fmt
 
-    def format(self, record):
+        # level: formatter with the colors already substituted
+        self._formatters: dict[Optional[int], logging.Formatter] = {}
+        for level in [None] + list(self.COLOR_BY_LEVEL):
+            template = self._compile(fmt, style, level)
+            self._formatters[level] = logging.Formatter(
+                template, datefmt, style, *args, **kwargs
+            )
+
+    def _compile(self, fmt: str, style: str, level: Optional[int]) -> str:
+        """
+        Substitute the color fields in the given format string for the given level.
+        """
         on = not self._disable_coloring
-        level_color = self.COLOR_BY_LEVEL.get(record.levelno, None)
-        if level_color:
-            record.level_color = level_color.value if on else ""
-        for color in Colors:
-            setattr(record, color.name, color.value if on else "")
-
-        message = super().format(record)
-        if not message.endswith(Colors.reset.value) and on:
-            message += Colors.reset.value
+        field = self._FIELD_BY_STYLE[style]
+        level_color = self.COLOR_BY_LEVEL.get(level)
+
+        colors = {color.name: color.value if on else "" for color in Colors}
+        colors["level_color"] = level_color.value if on and level_color else ""
+        # longest first so a name is never replaced inside a longer one
+        for name in sorted(colors, key=len, reverse=True):
+            value = colors[name]
+            if style == "%":
+                value = value.replace("%", "%%")
+            elif style == "{":
+                value = value.replace("{", "{{").replace("}", "}}")
+            elif style == "$":
+                value = value.replace("$", "$$")
+            fmt = fmt.replace(field.format(name), value)
+            if style == "$":
+                fmt = fmt.replace(f"${name}", value)
+        return fmt
+
+    def format(self, record):
+        formatter = self._formatters.get(record.levelno) or self._formatters[None]
+        message = formatter.format(record)
+        # also after any exception traceback
+        if self._reset and not message.endswith(self._reset):
+            message += self._reset
         return message
 
 
 _DISK_HANDLER_ATTR = "knots_disk_handler"
 
+_LOG_CONTEXT: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "knots_hub_log_context",
+    default="",
+)
+
+
+@contextlib.contextmanager
+def log_context(prefix: str):
+    """
+    Prefix all the messages logged by the current thread with the given string.
+
+    Useful to tell apart the messages of tasks running concurrently.
+
+    Args:
+        prefix: arbitrary string like the name of the task.
+    """
+    token = _LOG_CONTEXT.set(prefix)
+    try:
+        yield
+    finally:
+        _LOG_CONTEXT.reset(token)
+
+
+class LogContextFilter(logging.Filter):
+    """
+    Prefix log records with the context set by :func:`log_context`.
+    """
+
+    def filter(self, record):
+        prefix = _LOG_CONTEXT.get()
+        # a record is shared between handlers, so only prefix it once
+        if prefix and not getattr(record, "log_context", None):
+            record.log_context = prefix
+            record.msg = f"[{prefix}] {record.msg}"
+        return True
+
 
 class RotatingFileHandler(logging.handlers.RotatingFileHandler):
     """
@@ -88,11 +188,116 @@ class RotatingFileHandler(logging.handlers.RotatingFileHandler):
         return super().shouldRollover(record)
 
 
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Send log records to a bounded queue, to be handled by a :class:`QueueListener` thread.
+
+    When the queue is full, records below ``WARNING`` are dropped while the others
+    wait for room, so errors are never lost. The number of dropped records is
+    logged once there is room again.
+
+    Flushing waits until all the queued records are handled, and closing also
+    stops the listener, so :func:`logging.shutdown` doesn't lose any record.
+
+    Args:
+        queue_: a queue with a maximum size.
+        listener: listener handling the records of the queue, started with :meth:`start`.
+    """
+
+    def __init__(self, queue_: queue.Queue, listener: logging.handlers.QueueListener):
+        super().__init__(queue_)
+        self.listener = listener
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """
+        Start the listener thread handling the queued records.
+        """
+        self.listener.start()
+        self._started = True
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.dropped:
+            self._enqueue_dropped()
+
+        if record.levelno >= logging.WARNING:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _enqueue_dropped(self):
+        with self._dropped_lock:
+            dropped = self.dropped
+            if not dropped:
+                return
+            record = logging.makeLogRecord(
+                {
+                    "name": __name__,
+                    "levelno": logging.WARNING,
+                    "levelname": logging.getLevelName(logging.WARNING),
+                    "msg": f"dropped {dropped} log records; the log queue was full",
+                }
+            )
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                return
+            self.dropped = 0
+
+    def flush(self):
+        """
+        Wait until all the queued records are handled.
+        """
+        if not self._started:
+            return
+        if self.dropped:
+            self._enqueue_dropped()
+        self.queue.join()
+        for handler in self.listener.handlers:
+            handler.flush()
+
+    def close(self):
+        self.flush()
+        if self._started:
+            self.listener.stop()
+            self._started = False
+        super().close()
+
+
+def flush_logging():
+    """
+    Wait until all the log records are written, like before handing off to another process.
+
+    Only needed if logging was configured with a queue, see :func:`configure_logging`.
+    """
+    for handler in logging.root.handlers:
+        handler.flush()
+
+
 def configure_logging(
     log_level: Union[int, str],
     log_path: Path,
     disable_coloring: bool = False,
+    queue_size: int = 0,
 ):
+    """
+    Configure the root logger to log to the terminal and to the given file.
+
+    Args:
+        log_level: minimal level of the records logged to the terminal.
+        log_path: filesystem path to a file that may not exist, to log all the records to.
+        disable_coloring: True to not color the records logged to the terminal.
+        queue_size:
+            if above 0, records are handled by a background thread from a queue
+            of that size, instead of in the thread logging them.
+            See :class:`BoundedQueueHandler` for what happens when it is full.
+    """
 
     disk_formatter = logging.Formatter(
         "{levelname: <7} | {asctime} [{name}] {message}",
@@ -106,22 +311,40 @@ def configure_logging(
 
     # XXX: this will affect other libraries logging
     logging.root.setLevel(logging.DEBUG)
+    context_filter = LogContextFilter()
 
-    handler = logging.StreamHandler(stream=sys.stdout)
-    handler.setLevel(log_level)
-    handler.setFormatter(stream_formatter)
-    logging.root.addHandler(handler)
+    stream_handler = logging.StreamHandler(stream=sys.stdout)
+    stream_handler.setLevel(log_level)
+    stream_handler.setFormatter(stream_formatter)
 
-    handler = RotatingFileHandler(
+    disk_handler = RotatingFileHandler(
         log_path,
         maxBytes=65536,
         # need at least one backup to rotate
         backupCount=1,
         encoding="utf-8",
     )
-    setattr(handler, _DISK_HANDLER_ATTR, True)
-    handler.setLevel(logging.DEBUG)
-    handler.setFormatter(disk_formatter)
+    setattr(disk_handler, _DISK_HANDLER_ATTR, True)
+    disk_handler.setLevel(logging.DEBUG)
+    disk_handler.setFormatter(disk_formatter)
+
+    if queue_size <= 0:
+        for handler in (stream_handler, disk_handler):
+            handler.addFilter(context_filter)
+            logging.root.addHandler(handler)
+        return
+
+    listener = logging.handlers.QueueListener(
+        queue.Queue(maxsize=queue_size),
+        stream_handler,
+        disk_handler,
+        respect_handler_level=True,
+    )
+    # created after the listener handlers so logging.shutdown() close it first
+    handler = BoundedQueueHandler(listener.queue, listener)
+    handler.start()
+    # the context is only known in the thread logging the record
+    handler.addFilter(context_filter)
     logging.root.addHandler(handler)
 
 
@@ -132,3 +355,10 @@ def shutdown_disk_logging():
     for handler in logging.root.handlers:
         if hasattr(handler, _DISK_HANDLER_ATTR):
             logging.root.removeHandler(handler)
+        elif isinstance(handler, BoundedQueueHandler):
+            handler.flush()
+            handler.listener.handlers = tuple(
+                listener_handler
+                for listener_handler in handler.listener.handlers
+                if not hasattr(listener_handler, _DISK_HANDLER_ATTR)
+            )
@@ -1,41 +1,126 @@
-import contextlib
-import os.path
+import hashlib
+import importlib
+import os
+import re
 import subprocess
 import textwrap
 from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import Iterable
+from typing import Mapping
+from typing import Optional
 
+# text between single quotes, kept literal
+# or an escaped "$$", or a "$VAR", or a "${VAR}"
+# or an escaped "%%", or a "%VAR%"
+_ENVVAR_PATTERN = re.compile(r"'[^']*'?|\$\$|\$([\w-]+)|\$\{([^}]*)\}|%%|%([^%]+)%")
+# same but never matching across the null characters joining multiple strings
+_ENVVAR_BATCH_PATTERN = re.compile(
+    r"'[^'\0]*'?|\$\$|\$([\w-]+)|\$\{([^}\0]*)\}|%%|%([^%\0]+)%"
+)
 
-def expand_envvars(src_str: str) -> str:
+
+def _has_envvars(src_str: str) -> bool:
+    return "$" in src_str or "%" in src_str
+
+
+def _make_envvar_replacer(
+    environ: Optional[Mapping[str, str]],
+) -> Callable[[re.Match], str]:
+    """
+    Get the function replacing an ``_ENVVAR_PATTERN`` match with its value.
+
+    Variables are only looked up once in ``environ``, which must not be modified
+    while the function is used.
+    """
+    environ = os.environ if environ is None else environ
+    # variable name: replacement
+    table: dict[str, Optional[str]] = {}
+
+    def _replace(match: re.Match) -> str:
+        if match.lastindex is None:
+            text = match.group(0)
+            # quoted text is kept as is, escapes are reduced to a single character
+            return text if text[0] == "'" else text[0]
+        name = match.group(match.lastindex)
+        try:
+            value = table[name]
+        except KeyError:
+            value = environ.get(name)
+            # environment variables are case-insensitive on Windows
+            if value is None and os.name == "nt":
+                value = environ.get(name.upper())
+            table[name] = value
+        return match.group(0) if value is None else value
+
+    return _replace
+
+
+def expand_envvars(src_str: str, environ: Optional[Mapping[str, str]] = None) -> str:
     """
     Resolve environment variable pattern in the given string.
 
-    Using ``os.path.expandvars`` but allow escaping using ``$$``
+    Support the same patterns as ``ntpath.expandvars``: ``$VAR``, ``${VAR}``
+    and ``%VAR%``, which can be escaped using ``$$`` and ``%%``. Text between
+    single quotes is left unchanged, as well as variables not defined.
+
+    Args:
+        src_str: string that may contain environment variables.
+        environ:
+            mapping of variable name: value to resolve the variables with.
+            ``os.environ`` is used if not provided, but it is never modified.
+    """
+    if not _has_envvars(src_str):
+        return src_str
+
+    return _ENVVAR_PATTERN.sub(_make_envvar_replacer(environ), src_str)
+
+
+def expand_envvars_many(
+    src_strs: Iterable[str],
+    environ: Optional[Mapping[str, str]] = None,
+) -> list[str]:
+    """
+    Resolve environment variable pattern in all the given strings.
+
+    Same as calling :func:`expand_envvars` on each string, but strings without
+    a ``$`` or ``%`` are left untouched and all the others are resolved in a single pass.
+
+    Args:
+        src_strs: strings that may contain environment variables; must not contain null characters.
+        environ:
+            mapping of variable name: value to resolve the variables with.
+            ``os.environ`` is used if not provided, but it is never modified.
+
+    Returns:
+        the resolved strings, in the same order.
     """
-    # temporary remove escape character
-    new_str = src_str.replace("$$", "##tmp##")
-    # environment variable expansion
-    new_str = os.path.expandvars(new_str)
-    # restore escaped character
-    new_str = new_str.replace("##tmp##", "$")
-    return new_str
+    expanded = list(src_strs)
+    indexes = [index for index, src_str in enumerate(expanded) if _has_envvars(src_str)]
+    if not indexes:
+        return expanded
 
+    joined = "\0".join([expanded[index] for index in indexes])
+    joined = _ENVVAR_BATCH_PATTERN.sub(_make_envvar_replacer(environ), joined)
+    for index, src_str in zip(indexes, joined.split("\0")):
+        expanded[index] = src_str
+    return expanded
 
-@contextlib.contextmanager
-def backup_environ(clear=True):
+
+def get_file_hash(path: Path, chunk_size: int = 1024 * 1024) -> str:
     """
-    Context to back up the environ and restore it on exit.
+    Get the sha256 hash of the given file content.
 
     Args:
-        clear: If true clear the environ before entering the context.
+        path: filesystem path to an existing file.
+        chunk_size: number of bytes to read at once.
     """
-    backup = os.environ.copy()
-    if clear:
-        os.environ.clear()
-    try:
-        yield
-    finally:
-        os.environ.clear()
-        os.environ.update(backup)
+    hasher = hashlib.sha256()
+    with path.open("rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 def format_subprocess_result(result: subprocess.CompletedProcess) -> str:
@@ -65,3 +150,31 @@ def format_subprocess_result(result: subprocess.CompletedProcess) -> str:
     message += f"======[stderr]======:\n{stderr}"
     message += f"====== end ======"
     return message
+
+
+def make_lazy_getattr(
+    module_globals: dict[str, Any],
+    lazy_attributes: dict[str, tuple[str, Optional[str]]],
+) -> Callable[[str], Any]:
+    """
+    Create a module ``__getattr__`` function that import attributes on first access.
+
+    Args:
+        module_globals: ``globals()`` of the module the function is for.
+        lazy_attributes:
+            mapping of attribute name: (full name of the module to import,
+            optional name of the attribute to retrieve from that module).
+    """
+
+    def __getattr__(name: str):
+        if name not in lazy_attributes:
+            raise AttributeError(
+                f"module '{module_globals['__name__']}' has no attribute '{name}'"
+            )
+        module_name, attribute_name = lazy_attributes[name]
+        module = importlib.import_module(module_name)
+        value = getattr(module, attribute_name) if attribute_name else module
+        module_globals[name] = value
+        return value
+
+    return __getattr__
@@ -5,26 +5,34 @@ import logging
 import os
 import subprocess
 import sys
-import webbrowser
+import threading
+from pathlib import Path
+from typing import Optional
 from typing import Type
 
-import kloch
-from pythonning.benchmark import timeit
-
 import knots_hub
 import knots_hub.installer
+from knots_hub._logging import flush_logging
 from knots_hub.constants import Environ
 from knots_hub import HubConfig
 from knots_hub import HubLocalFilesystem
+from knots_hub.filesystem import FileLock
+from knots_hub.filesystem import LockTimeoutError
 from knots_hub.filesystem import is_runtime_from_local_install
 from knots_hub.installer import HubInstallRecord
 from knots_hub.installer import VendorInstallRecord
+from knots_hub.installer import clean_hub_install_root
+from knots_hub.installer import get_hub_install_root
 from knots_hub.installer import get_hub_local_executable
-from knots_hub.installer import read_vendor_installer_from_file
-from knots_hub.installer import uninstall_vendor
+from knots_hub.statestore import FileStateStore
+from knots_hub.statestore import SqliteStateStore
+from knots_hub.statestore import StateStore
+from knots_hub.statestore import get_state_store
 from knots_hub.uninstaller import get_paths_to_uninstall
+from knots_hub.uninstaller import measure_plan
+from knots_hub.uninstaller import plan_uninstall
+from knots_hub.uninstaller import uninstall
 from knots_hub.uninstaller import uninstall_hub_only
-from knots_hub.uninstaller import uninstall_paths
 
 LOGGER = logging.getLogger(__name__)
 
@@ -52,6 +60,7 @@ class BaseParser:
         self._filesystem = filesystem
         self._config = config
         self._extra_args = extra_args
+        self._state_store: Optional[StateStore] = None
 
     @property
     def debug(self) -> bool:
@@ -103,38 +112,13 @@ class BaseParser:
 
         if not is_runtime_local:
 
-            # an empty installer path imply the hub is never installed/updated locally
-            need_install = False
-            installer = self._config.installer
-
-            if installer and not self._filesystem.is_hub_installed:
-                need_install = True
-            elif (
-                installer and self._filesystem.is_hub_installed and not is_runtime_local
-            ):
-                hubrecord_path = self._filesystem.hubinstall_record_path
-                hubrecord_file = HubInstallRecord.read_from_disk(hubrecord_path)
-                if installer.version != hubrecord_file.installed_version:
-                    need_install = True
-                    LOGGER.debug("uninstalling existing hub for upcoming update")
-                    uninstall_hub_only(hubrecord_file)
-
-            if need_install:
-                src_path = installer.path
-                dst_path = local_install_path
-                LOGGER.info(f"installing hub '{src_path}' to '{dst_path}'")
-                with timeit("installing took ", LOGGER.info):
-                    exe_path = knots_hub.installer.install_hub(
-                        install_src_path=src_path,
-                        install_dst_path=dst_path,
-                        installed_version=installer.version,
-                        hubrecord_path=self._filesystem.hubinstall_record_path,
-                    )
-                # we restart to local hub we just installed
-                return sys.exit(self._restart_hub(exe=str(exe_path)))
+            # the lock is released before restarting, as the restarted hub use it too
+            with self._get_install_lock():
+                self._migrate_install_records()
+                exe_path = self._install_hub()
 
-            exe_path = get_hub_local_executable(self._filesystem)
             if exe_path:
+                # we restart to local hub
                 return sys.exit(self._restart_hub(exe=str(exe_path)))
 
         elif is_runtime_local and not restarted and not self._config.skip_local_check:
@@ -147,19 +131,118 @@ class BaseParser:
         # > reaching here mean the runtime is local
 
         # install or update vendor programs
+        # another hub process may be installing, in which case we wait for it,
+        # and then only install what it didn't.
+        with self._get_install_lock():
+            self._migrate_install_records()
+            self._install_vendors()
+
+        store = self._get_state_store()
+        if is_runtime_local and store.exists(self._filesystem.hubinstall_record_path):
+            self._start_hub_install_cleaning()
+        self._start_trash_purge()
 
+    @classmethod
+    def add_to_parser(cls, parser: argparse.ArgumentParser):
+        """
+        Configure the given argparse ArgumentParser.
+        """
+        parser.add_argument(
+            "--debug",
+            action="store_true",
+            help=cls.debug.__doc__,
+        )
+        parser.add_argument(
+            "--no-coloring",
+            action="store_true",
+            help=cls.no_coloring.__doc__,
+        )
+        parser.add_argument(
+            "--log-environ",
+            action="store_true",
+            help=cls.log_environ.__doc__,
+        )
+        parser.set_defaults(func=cls)
+
+    def _install_hub(self) -> Optional[Path]:
+        """
+        Install or update the hub locally if needed.
+
+        Returns:
+            filesystem path to the local hub executable to restart to, or None.
+        """
+        local_install_path = self._config.local_install_path
+
+        # an empty installer path imply the hub is never installed/updated locally
+        need_install = False
+        installer = self._config.installer
+        store = self._get_state_store()
+        hubrecord_path = self._filesystem.hubinstall_record_path
+        is_hub_installed = store.exists(hubrecord_path)
+
+        # checked once the install lock is acquired, so we don't install again
+        # what another hub process just installed.
+        if installer and not is_hub_installed:
+            need_install = True
+        elif installer and is_hub_installed:
+            hubrecord_file = store.read(HubInstallRecord, hubrecord_path)
+            if installer.version != hubrecord_file.installed_version:
+                need_install = True
+                # the update reuse the unchanged files of the existing install
+                install_root = get_hub_install_root(hubrecord_file.installed_path)
+                if install_root != local_install_path:
+                    LOGGER.debug("uninstalling existing hub for upcoming update")
+                    uninstall_hub_only(
+                        hubrecord_file,
+                        trash=self._filesystem.get_trash(),
+                    )
+
+        if need_install:
+            from pythonning.benchmark import timeit
+
+            src_path = installer.path
+            dst_path = local_install_path
+            LOGGER.info(f"installing hub '{src_path}' to '{dst_path}'")
+            try:
+                with timeit("installing took ", LOGGER.info):
+                    exe_path = knots_hub.installer.install_hub(
+                        install_src_path=src_path,
+                        install_dst_path=dst_path,
+                        installed_version=installer.version,
+                        hubrecord_path=hubrecord_path,
+                        copy_workers=self._config.copy_workers,
+                        store=store,
+                    )
+            except Exception:
+                # the previous install stays usable until the new one is complete
+                exe_path = get_hub_local_executable(self._filesystem, store=store)
+                if not exe_path:
+                    raise
+                LOGGER.exception(
+                    f"failed to install hub; using previous install '{exe_path}'"
+                )
+        else:
+            exe_path = get_hub_local_executable(self._filesystem, store=store)
+
+        return exe_path
+
+    def _install_vendors(self):
+        """
+        Install, update or uninstall the vendor programs as configured.
+        """
         vendors2install: dict[str, knots_hub.installer.BaseVendorInstaller] = {}
         vendor_config_paths = self._config.vendor_installer_config_paths
         for vendor_path in vendor_config_paths:
             if not vendor_path.exists():
                 LOGGER.error(f"Non-existing vendor installer '{vendor_path}'")
                 continue
-            vendors = read_vendor_installer_from_file(vendor_path)
+            vendors = knots_hub.installer.read_vendor_installer_from_file(vendor_path)
             vendors2install.update({vendor.name(): vendor for vendor in vendors})
 
-        # we are sure the path exists as vendor happens after hub install/update
+        # we are sure the record exists as vendor happens after hub install/update
+        store = self._get_state_store()
         hubrecord_path = self._filesystem.hubinstall_record_path
-        hubrecord_file = HubInstallRecord.read_from_disk(hubrecord_path)
+        hubrecord_file = store.read(HubInstallRecord, hubrecord_path)
         vendor_installed_paths = hubrecord_file.vendors_record_paths
         if vendor_installed_paths:
             # vendor that were installed previously but that we don't install anymore
@@ -170,71 +253,202 @@ class BaseParser:
             vendor_installed_paths = {}
             vendors2uninstall = set()
 
-        for vendor2uninstall in vendors2uninstall:
-            vendor_record_path = vendor_installed_paths[vendor2uninstall]
-            if vendor_record_path.exists():
-                vendor_record = VendorInstallRecord.read_from_disk(vendor_record_path)
-                LOGGER.info(f"uninstalling vendor '{vendor_record.name}'")
-                uninstall_vendor(vendor_record)
-            else:
-                # somehow the record path was already deleted externally
-                continue
+        if not vendors2install and not vendors2uninstall:
+            return
 
-        if vendors2install:
-            LOGGER.debug(f"got {len(vendors2install)} vendor to check for install.")
+        vendor_workers = self._config.vendor_workers
+        # the hub record is only written from here, once all vendors are processed
+        vendors_record_paths = {}
 
-            vendors_record_paths = {}
+        # a record missing means it was somehow already deleted externally
+        records2uninstall = store.read_many(
+            VendorInstallRecord,
+            [vendor_installed_paths[name] for name in vendors2uninstall],
+        )
+        for vendor_record in records2uninstall.values():
+            LOGGER.info(f"uninstalling vendor '{vendor_record.name}'")
 
-            for vendor_name, vendor in vendors2install.items():
+        results = knots_hub.installer.uninstall_vendors(
+            list(records2uninstall.values()),
+            max_workers=vendor_workers,
+            trash=self._filesystem.get_trash(),
+        )
+        uninstalled_record_paths = []
+        for vendor_name, result in results.items():
+            if result.error:
+                # keep track of it so the uninstall is tried again on next launch
+                vendors_record_paths[vendor_name] = vendor_installed_paths[vendor_name]
+            else:
+                uninstalled_record_paths.append(vendor_installed_paths[vendor_name])
+
+        LOGGER.debug(f"got {len(vendors2install)} vendor to check for install.")
+        vendors2record_path = {}
+        for vendor_name, vendor in vendors2install.items():
+            vendor_record_path = vendor_installed_paths.get(vendor_name)
+            vendors2record_path[vendor_name] = (
+                vendor_record_path or vendor.install_record_path
+            )
 
-                vendor_record_path = vendor_installed_paths.get(vendor_name)
-                if not vendor_record_path:
-                    vendor_record_path = vendor.install_record_path
+        results = knots_hub.installer.install_vendors(
+            [
+                (vendor, vendors2record_path[name])
+                for name, vendor in vendors2install.items()
+            ],
+            downloader=self._get_downloader() if vendors2install else None,
+            max_workers=vendor_workers,
+            store=store,
+            trash=self._filesystem.get_trash(),
+        )
+        errors = []
+        for vendor_name, result in results.items():
+            vendor_record_path = vendors2record_path[vendor_name]
+            if result.error:
+                LOGGER.warning(
+                    f"failed to install vendor '{vendor_name}'; "
+                    f"you may need to uninstall knots-hub and restart it to trigger a fresh install."
+                )
+                errors.append(result.error)
+                # still track a previous install, so its files can be uninstalled later
+                if not store.exists(vendor_record_path):
+                    continue
+            elif result.changed:
+                LOGGER.info(f"installed vendor '{vendor_name}'")
+            vendors_record_paths[vendor_name] = vendor_record_path
+
+        LOGGER.debug(f"updating hub records '{hubrecord_path}' with installed vendors")
+        with store.transaction():
+            for vendor_record_path in uninstalled_record_paths:
+                store.delete(vendor_record_path)
+            for vendor_name in vendors2uninstall:
+                if vendor_name not in vendors_record_paths:
+                    store.add_history(vendor_name, "uninstall")
+            store.update(
+                HubInstallRecord(vendors_record_paths=vendors_record_paths),
+                hubrecord_path,
+            )
+        if errors:
+            raise errors[0]
 
-                try:
-                    installed = knots_hub.installer.install_vendor(
-                        vendor=vendor,
-                        record_path=vendor_record_path,
-                    )
-                except:
-                    LOGGER.warning(
-                        f"failed to install vendor '{vendor_name}'; "
-                        f"you may need to uninstall knots-hub and restart it to trigger a fresh install."
-                    )
-                    raise
+    def _get_state_store(self) -> StateStore:
+        """
+        Get the store persisting the install records, as configured.
+        """
+        if self._state_store is None:
+            database_path = None
+            if self._config.use_sqlite_state:
+                database_path = self._filesystem.state_database_path
+            self._state_store = get_state_store(
+                database_path,
+                format_name=self._config.record_format,
+            )
+        return self._state_store
 
-                if installed:
-                    LOGGER.info(f"installed vendor '{vendor_name}'")
-                vendors_record_paths[vendor_name] = vendor_record_path
+    def _migrate_install_records(self):
+        """
+        Move the install records stored by a previous configuration to the configured store.
 
-            LOGGER.debug(
-                f"updating hub records '{hubrecord_path}' with installed vendors"
-            )
-            HubInstallRecord(vendors_record_paths=vendors_record_paths).update_disk(
-                hubrecord_path
+        Must be called while holding the install lock.
+        """
+        database_path = self._filesystem.state_database_path
+        if self._config.use_sqlite_state:
+            source = FileStateStore()
+        elif database_path.exists():
+            source = SqliteStateStore(database_path)
+        else:
+            return
+
+        with source:
+            knots_hub.installer.migrate_hub_records(
+                source=source,
+                target=self._get_state_store(),
+                hubrecord_path=self._filesystem.hubinstall_record_path,
             )
 
-    @classmethod
-    def add_to_parser(cls, parser: argparse.ArgumentParser):
+    def _get_install_lock(self) -> FileLock:
         """
-        Configure the given argparse ArgumentParser.
+        Get the lock preventing multiple hub processes to install at the same time.
         """
-        parser.add_argument(
-            "--debug",
-            action="store_true",
-            help=cls.debug.__doc__,
+        return FileLock(
+            self._filesystem.install_lock_path,
+            timeout=self._config.install_lock_timeout,
         )
-        parser.add_argument(
-            "--no-coloring",
-            action="store_true",
-            help=cls.no_coloring.__doc__,
+
+    def _get_downloader(self) -> "knots_hub.download.Downloader":
+        """
+        Get the object to use to download files needed by installers.
+        """
+        # pull urllib, ssl and http, only needed when installing vendors
+        from knots_hub.download import DownloadCache
+        from knots_hub.download import Downloader
+
+        cache = None
+        cache_size = self._config.download_cache_size
+        if cache_size > 0:
+            cache = DownloadCache(
+                root_dir=self._filesystem.download_cache_dir,
+                max_size=cache_size * 1024 * 1024,
+            )
+        return Downloader(
+            cache=cache,
+            mirror=self._config.download_mirror,
+            retries=self._config.download_retries,
         )
-        parser.add_argument(
-            "--log-environ",
-            action="store_true",
-            help=cls.log_environ.__doc__,
+
+    def _start_hub_install_cleaning(self):
+        """
+        Remove the previously installed hub versions in a background thread.
+        """
+        hubrecord_path = self._filesystem.hubinstall_record_path
+        store = self._get_state_store()
+        lock = self._get_install_lock()
+        trash = self._filesystem.get_trash()
+
+        def _clean():
+            try:
+                lock.acquire(timeout=0)
+            except LockTimeoutError:
+                LOGGER.debug("skipping hub install cleaning; another hub is installing")
+                return
+            try:
+                hubrecord = store.read(HubInstallRecord, hubrecord_path)
+                legacy_manifest = hubrecord.legacy_manifest or {}
+                remaining = clean_hub_install_root(
+                    install_root=self._config.local_install_path,
+                    installed_path=hubrecord.installed_path,
+                    trash=trash,
+                    legacy_manifest=legacy_manifest,
+                )
+                if remaining != legacy_manifest:
+                    store.update(
+                        HubInstallRecord(legacy_manifest=remaining),
+                        hubrecord_path,
+                    )
+            finally:
+                lock.release()
+
+        thread = threading.Thread(
+            target=_clean,
+            name="clean_hub_install_root",
+            # interrupted cleaning is resumed on the next launch
+            daemon=True,
         )
-        parser.set_defaults(func=cls)
+        thread.start()
+
+    def _start_trash_purge(self):
+        """
+        Remove the paths moved to the trash in a background thread.
+        """
+        trash = self._filesystem.get_trash()
+        if not trash.trash_dir.exists():
+            return
+
+        thread = threading.Thread(
+            target=trash.purge,
+            name="purge_trash",
+            # interrupted purge is resumed on the next launch
+            daemon=True,
+        )
+        thread.start()
 
     def _restart_hub(self, exe: str):
         """
@@ -265,6 +479,8 @@ class BaseParser:
 
         LOGGER.info(f"restarting hub to '{exe}' (asshell={asshell}) ...")
         LOGGER.debug(f"subprocess.run({command})")
+        # the restarted hub logs to the same file and terminal, after our records
+        flush_logging()
         # XXX: we use subprocess instead of os.execv because the implementation on Windows
         #   is not a real restart https://github.com/python/cpython/issues/63323.
         result = subprocess.run(command, shell=asshell, env=environ)
@@ -299,6 +515,8 @@ class KlochParser(BaseParser):
 
     def execute(self):
         super().execute()
+        import kloch
+
         kloch_config = kloch.KlochConfig.from_environment()
         # plugins added in pyproject.toml
         kloch_config.launcher_plugins.extend(
@@ -330,18 +548,111 @@ class UninstallParser(BaseParser):
     """
 
     def execute(self):
-        paths = get_paths_to_uninstall(filesystem=self._filesystem)
+        # wait for any running install to finish, the lock is released before
+        # uninstalling as the lock file is deleted with the rest.
+        with self._get_install_lock():
+            self._migrate_install_records()
+            paths = get_paths_to_uninstall(
+                filesystem=self._filesystem,
+                store=self._get_state_store(),
+            )
+        self._get_state_store().close()
         if not paths:
             LOGGER.info("nothing to uninstall; exiting")
             return
 
+        # the records are removed last so an interrupted uninstall can be started again
+        plan = plan_uninstall(paths, last_paths=[self._filesystem.root_dir])
+
+        if self.dry_run:
+            sizes = measure_plan(plan)
+            for path, (files, size) in sizes.items():
+                LOGGER.info(
+                    f"would remove '{path}' ({files} files, {size / 1e6:.1f}MB)"
+                )
+            files = sum(files for files, _ in sizes.values())
+            size = sum(size for _, size in sizes.values())
+            LOGGER.info(
+                f"would remove {len(sizes)} paths: {files} files, {size / 1e6:.1f}MB freed"
+            )
+            return
+
         LOGGER.info(f"uninstalling hub from the filesystem.")
-        LOGGER.debug(f"removing {paths}")
-        sys.exit(uninstall_paths(paths=paths))
+        LOGGER.debug(f"removing {plan.paths}")
+        sys.exit(uninstall(plan))
+
+    @property
+    def dry_run(self) -> bool:
+        """
+        Only report what would be removed, with the number of files and bytes freed.
+        """
+        return self._args.dry_run
+
+    @classmethod
+    def add_to_parser(cls, parser: argparse.ArgumentParser):
+        super().add_to_parser(parser)
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help=cls.dry_run.__doc__,
+        )
+
+
+class MirrorParser(BaseParser):
+    """
+    A "mirror" sub-command.
+    """
+
+    def execute(self):
+        mirror = self.mirror_dir or self._config.download_mirror
+        if not mirror:
+            LOGGER.error(
+                f"No mirror configured; use the '{Environ.DOWNLOAD_MIRROR}' "
+                f"environment variable or the --mirror-dir argument."
+            )
+            sys.exit(-1)
+
+        mirror_dir = Path(mirror)
+        if not mirror_dir.is_dir():
+            LOGGER.error(f"Mirror '{mirror}' is not an existing directory.")
+            sys.exit(-1)
+
+        urls = []
+        for vendor_path in self._config.vendor_installer_config_paths:
+            if not vendor_path.exists():
+                LOGGER.error(f"Non-existing vendor installer '{vendor_path}'")
+                continue
+            vendors = knots_hub.installer.read_vendor_installer_from_file(vendor_path)
+            for vendor in vendors:
+                urls += vendor.get_download_urls()
+
+        from knots_hub.download import Downloader
+        from knots_hub.download import populate_mirror
+
+        LOGGER.info(f"mirroring {len(urls)} files to '{mirror_dir}'")
+        added = populate_mirror(
+            mirror_dir=mirror_dir,
+            urls=urls,
+            downloader=Downloader(retries=self._config.download_retries),
+        )
+        LOGGER.info(f"added {len(added)} files to the mirror")
+
+    @property
+    def mirror_dir(self) -> Optional[str]:
+        """
+        Filesystem path to an existing directory to use as mirror instead of the configured one.
+        """
+        return self._args.mirror_dir
 
     @classmethod
     def add_to_parser(cls, parser: argparse.ArgumentParser):
         super().add_to_parser(parser)
+        parser.add_argument(
+            "--mirror-dir",
+            type=str,
+            default=None,
+            help=cls.mirror_dir.__doc__,
+        )
 
 
 class AboutParser(BaseParser):
@@ -363,6 +674,9 @@ class AboutParser(BaseParser):
         for k, v in aboutdict.items():
             print(f"| {k:>{maxlen}} | {json.dumps(v, indent=4, default=str)}")
 
+        # only imported if needed as it is slow to import
+        import webbrowser
+
         if self.open_install_dir:
             path = self._config.local_install_path
             LOGGER.info(f"opening '{path}'")
@@ -435,6 +749,15 @@ def get_cli(
     )
     UninstallParser.add_to_parser(subparser)
 
+    subparser = subparsers.add_parser(
+        "mirror",
+        description=(
+            "Download the files needed by the vendor installers to the download mirror. "
+            "Intended to be used by administrators."
+        ),
+    )
+    MirrorParser.add_to_parser(subparser)
+
     subparser = subparsers.add_parser(
         "about",
         description="Display meta informations about knots hub itself.",
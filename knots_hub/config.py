@@ -7,8 +7,10 @@ import logging
 import os
 from pathlib import Path
 from typing import Any
+from typing import Callable
 from typing import Optional
 
+from knots_hub import serializelib
 from knots_hub.constants import Environ
 
 LOGGER = logging.getLogger(__name__)
@@ -37,6 +39,25 @@ def _cast_installerconfig(value: str) -> HubInstallerConfig:
     return HubInstallerConfig(version=version, path=Path(path))
 
 
+def _cast_record_format(value: str) -> str:
+    # fail when reading the config rather than when writing the first record
+    try:
+        return serializelib.get_format(value).name
+    except ValueError as error:
+        raise ValueError(f"Invalid '{Environ.RECORD_FORMAT}': {error}") from None
+
+
+def _get_workers_cast(environ: str) -> Callable[[str], int]:
+    # a thread pool fails on less than one worker, long after reading the config
+    def _cast_workers(value: str) -> int:
+        workers = int(value)
+        if workers < 1:
+            raise ValueError(f"Invalid '{environ}': must be at least 1, got {workers}")
+        return workers
+
+    return _cast_workers
+
+
 @dataclasses.dataclass
 class HubConfig:
     """
@@ -47,7 +68,8 @@ class HubConfig:
         metadata={
             "documentation": (
                 "Filesystem path to a directory that may exist, "
-                "used to store all the filesystem data for the hub."
+                "used to store all the filesystem data for the hub. "
+                "Each installed hub version is stored in its own subdirectory."
             ),
             "environ": Environ.USER_INSTALL_PATH,
             "environ_cast": Path,
@@ -86,6 +108,141 @@ class HubConfig:
         },
     )
 
+    copy_workers: int = dataclasses.field(
+        default=8,
+        metadata={
+            "documentation": (
+                "Maximum number of files copied at the same time when installing. "
+                "Copying files is usually limited by the network latency, "
+                "so copying multiple files at once is faster."
+            ),
+            "environ": Environ.COPY_WORKERS,
+            "environ_cast": _get_workers_cast(Environ.COPY_WORKERS),
+            "environ_required": False,
+        },
+    )
+
+    vendor_workers: int = dataclasses.field(
+        default=4,
+        metadata={
+            "documentation": (
+                "Maximum number of vendors installed or uninstalled at the same time. "
+                "Vendors are independent from each other so they don't need "
+                "to wait for the others to be installed."
+            ),
+            "environ": Environ.VENDOR_WORKERS,
+            "environ_cast": _get_workers_cast(Environ.VENDOR_WORKERS),
+            "environ_required": False,
+        },
+    )
+
+    download_cache_size: int = dataclasses.field(
+        default=1024,
+        metadata={
+            "documentation": (
+                "Maximum size in megabytes of the local cache of files downloaded "
+                "when installing vendors. Cached files are reused when vendors are "
+                "reinstalled. Use 0 to disable the cache."
+            ),
+            "environ": Environ.DOWNLOAD_CACHE_SIZE,
+            "environ_cast": int,
+            "environ_required": False,
+        },
+    )
+
+    download_mirror: Optional[str] = dataclasses.field(
+        default=None,
+        metadata={
+            "documentation": (
+                "A filesystem path to a directory or a http url, mirroring the "
+                "files downloaded when installing vendors. Files missing from the "
+                "mirror are downloaded from their original url. The mirror reproduce "
+                "the host and path of the original url, such as "
+                "``https://github.com/foo/bar.zip`` is ``{mirror}/github.com/foo/bar.zip``. "
+                "A directory mirror can be populated with the ``mirror`` command."
+            ),
+            "environ": Environ.DOWNLOAD_MIRROR,
+            "environ_cast": str,
+            "environ_required": False,
+        },
+    )
+
+    download_retries: int = dataclasses.field(
+        default=3,
+        metadata={
+            "documentation": (
+                "Maximum number of retries of a download after a temporary failure, "
+                "like a dropped connection. Interrupted downloads are resumed "
+                "from where they stopped when the server supports it."
+            ),
+            "environ": Environ.DOWNLOAD_RETRIES,
+            "environ_cast": int,
+            "environ_required": False,
+        },
+    )
+
+    install_lock_timeout: float = dataclasses.field(
+        default=600.0,
+        metadata={
+            "documentation": (
+                "Maximum number of seconds to wait for another hub process to finish "
+                "installing, like when the hub is started twice in a row. "
+                "The hub then only install what the other process didn't."
+            ),
+            "environ": Environ.INSTALL_LOCK_TIMEOUT,
+            "environ_cast": float,
+            "environ_required": False,
+        },
+    )
+
+    use_sqlite_state: bool = dataclasses.field(
+        default=False,
+        metadata={
+            "documentation": (
+                "Store the hub and vendors install records, and the install history, "
+                "in a single sqlite database in the local data directory, instead "
+                "of a json file per record. Existing records are migrated when "
+                "the option is changed. "
+                "Any non-empty value in the environment variable will enable it."
+            ),
+            "environ": Environ.USE_SQLITE_STATE,
+            "environ_cast": bool,
+            "environ_required": False,
+        },
+    )
+
+    record_format: str = dataclasses.field(
+        default="json",
+        metadata={
+            "documentation": (
+                "Format to write the install records with: ``json`` to be human-readable "
+                "or ``binary`` to be compact, which matters for the hub record storing "
+                "the manifest of all the installed hub files, at the cost of being "
+                "slower to read. "
+                "Records are read in any format, so it can be changed at any time."
+            ),
+            "environ": Environ.RECORD_FORMAT,
+            "environ_cast": _cast_record_format,
+            "environ_required": False,
+        },
+    )
+
+    log_queue_size: int = dataclasses.field(
+        default=0,
+        metadata={
+            "documentation": (
+                "When above 0, log records are written to the terminal and the log "
+                "file by a background thread, so the hub doesn't wait for them. "
+                "The value is the maximum number of records waiting to be written: "
+                "when reached, new debug and info records are dropped while warning "
+                "and above wait for room. 0 to write them directly."
+            ),
+            "environ": Environ.LOG_QUEUE_SIZE,
+            "environ_cast": int,
+            "environ_required": False,
+        },
+    )
+
     skip_local_check: bool = dataclasses.field(
         default=False,
         metadata={
@@ -33,12 +33,67 @@ class Environ:
     by the system path separator character.
     """
 
+    COPY_WORKERS = f"{_ENVPREFIX}_COPY_WORKERS"
+    """
+    Maximum number of files copied at the same time when installing.
+    """
+
+    VENDOR_WORKERS = f"{_ENVPREFIX}_VENDOR_WORKERS"
+    """
+    Maximum number of vendors installed or uninstalled at the same time.
+    """
+
     DISABLE_LOCAL_CHECK = f"{_ENVPREFIX}_DISABLE_LOCAL_CHECK"
     """
     Disable the check verifying if the app is directly launched from 
     the server or locally.
     """
 
+    DOWNLOAD_CACHE_SIZE = f"{_ENVPREFIX}_DOWNLOAD_CACHE_SIZE"
+    """
+    Maximum size in megabytes of the local cache of downloaded files.
+    """
+
+    DOWNLOAD_MIRROR = f"{_ENVPREFIX}_DOWNLOAD_MIRROR"
+    """
+    Filesystem path to a directory or http url, from which to download files first.
+    """
+
+    DOWNLOAD_RETRIES = f"{_ENVPREFIX}_DOWNLOAD_RETRIES"
+    """
+    Maximum number of retries of an interrupted or failed download.
+    """
+
+    INSTALL_LOCK_TIMEOUT = f"{_ENVPREFIX}_INSTALL_LOCK_TIMEOUT"
+    """
+    Maximum number of seconds to wait for another hub process to finish installing.
+    """
+
+    USE_SQLITE_STATE = f"{_ENVPREFIX}_USE_SQLITE_STATE"
+    """
+    Any non-empty value to store the install records in a single sqlite database
+    instead of individual json files.
+    """
+
+    RECORD_FORMAT = f"{_ENVPREFIX}_RECORD_FORMAT"
+    """
+    Name of the format to write the install records with, like "json" or "binary".
+    """
+
+    LOG_QUEUE_SIZE = f"{_ENVPREFIX}_LOG_QUEUE_SIZE"
+    """
+    Maximum number of log records waiting to be written by a background thread.
+    0 to write them directly.
+    """
+
+    DISABLE_FAST_LAUNCH = f"{_ENVPREFIX}_DISABLE_FAST_LAUNCH"
+    """
+    Any non-empty value to always start the full hub runtime from the server,
+    even if the local install is already up-to-date.
+    
+    Intended for debugging purpose.
+    """
+
     RUNTIME_STORAGE_ROOT = f"{_ENVPREFIX}_RUNTIME_STORAGE_PATH"
     """
     Filesystem path to a directory that may not exists (but whose parent must).
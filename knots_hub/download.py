@@ -0,0 +1,396 @@
+"""
+Download files from the web, reusing previous downloads when possible.
+"""
+
+import hashlib
+import http.client
+import logging
+import os
+import shutil
+import tempfile
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+LOGGER = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+# http status worth retrying as they are usually temporary
+_RETRYABLE_HTTP_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class IntegrityError(Exception):
+    """
+    A downloaded file doesn't have the expected content.
+    """
+
+    pass
+
+
+def _check_integrity(filehash: str, sha256: Optional[str], source: str):
+    if not sha256:
+        return
+    if filehash != sha256.lower():
+        raise IntegrityError(
+            f"Unexpected sha256 '{filehash}' for '{source}', expected '{sha256}'"
+        )
+
+
+class DownloadCache:
+    """
+    A local storage of downloaded files, identified by their url and optional sha256 hash.
+
+    The cache is bounded in size: the least recently used files are removed
+    when it goes above its maximum size.
+
+    Args:
+        root_dir: filesystem path to a directory that may not exist, but whose parent must exist.
+        max_size: maximum number of bytes stored in the cache.
+    """
+
+    def __init__(self, root_dir: Path, max_size: int):
+        self._root_dir = root_dir
+        self._max_size = max_size
+
+    def __repr__(self):
+        return (
+            f"<{self.__class__.__name__} '{self._root_dir}' max_size={self._max_size}>"
+        )
+
+    @property
+    def root_dir(self) -> Path:
+        """
+        Filesystem path to the directory storing the cached files. Might not exist.
+        """
+        return self._root_dir
+
+    def _get_entry_path(self, url: str, sha256: Optional[str]) -> Path:
+        key = f"{url}\n{sha256.lower() if sha256 else ''}".encode("utf-8")
+        return self._root_dir / hashlib.sha256(key).hexdigest()
+
+    def get(self, url: str, sha256: Optional[str] = None) -> Optional[Path]:
+        """
+        Get the cached file for the given url.
+
+        Args:
+            url: url the file was downloaded from.
+            sha256: expected hash of the file, if known when it was added.
+
+        Returns:
+            filesystem path to an existing file, or None if not cached.
+        """
+        entry_path = self._get_entry_path(url, sha256)
+        try:
+            # mark as recently used
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return entry_path
+
+    def add(self, url: str, path: Path, sha256: Optional[str] = None) -> Path:
+        """
+        Store a copy of the given file in the cache.
+
+        Args:
+            url: url the file was downloaded from.
+            path: filesystem path to the downloaded file.
+            sha256: hash of the file, if it was verified.
+
+        Returns:
+            filesystem path to the cached file.
+        """
+        entry_path = self._get_entry_path(url, sha256)
+
+        self._root_dir.mkdir(exist_ok=True)
+        # copy to a temporary file so a cached file is always complete
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self._root_dir, suffix=".part")
+        os.close(tmp_fd)
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, entry_path)
+
+        self.evict()
+        return entry_path
+
+    def evict(self):
+        """
+        Remove the least recently used files until the cache fits its maximum size.
+        """
+        if not self._root_dir.exists():
+            return
+
+        entries = []
+        for entry in os.scandir(self._root_dir):
+            if not entry.is_file() or entry.name.endswith(".part"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, entry_path in sorted(entries):
+            if size <= self._max_size:
+                break
+            LOGGER.debug(f"evicting cached '{entry_path}'")
+            entry_path.unlink(missing_ok=True)
+            size -= entry_size
+
+
+def _is_web_url(source: str) -> bool:
+    return urllib.parse.urlsplit(source).scheme in ("http", "https")
+
+
+def get_mirror_source(mirror: str, url: str) -> str:
+    """
+    Get the location of the given url in the given mirror.
+
+    A mirror reproduce the host and path of the url it mirrors, such as
+    ``https://github.com/foo/bar.zip`` is ``{mirror}/github.com/foo/bar.zip``.
+
+    Args:
+        mirror: a filesystem path to a directory or a http url.
+        url: the url to get the mirrored location of.
+
+    Returns:
+        a filesystem path or an url, depending on the mirror type.
+    """
+    parsed = urllib.parse.urlsplit(url)
+    # port separator is not supported in Windows filesystem paths
+    parts = [parsed.netloc.replace(":", "_")] + [
+        part for part in parsed.path.split("/") if part
+    ]
+    if _is_web_url(mirror):
+        return "/".join([mirror.rstrip("/")] + parts)
+    return str(Path(mirror, *parts))
+
+
+def _copy_file(source: str, target_file: Path) -> str:
+    """
+    Copy the given file while computing its sha256 hash, returned.
+    """
+    hasher = hashlib.sha256()
+    with open(source, "rb") as src_file, target_file.open("wb") as dst_file:
+        while chunk := src_file.read(_CHUNK_SIZE):
+            dst_file.write(chunk)
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _download_url(
+    url: str,
+    target_file: Path,
+    retries: int,
+    retry_delay: float,
+    timeout: float = 30.0,
+) -> str:
+    """
+    Download the given url while computing its sha256 hash, returned.
+
+    An interrupted download is resumed from where it stopped using a http Range
+    request, unless the server doesn't support it, in which case it start over.
+
+    Args:
+        url: url of the file to download
+        target_file: filesystem path to a file that may exist, but whose parent must.
+        retries: maximum number of retries after a temporary failure.
+        retry_delay: number of seconds to wait before the first retry, doubled at each retry.
+        timeout: number of seconds to wait for the server to respond.
+    """
+    hasher = hashlib.sha256()
+    offset = 0
+    attempt = 0
+
+    with target_file.open("wb") as file:
+        while True:
+            request = urllib.request.Request(url)
+            if offset:
+                request.add_header("Range", f"bytes={offset}-")
+
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    if offset and response.status != http.HTTPStatus.PARTIAL_CONTENT:
+                        LOGGER.debug(f"server doesn't support resuming '{url}'")
+                        file.seek(0)
+                        file.truncate()
+                        hasher = hashlib.sha256()
+                        offset = 0
+
+                    length = response.headers.get("Content-Length")
+                    expected_size = offset + int(length) if length else None
+
+                    while chunk := response.read(_CHUNK_SIZE):
+                        file.write(chunk)
+                        hasher.update(chunk)
+                        offset += len(chunk)
+
+                    if expected_size is not None and offset < expected_size:
+                        raise http.client.IncompleteRead(
+                            b"", expected=expected_size - offset
+                        )
+                return hasher.hexdigest()
+
+            except urllib.error.HTTPError as error:
+                if error.code == http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE:
+                    # the partial content can't be trusted, start over
+                    file.seek(0)
+                    file.truncate()
+                    hasher = hashlib.sha256()
+                    offset = 0
+                elif error.code not in _RETRYABLE_HTTP_STATUS:
+                    raise
+                if attempt >= retries:
+                    raise
+                reason = error
+
+            except (urllib.error.URLError, http.client.HTTPException, OSError) as error:
+                if attempt >= retries:
+                    raise
+                reason = error
+
+            attempt += 1
+            delay = retry_delay * 2 ** (attempt - 1)
+            LOGGER.warning(
+                f"download of '{url}' interrupted after {offset} bytes ({reason}); "
+                f"retrying in {delay}s ({attempt}/{retries})"
+            )
+            time.sleep(delay)
+
+
+class Downloader:
+    """
+    Download files from the web.
+
+    Interrupted downloads are resumed, and temporary failures are retried.
+
+    Args:
+        cache: optional storage to reuse previously downloaded files.
+        mirror:
+            optional filesystem path to a directory or http url, mirroring the
+            files to download. See :func:`get_mirror_source` for the mirror layout.
+            Files not found in the mirror are downloaded from their original url.
+        retries: maximum number of retries of a download after a temporary failure.
+        retry_delay: number of seconds to wait before the first retry, doubled at each retry.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[DownloadCache] = None,
+        mirror: Optional[str] = None,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        self.cache: Optional[DownloadCache] = cache
+        self.mirror: Optional[str] = mirror
+        self.retries: int = retries
+        self.retry_delay: float = retry_delay
+
+    def fetch(self, source: str, target_file: Path) -> str:
+        """
+        Download the given url or copy the given file, ignoring the cache and mirror.
+
+        Args:
+            source: url or filesystem path to a file
+            target_file: filesystem path to a file that may exist, but whose parent must.
+
+        Returns:
+            the sha256 hash of the fetched file, computed while writing it.
+        """
+        if not _is_web_url(source):
+            LOGGER.info(f"copying '{source}' to '{target_file}' ...")
+            return _copy_file(source, target_file)
+
+        LOGGER.info(f"downloading '{source}' to '{target_file}' ...")
+        start_time = time.time()
+        filehash = _download_url(
+            url=source,
+            target_file=target_file,
+            retries=self.retries,
+            retry_delay=self.retry_delay,
+        )
+        elapsed = time.time() - start_time
+        LOGGER.debug(
+            f"downloaded {target_file.stat().st_size / 1024 / 1024:.2f}MB in {elapsed:.2f}s"
+        )
+        return filehash
+
+    def download(
+        self,
+        url: str,
+        target_file: Path,
+        sha256: Optional[str] = None,
+    ) -> Path:
+        """
+        Download the given url to the given file, from the cache or mirror if available.
+
+        Args:
+            url: url of the file to download
+            target_file: filesystem path to a file that may not exist, but whose parent must.
+            sha256: optional expected hash of the downloaded file.
+
+        Raises:
+            IntegrityError: if the downloaded file doesn't have the given ``sha256``.
+
+        Returns:
+            ``target_file``
+        """
+        if self.cache:
+            cached_path = self.cache.get(url, sha256=sha256)
+            if cached_path:
+                LOGGER.info(f"copying cached '{url}' to '{target_file}'")
+                shutil.copyfile(cached_path, target_file)
+                return target_file
+
+        sources = [url]
+        if self.mirror:
+            sources.insert(0, get_mirror_source(self.mirror, url))
+
+        for index, source in enumerate(sources):
+            try:
+                filehash = self.fetch(source, target_file)
+                _check_integrity(filehash, sha256, source=source)
+            except Exception as error:
+                target_file.unlink(missing_ok=True)
+                if index == len(sources) - 1:
+                    raise
+                LOGGER.warning(f"cannot use '{source}' ({error}); trying next source")
+                continue
+            break
+
+        if self.cache:
+            self.cache.add(url, target_file, sha256=sha256)
+        return target_file
+
+
+def populate_mirror(
+    mirror_dir: Path,
+    urls: list[str],
+    downloader: Optional[Downloader] = None,
+) -> list[Path]:
+    """
+    Download the given urls to the mirror directory if they are not already mirrored.
+
+    Args:
+        mirror_dir: filesystem path to an existing directory.
+        urls: urls to mirror
+        downloader: object to download the files; its cache and mirror are not used.
+
+    Returns:
+        filesystem path of the files added to the mirror
+    """
+    downloader = downloader or Downloader()
+    added = []
+    for url in urls:
+        mirror_path = Path(get_mirror_source(str(mirror_dir), url))
+        if mirror_path.exists():
+            LOGGER.debug(f"already mirrored '{url}'")
+            continue
+
+        mirror_path.parent.mkdir(parents=True, exist_ok=True)
+        # download to a temporary file so a mirrored file is always complete
+        tmp_path = mirror_path.with_name(mirror_path.name + ".part")
+        downloader.fetch(url, tmp_path)
+        os.replace(tmp_path, mirror_path)
+        added.append(mirror_path)
+    return added
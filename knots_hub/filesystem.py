@@ -2,9 +2,14 @@
 manipulate the filesystem
 """
 
+import dataclasses
+import json
 import logging
 import os
 import shutil
+import stat
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -58,6 +63,521 @@ def rmtree(path: Path, ignore_errors=False):
     shutil.rmtree(path, onerror=onerror)
 
 
+@dataclasses.dataclass
+class RemoveStats:
+    """
+    What was removed by :func:`remove_tree`.
+    """
+
+    files: int = 0
+    """
+    Number of files removed, including symlinks.
+    """
+
+    dirs: int = 0
+    """
+    Number of directories removed, including the root one.
+    """
+
+    bytes: int = 0
+    """
+    Size of the files removed.
+    """
+
+    elapsed: float = 0.0
+    """
+    Number of seconds the removal took.
+    """
+
+    failures: list[tuple[Path, OSError]] = dataclasses.field(default_factory=list)
+    """
+    Paths that could not be removed, with the error raised when trying to.
+    """
+
+
+# maximum number of files removed by a single worker task
+_REMOVE_BATCH_SIZE = 256
+
+
+def _reset_permissions(path: str):
+    try:
+        os.chflags(path, 0)
+    except (AttributeError, OSError):
+        pass
+    os.chmod(path, 0o700)
+
+
+def _is_link(entry: os.DirEntry) -> bool:
+    """
+    True for symlinks and Windows junctions, which are removed without their target.
+    """
+    if entry.is_symlink():
+        return True
+    if os.name != "nt":
+        return False
+    attributes = entry.stat(follow_symlinks=False).st_file_attributes
+    return bool(attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def _remove_files(
+    dirpath: str,
+    files: list[tuple[str, int]],
+    reset: threading.Event,
+) -> tuple[int, int, list[tuple[Path, OSError]]]:
+    """
+    Remove the given files of the same directory.
+
+    Permissions are reset for the whole directory on the first PermissionError,
+    instead of for each file.
+
+    Returns:
+        number of files removed, number of bytes removed, failures
+    """
+    removed = 0
+    size = 0
+    failures = []
+    for path, file_size in files:
+        try:
+            if reset.is_set() and os.name == "nt":
+                # read-only files can't be removed on Windows
+                os.chmod(path, stat.S_IWRITE)
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        except PermissionError as error:
+            if reset.is_set():
+                failures.append((Path(path), error))
+                continue
+            try:
+                _reset_permissions(dirpath)
+                reset.set()
+                if os.name == "nt":
+                    os.chmod(path, stat.S_IWRITE)
+                os.unlink(path)
+            except OSError as error:
+                failures.append((Path(path), error))
+                continue
+        except OSError as error:
+            failures.append((Path(path), error))
+            continue
+        removed += 1
+        size += file_size
+    return removed, size, failures
+
+
+def _remove_dir(path: str) -> None:
+    try:
+        os.rmdir(path)
+    except PermissionError:
+        _reset_permissions(os.path.dirname(path))
+        _reset_permissions(path)
+        os.rmdir(path)
+
+
+def remove_tree(path: Path, max_workers: int = 8) -> RemoveStats:
+    """
+    Remove the directory and its content, with the files removed concurrently.
+
+    The directory tree is walked with :func:`os.scandir` while the files found
+    are removed by a thread pool. Permissions, like read-only flags, are only
+    reset when a removal fails, once for each directory. Directories are then
+    removed from the deepest ones. Symlinks and junctions are removed without
+    their target.
+
+    Errors don't stop the removal: they are returned in the stats.
+
+    Args:
+        path: filesystem path to an existing directory, or file.
+        max_workers: maximum number of threads removing files at the same time.
+
+    Returns:
+        what was removed and what failed to.
+    """
+    start_time = time.time()
+    stats = RemoveStats()
+    root = os.fspath(path)
+
+    if not os.path.isdir(root) or os.path.islink(root):
+        try:
+            size = os.lstat(root).st_size
+            os.unlink(root)
+        except OSError as error:
+            stats.failures.append((path, error))
+        else:
+            stats.files = 1
+            stats.bytes = size
+        stats.elapsed = time.time() - start_time
+        return stats
+
+    # slow to import and never needed by the launcher
+    import concurrent.futures
+
+    # directories in the order they were walked; a parent is always before its children
+    dirs: list[str] = []
+    links: list[str] = []
+    futures = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        stack = [root]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                try:
+                    entries = list(os.scandir(dirpath))
+                except PermissionError:
+                    _reset_permissions(dirpath)
+                    entries = list(os.scandir(dirpath))
+            except OSError as error:
+                stats.failures.append((Path(dirpath), error))
+                continue
+
+            dirs.append(dirpath)
+            files = []
+            for entry in entries:
+                try:
+                    if _is_link(entry):
+                        # junctions and directory symlinks must be removed as directories
+                        if os.name == "nt" and entry.is_dir():
+                            links.append(entry.path)
+                            continue
+                        files.append((entry.path, 0))
+                    elif entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    else:
+                        files.append((entry.path, entry.stat().st_size))
+                except OSError:
+                    files.append((entry.path, 0))
+
+            reset = threading.Event()
+            for index in range(0, len(files), _REMOVE_BATCH_SIZE):
+                batch = files[index : index + _REMOVE_BATCH_SIZE]
+                futures.append(executor.submit(_remove_files, dirpath, batch, reset))
+
+        for future in concurrent.futures.as_completed(futures):
+            removed, size, failures = future.result()
+            stats.files += removed
+            stats.bytes += size
+            stats.failures += failures
+
+    for dirpath in links + dirs[::-1]:
+        try:
+            _remove_dir(dirpath)
+        except FileNotFoundError:
+            continue
+        except OSError as error:
+            # most likely because one of its files failed to be removed
+            stats.failures.append((Path(dirpath), error))
+            continue
+        stats.dirs += 1
+
+    stats.elapsed = time.time() - start_time
+    LOGGER.debug(
+        f"removed '{path}': {stats.files} files ({stats.bytes / 1e6:.1f}MB) and "
+        f"{stats.dirs} directories in {stats.elapsed:.2f}s with {max_workers} "
+        f"workers; {len(stats.failures)} failures"
+    )
+    return stats
+
+
+def _copy_file(src_path: Path, dst_path: Path) -> int:
+    # copy to a temporary file so an existing destination is always a complete copy
+    tmp_path = dst_path.with_name(dst_path.name + ".part")
+    shutil.copy2(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+    return dst_path.stat().st_size
+
+
+def copy_files(files: list[tuple[Path, Path]], max_workers: int = 8) -> int:
+    """
+    Copy the given files concurrently, preserving their metadata.
+
+    Destination files are first copied to a temporary ``.part`` file so they
+    only exist once fully copied.
+
+    Intended for copying from network locations, where the latency of each file
+    copy is the bottleneck.
+
+    Args:
+        files: list of (filesystem path to an existing file, filesystem path to its copy destination)
+        max_workers: maximum number of files copied at the same time.
+
+    Returns:
+        number of bytes copied
+    """
+    import concurrent.futures
+
+    start_time = time.time()
+
+    for dst_dir in {dst_path.parent for _, dst_path in files}:
+        dst_dir.mkdir(parents=True, exist_ok=True)
+
+    copied = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_copy_file, src_path, dst_path)
+            for src_path, dst_path in files
+        ]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                copied += future.result()
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    elapsed = max(time.time() - start_time, 1e-6)
+    LOGGER.debug(
+        f"copied {len(files)} files ({copied / 1e6:.1f}MB) in {elapsed:.2f}s "
+        f"({copied / 1e6 / elapsed:.1f}MB/s) with {max_workers} workers"
+    )
+    return copied
+
+
+class LockTimeoutError(TimeoutError):
+    """
+    A lock could not be acquired in the given time.
+    """
+
+    pass
+
+
+# byte locked on Windows, far past the holder information written at the start
+# of the file, which other processes must still be able to read
+_LOCK_OFFSET = 2**30
+
+
+def _lock_file(fd: int) -> bool:
+    if os.name == "nt":
+        import msvcrt
+
+        os.lseek(fd, _LOCK_OFFSET, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+    else:
+        import fcntl
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+    return True
+
+
+def _unlock_file(fd: int):
+    if os.name == "nt":
+        import msvcrt
+
+        os.lseek(fd, _LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """
+    An advisory lock shared between processes, backed by a file.
+
+    The lock is held by the operating system, so it is automatically released if
+    the holder process dies: a lock file left on disk by a crashed process is
+    stale and simply acquired again. The lock file stores information about its
+    holder, only used to inform waiting processes.
+
+    The lock is not reentrant: acquiring it twice, even in the same process, blocks.
+
+    Args:
+        path: filesystem path to a file that may not exist, but whose parent must.
+        timeout: maximum number of seconds to wait for the lock. None to wait indefinitely.
+        poll_interval: number of seconds between each attempt to acquire the lock.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} '{self.path}' locked={self.is_locked}>"
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    @property
+    def is_locked(self) -> bool:
+        """
+        True if this instance currently holds the lock.
+        """
+        return self._fd is not None
+
+    def get_holder(self) -> Optional[dict]:
+        """
+        Get information about the process holding or having held the lock.
+
+        Returns:
+            dict with "pid", "host" and "time" keys, or None if not available.
+        """
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def acquire(self, timeout: Optional[float] = ...) -> None:
+        """
+        Wait until the lock is acquired.
+
+        Args:
+            timeout: override the instance timeout.
+
+        Raises:
+            LockTimeoutError: if the lock could not be acquired in time.
+        """
+        if self._fd is not None:
+            raise RuntimeError(f"{self} is already acquired.")
+
+        timeout = self.timeout if timeout is ... else timeout
+        start_time = time.monotonic()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        waiting = False
+        try:
+            while not _lock_file(fd):
+                if not waiting:
+                    LOGGER.info(
+                        f"waiting for another process ({self.get_holder()}) "
+                        f"to release '{self.path}' ..."
+                    )
+                    waiting = True
+                if timeout is not None and time.monotonic() - start_time > timeout:
+                    raise LockTimeoutError(
+                        f"Could not acquire '{self.path}' in {timeout}s; held by "
+                        f"{self.get_holder()}."
+                    )
+                time.sleep(self.poll_interval)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        import socket
+
+        holder = {"pid": os.getpid(), "host": socket.gethostname(), "time": time.time()}
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, json.dumps(holder).encode("utf-8"))
+        self._fd = fd
+        if waiting:
+            LOGGER.debug(
+                f"acquired '{self.path}' after {time.monotonic() - start_time:.1f}s"
+            )
+
+    def release(self):
+        """
+        Release the lock if held by this instance.
+        """
+        if self._fd is None:
+            return
+        fd = self._fd
+        self._fd = None
+        try:
+            _unlock_file(fd)
+        finally:
+            os.close(fd)
+
+
+class Trash:
+    """
+    A directory where files and directories to remove are moved to, to be removed later.
+
+    Moving is a rename, instantaneous even for large trees, so the user doesn't
+    wait for a removal; the trash is purged later, usually in the background.
+
+    Purging can be interrupted at any time, like if the process exits: what
+    remains of a partially removed tree stays in the trash and is removed on the
+    next purge.
+
+    Args:
+        trash_dir: filesystem path to a directory that may not exist, but whose parent must.
+        lock_path:
+            filesystem path to a file that may not exist, used to prevent
+            multiple processes to purge at the same time.
+    """
+
+    def __init__(self, trash_dir: Path, lock_path: Path):
+        self.trash_dir = trash_dir
+        self.lock_path = lock_path
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} '{self.trash_dir}'>"
+
+    def move(self, path: Path) -> bool:
+        """
+        Move the given file or directory to the trash.
+
+        Moving fails if the path is on another volume than the trash, or is in
+        use on Windows; the caller is then expected to remove the path itself.
+
+        Args:
+            path: filesystem path to an existing file or directory.
+
+        Returns:
+            True if the path was moved.
+        """
+        # unique so paths with the same name can be trashed multiple times
+        trashed_path = self.trash_dir / f"{time.time_ns()}-{os.getpid()}-{path.name}"
+        try:
+            self.trash_dir.mkdir(exist_ok=True)
+            os.rename(path, trashed_path)
+        except OSError as error:
+            LOGGER.debug(f"cannot move '{path}' to trash: {error}")
+            return False
+        LOGGER.debug(f"moved '{path}' to '{trashed_path}'")
+        return True
+
+    def purge(self) -> int:
+        """
+        Remove everything in the trash.
+
+        Paths that cannot be removed, like the ones still in use, are skipped
+        and will be removed on a later purge.
+
+        Returns:
+            number of trashed paths removed, 0 if another process is already purging.
+        """
+        if not self.trash_dir.exists():
+            return 0
+
+        lock = FileLock(self.lock_path)
+        try:
+            lock.acquire(timeout=0)
+        except LockTimeoutError:
+            LOGGER.debug(f"skipping purge of {self}; another process is purging")
+            return 0
+
+        purged = 0
+        try:
+            for path in sorted(self.trash_dir.iterdir()):
+                failures = remove_tree(path).failures
+                if failures:
+                    LOGGER.debug(f"cannot purge '{path}': {failures[0][1]}")
+                    continue
+                purged += 1
+        finally:
+            lock.release()
+
+        if purged:
+            LOGGER.debug(f"purged {purged} paths from {self}")
+        return purged
+
+
 def is_runtime_from_local_install(local_install_path) -> bool:
     """
     Find if the current runtime code is executed from a local hub installation.
@@ -134,6 +654,11 @@ class HubLocalFilesystem:
         self._root_dir: Path = root_dir or _DEFAULT_ROOT_DIR
         self._hubrecord_path: Path = self._root_dir / ".hubinstall"
         self._log_path: Path = self._root_dir / "hub.log"
+        self._download_cache_dir: Path = self._root_dir / "downloads"
+        self._install_lock_path: Path = self._root_dir / "install.lock"
+        self._state_database_path: Path = self._root_dir / "state.db"
+        self._trash_dir: Path = self._root_dir / "trash"
+        self._trash_lock_path: Path = self._root_dir / "trash.lock"
 
     def initialize(self):
         if not self._root_dir.exists():
@@ -164,5 +689,48 @@ class HubLocalFilesystem:
         return self._log_path
 
     @property
-    def is_hub_installed(self) -> bool:
-        return self.hubinstall_record_path.exists()
+    def download_cache_dir(self) -> Path:
+        """
+        Filesystem path to a directory that may not exist yet. Used to store downloaded files for reuse.
+        """
+        return self._download_cache_dir
+
+    @property
+    def install_lock_path(self) -> Path:
+        """
+        Filesystem path to a file that may not exist yet. Used to prevent concurrent installs.
+
+        See :class:`FileLock`.
+        """
+        return self._install_lock_path
+
+    @property
+    def state_database_path(self) -> Path:
+        """
+        Filesystem path to a file that may not exist yet. Used to store install records in sqlite.
+
+        See :class:`knots_hub.statestore.SqliteStateStore`.
+        """
+        return self._state_database_path
+
+    @property
+    def trash_dir(self) -> Path:
+        """
+        Filesystem path to a directory that may not exist yet. Used to store paths waiting to be removed.
+
+        See :class:`Trash`.
+        """
+        return self._trash_dir
+
+    @property
+    def trash_lock_path(self) -> Path:
+        """
+        Filesystem path to a file that may not exist yet. Used to prevent concurrent purges of the trash.
+        """
+        return self._trash_lock_path
+
+    def get_trash(self) -> Trash:
+        """
+        Get the trash to move the paths to remove to.
+        """
+        return Trash(self._trash_dir, self._trash_lock_path)
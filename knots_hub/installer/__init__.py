@@ -3,16 +3,23 @@ various software that can be installed on the user system
 """
 
 __all__ = [
+    "clean_hub_install_root",
+    "create_hub_manifest",
+    "get_hub_install_root",
     "get_hub_local_executable",
+    "get_hub_version_dir",
     "is_hub_up_to_date",
     "install_hub",
+    "migrate_hub_records",
     "install_vendor",
+    "install_vendors",
     "HubInstallRecord",
     "BaseVendorInstaller",
     "RezVendorInstaller",
     "read_vendor_installer_from_file",
     "SUPPORTED_VENDORS",
     "uninstall_vendor",
+    "uninstall_vendors",
     "vendors",
     "VendorInstallRecord",
 ]
@@ -20,15 +27,37 @@ __all__ = [
 from ._hubrecord import HubInstallRecord
 from ._vendorrecord import VendorInstallRecord
 
+from ._manifest import create_hub_manifest
+
 from ._hub import is_hub_up_to_date
 from ._hub import get_hub_local_executable
 from ._hub import install_hub
+from ._hub import clean_hub_install_root
+from ._hub import get_hub_install_root
+from ._hub import get_hub_version_dir
+from ._hub import migrate_hub_records
+
+
+from knots_hub import _utils
+
+# vendors are only imported on first access as most commands never need them
+_LAZY_ATTRIBUTES = {
+    "vendors": ("knots_hub.installer.vendors", None),
+    "install_vendor": ("knots_hub.installer.vendors", "install_vendor"),
+    "install_vendors": ("knots_hub.installer.vendors", "install_vendors"),
+    "uninstall_vendor": ("knots_hub.installer.vendors", "uninstall_vendor"),
+    "uninstall_vendors": ("knots_hub.installer.vendors", "uninstall_vendors"),
+    "BaseVendorInstaller": ("knots_hub.installer.vendors", "BaseVendorInstaller"),
+    "RezVendorInstaller": ("knots_hub.installer.vendors", "RezVendorInstaller"),
+    "read_vendor_installer_from_file": (
+        "knots_hub.installer.vendors",
+        "read_vendor_installer_from_file",
+    ),
+    "SUPPORTED_VENDORS": ("knots_hub.installer.vendors", "SUPPORTED_VENDORS"),
+}
+
+__getattr__ = _utils.make_lazy_getattr(globals(), _LAZY_ATTRIBUTES)
 
 
-from . import vendors
-from .vendors import install_vendor
-from .vendors import uninstall_vendor
-from .vendors import BaseVendorInstaller
-from .vendors import RezVendorInstaller
-from .vendors import read_vendor_installer_from_file
-from .vendors import SUPPORTED_VENDORS
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
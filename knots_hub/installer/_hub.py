@@ -1,22 +1,37 @@
-import json
 import logging
+import os
+import re
+import tempfile
 import time
 from pathlib import Path
 from typing import Optional
 
-import pythonning.filesystem
-
+from knots_hub import serializelib
 from knots_hub.config import HubInstallerConfig
 from knots_hub.filesystem import HubLocalFilesystem
+from knots_hub.filesystem import Trash
+from knots_hub.filesystem import copy_files
 from knots_hub.filesystem import find_hub_executable
+from knots_hub.filesystem import remove_tree
 from knots_hub.installer import HubInstallRecord
+from knots_hub.installer import VendorInstallRecord
+from knots_hub.statestore import FileStateStore
+from knots_hub.statestore import StateStore
+from knots_hub.statestore import migrate_records
+from ._manifest import compute_manifest
+from ._manifest import read_hub_manifest
 
 LOGGER = logging.getLogger(__name__)
 
+_VERSION_DIR_PREFIX = "hub-"
+# directories of paths being removed from the install root
+_REMOVING_PREFIX = ".removing-"
+
 
 def is_hub_up_to_date(
     installer: Optional[HubInstallerConfig],
     filesystem: HubLocalFilesystem,
+    store: Optional[StateStore] = None,
 ) -> bool:
     """
     Return True if the current hub version doesn't need update.
@@ -24,29 +39,36 @@ def is_hub_up_to_date(
     Args:
         installer: optional expected configuration of the hub installation
         filesystem: collection of paths for storing runtime data
+        store: where the install records are stored, json files if not provided.
     """
+    store = store or FileStateStore()
     hubrecord_path = filesystem.hubinstall_record_path
-    if not installer or not hubrecord_path.exists():
+    if not installer or not store.exists(hubrecord_path):
         return True
 
-    hubinstall = HubInstallRecord.read_from_disk(hubrecord_path)
+    hubinstall = store.read(HubInstallRecord, hubrecord_path)
     return hubinstall.installed_version == installer.version
 
 
-def get_hub_local_executable(filesystem: HubLocalFilesystem) -> Optional[Path]:
+def get_hub_local_executable(
+    filesystem: HubLocalFilesystem,
+    store: Optional[StateStore] = None,
+) -> Optional[Path]:
     """
     Find the filesystem path to the locally installed hub executable file.
 
     Args:
         filesystem: collection of paths for storing runtime data
+        store: where the install records are stored, json files if not provided.
 
     Returns:
         filesystem path to an existing file or None if not found.
     """
+    store = store or FileStateStore()
     hubrecord_path = filesystem.hubinstall_record_path
-    if not hubrecord_path.exists():
+    if not store.exists(hubrecord_path):
         return None
-    hubinstall = HubInstallRecord.read_from_disk(hubrecord_path)
+    hubinstall = store.read(HubInstallRecord, hubrecord_path)
     install_dir = hubinstall.installed_path
     if not install_dir:
         LOGGER.warning("Found local HubInstallRecord with null 'installed_path'")
@@ -54,29 +76,305 @@ def get_hub_local_executable(filesystem: HubLocalFilesystem) -> Optional[Path]:
     return find_hub_executable(install_dir)
 
 
+def get_hub_version_dir(install_root: Path, version: str) -> Path:
+    """
+    Get the directory a hub version must be installed to.
+
+    Args:
+        install_root: filesystem path to the directory hosting all the installed hub versions.
+        version: arbitrary version of the hub as configured in the installer.
+
+    Returns:
+        filesystem path to a directory that may not exist.
+    """
+    dirname = re.sub(r"[^\w.\-]+", "_", version)
+    return install_root / f"{_VERSION_DIR_PREFIX}{dirname}"
+
+
+def get_hub_install_root(installed_path: Path) -> Path:
+    """
+    Get the directory hosting all the installed hub versions.
+
+    Args:
+        installed_path: the ``installed_path`` of a HubInstallRecord
+
+    Returns:
+        filesystem path to a directory that may not exist.
+    """
+    # hub installed before versioned directories were introduced
+    if not installed_path.name.startswith(_VERSION_DIR_PREFIX):
+        return installed_path
+    return installed_path.parent
+
+
+def _get_size(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return None
+
+
+def _get_legacy_manifest(install_root: Path) -> dict[str, tuple[int, str]]:
+    """
+    Describe the files of a hub installed directly in the install root, without manifest.
+    """
+    if not install_root.exists():
+        return {}
+
+    def _is_version_dir(relpath: str) -> bool:
+        return "/" not in relpath and relpath.startswith(_VERSION_DIR_PREFIX)
+
+    return compute_manifest(install_root, hashed=False, exclude=_is_version_dir)
+
+
 def install_hub(
     install_src_path: Path,
     install_dst_path: Path,
     installed_version: str,
     hubrecord_path: Path,
+    copy_workers: int = 8,
+    store: Optional[StateStore] = None,
 ) -> Path:
     """
+    Install the given hub version in its own directory, next to the previously installed versions.
+
+    Files unchanged since the previously installed version are copied from it
+    instead of the ``install_src_path``. Files are compared using the manifest
+    published with the hub build. If none is published, files are compared using
+    their size and modification time instead, to avoid reading the whole build.
+
+    The HubInstallRecord only point to the new version once all its files have
+    been copied and verified, so an interrupted install leaves the previous version
+    usable, and is resumed on the next install.
+
     Args:
         install_src_path:
             filesystem path to a directory which correspond to the new hub to install.
         install_dst_path:
-            filesystem path to the directory location to install the hub to.
+            filesystem path to the directory hosting all the installed hub versions.
         installed_version: the hub version that is being installed
         hubrecord_path: filesystem path the HubInstallRecord file
+        copy_workers: maximum number of files copied at the same time.
+        store: where the install records are stored, json files if not provided.
 
     Returns:
         filesystem path to the installed hub executable
     """
-    pythonning.filesystem.copy_path_to(install_src_path, install_dst_path)
+    store = store or FileStateStore()
+    src_manifest = read_hub_manifest(install_src_path)
+    if src_manifest is None:
+        # hashing would read the whole build, more than copying it
+        LOGGER.warning(
+            f"no manifest published in '{install_src_path}', comparing files by "
+            f"size and modification time; see create_hub_manifest"
+        )
+        src_manifest = compute_manifest(install_src_path, hashed=False)
+
+    version_dir = get_hub_version_dir(install_dst_path, installed_version)
+
+    previous_dir: Optional[Path] = None
+    previous_manifest = {}
+    legacy_manifest = serializelib.Uninitialized
+    if store.exists(hubrecord_path):
+        hubrecord = store.read(HubInstallRecord, hubrecord_path)
+        if hubrecord.installed_path and hubrecord.installed_manifest:
+            previous_dir = hubrecord.installed_path
+            previous_manifest = hubrecord.installed_manifest
+        # hub installed before versioned directories, directly in the install root
+        if hubrecord.installed_path == install_dst_path:
+            legacy_manifest = previous_manifest or _get_legacy_manifest(
+                install_dst_path
+            )
+
+    is_inplace = version_dir == previous_dir
+    to_copy: list[tuple[Path, Path]] = []
+    reused = 0
+
+    for relpath, entry in src_manifest.items():
+        unchanged = previous_manifest.get(relpath) == entry
+        dst_path = version_dir / relpath
+        # an existing file is from a previous interrupted install of this version
+        if _get_size(dst_path) == entry[0] and (unchanged or not is_inplace):
+            continue
+
+        src_path = install_src_path / relpath
+        if unchanged and not is_inplace:
+            previous_path = previous_dir / relpath
+            if _get_size(previous_path) == entry[0]:
+                src_path = previous_path
+                reused += 1
+        to_copy.append((src_path, dst_path))
+
+    if version_dir.exists():
+        for dirpath, dirnames, filenames in os.walk(version_dir):
+            for filename in filenames:
+                path = Path(dirpath, filename)
+                if path.relative_to(version_dir).as_posix() not in src_manifest:
+                    LOGGER.debug(f"unlink('{path}')")
+                    path.unlink()
+
+    LOGGER.debug(
+        f"copying {len(to_copy) - reused} files from '{install_src_path}' and "
+        f"{reused} files from previous install to '{version_dir}'"
+    )
+    copy_files(to_copy, max_workers=copy_workers)
+
+    for relpath, entry in src_manifest.items():
+        size = _get_size(version_dir / relpath)
+        if size != entry[0]:
+            raise RuntimeError(
+                f"Installed file '{version_dir / relpath}' doesn't match manifest "
+                f"(size={size}, expected={entry[0]})"
+            )
+
     hubrecord = HubInstallRecord(
         installed_time=time.time(),
         installed_version=installed_version,
-        installed_path=install_dst_path,
+        installed_path=version_dir,
+        installed_manifest=src_manifest,
+        legacy_manifest=legacy_manifest,
     )
-    hubrecord.update_disk(hubrecord_path)
-    return find_hub_executable(install_dst_path)
+    with store.transaction():
+        store.update(hubrecord, hubrecord_path)
+        store.add_history("hub", "install", installed_version)
+    return find_hub_executable(version_dir)
+
+
+def _is_same_volume(path: Path, other_path: Path) -> bool:
+    try:
+        return os.stat(path).st_dev == os.stat(other_path).st_dev
+    except OSError:
+        return False
+
+
+def _remove_discarded(path: Path):
+    failures = remove_tree(path).failures
+    if failures:
+        LOGGER.debug(f"cannot remove '{path}': {failures[0][1]}")
+
+
+def _discard(path: Path, install_root: Path, trash: Trash, same_volume: bool) -> bool:
+    """
+    Move the given path out of the hub install to remove it.
+
+    Returns:
+        False if the path is in use and was left untouched.
+    """
+    if same_volume:
+        return trash.move(path)
+
+    # a rename to the trash would always fail
+    removing_dir = Path(tempfile.mkdtemp(prefix=_REMOVING_PREFIX, dir=install_root))
+    try:
+        os.rename(path, removing_dir / path.name)
+    except OSError as error:
+        LOGGER.debug(f"cannot move '{path}': {error}")
+        removing_dir.rmdir()
+        return False
+    _remove_discarded(removing_dir)
+    return True
+
+
+def clean_hub_install_root(
+    install_root: Path,
+    installed_path: Path,
+    trash: Trash,
+    legacy_manifest: Optional[dict[str, tuple[int, str]]] = None,
+) -> dict[str, tuple[int, str]]:
+    """
+    Move the hub versions that are not the currently installed one to the trash.
+
+    Only the version directories, and the files of a hub installed before versioned
+    directories, are moved; anything else in the install root is left untouched.
+
+    A version still used by another hub process cannot be moved on Windows, and
+    stays complete until it is moved on a later call.
+
+    When the trash is on another volume than the install root, paths are instead
+    renamed inside the install root, which also fails as a whole while they are
+    in use, and removed right away.
+
+    Args:
+        install_root: filesystem path to the directory hosting all the installed hub versions.
+        installed_path: filesystem path to the currently installed hub version directory.
+        trash: where to move the unused versions to.
+        legacy_manifest:
+            files installed directly in the install root, before versioned
+            directories, as stored in the HubInstallRecord.
+
+    Returns:
+        the entries of ``legacy_manifest`` whose files could not be moved.
+    """
+    legacy_manifest = legacy_manifest or {}
+    if not install_root.exists() or installed_path.parent != install_root:
+        return dict(legacy_manifest)
+
+    same_volume = _is_same_volume(install_root, trash.trash_dir.parent)
+
+    for path in install_root.iterdir():
+        # interrupted removal of a previous call
+        if path.name.startswith(_REMOVING_PREFIX):
+            _remove_discarded(path)
+            continue
+        if (
+            path == installed_path
+            or not path.name.startswith(_VERSION_DIR_PREFIX)
+            or not path.is_dir()
+        ):
+            continue
+        LOGGER.debug(f"removing unused '{path}'")
+        _discard(path, install_root, trash, same_volume)
+
+    remaining = {}
+    legacy_dirs = set()
+    for relpath, entry in legacy_manifest.items():
+        path = install_root / relpath
+        legacy_dirs.update(
+            install_root / parent for parent in Path(relpath).parents[:-1]
+        )
+        if path.exists() and not _discard(path, install_root, trash, same_volume):
+            remaining[relpath] = entry
+
+    # deepest first, so parents are empty when reached
+    for path in sorted(legacy_dirs, key=lambda path: len(path.parts), reverse=True):
+        try:
+            path.rmdir()
+        except OSError:
+            # not empty or already removed
+            pass
+    return remaining
+
+
+def migrate_hub_records(
+    source: StateStore,
+    target: StateStore,
+    hubrecord_path: Path,
+) -> list[Path]:
+    """
+    Move the hub install record, and the records of the vendors it installed, to another store.
+
+    Used when the user change how the install state is stored, so the existing
+    install is kept.
+
+    Args:
+        source: store to move the records from.
+        target: store to move the records to.
+        hubrecord_path: filesystem path the HubInstallRecord file
+
+    Returns:
+        path of the records that have been moved.
+    """
+    if not source.exists(hubrecord_path):
+        return []
+
+    data_classes = {hubrecord_path: HubInstallRecord}
+    hubrecord = source.read(HubInstallRecord, hubrecord_path)
+    for record_path in (hubrecord.vendors_record_paths or {}).values():
+        data_classes[record_path] = VendorInstallRecord
+
+    migrated = migrate_records(source, target, data_classes)
+    if migrated:
+        LOGGER.info(
+            f"migrated {len(migrated)} install records from {source} to {target}"
+        )
+    return migrated
@@ -1,6 +1,8 @@
 import dataclasses
 import logging
 from pathlib import Path
+from typing import ClassVar
+from typing import Optional
 from typing import Union
 
 from knots_hub import serializelib
@@ -34,12 +36,34 @@ class HubInstallRecord:
     """
 
     vendors_record_paths: Union[dict[str, Path], UninitializedType] = (
-        serializelib.DictOfStrNPathField()
+        serializelib.DictOfStrNPathField(missing_factory=dict)
     )
     """
     A mapping of vendor names installed, and their vendor installation record path.
     """
 
+    installed_manifest: Union[dict[str, tuple[int, str]], UninitializedType] = (
+        serializelib.FileManifestField()
+    )
+    """
+    Description of the files in the installation directory of the hub.
+
+    Used to only update the files that changed between versions.
+    """
+
+    legacy_manifest: Union[dict[str, tuple[int, str]], UninitializedType] = (
+        serializelib.FileManifestField(missing_factory=dict)
+    )
+    """
+    Description of the files of a hub installed before versioned directories,
+    directly in the install root, that are not removed yet.
+    """
+
+    SCHEMA_VERSION: ClassVar[int] = 1
+    """
+    Version of the serialized representation, see :func:`serializelib.register_migration`.
+    """
+
     @classmethod
     def read_from_disk(cls, path: Path) -> "HubInstallRecord":
         """
@@ -50,16 +74,24 @@ class HubInstallRecord:
         """
         return serializelib.read_from_disk(cls, path=path)
 
-    def write_to_disk(self, path: Path):
+    def write_to_disk(self, path: Path, format_name: Optional[str] = None):
         """
         Write this instance as a serialized disk file.
+
+        Args:
+            path: filesystem path to file that may exist
+            format_name: name of the serializelib format to write with, json by default.
         """
-        return serializelib.write_to_disk(self, path=path)
+        return serializelib.write_to_disk(self, path=path, format_name=format_name)
 
-    def update_disk(self, path: Path):
+    def update_disk(self, path: Path, format_name: Optional[str] = None):
         """
         Write this instance as a serialized disk file, updating if the file already exists.
 
         Updating means only writing non-Uninitialized value of this instance.
+
+        Args:
+            path: filesystem path to file that may exist
+            format_name: name of the serializelib format to write with, json by default.
         """
-        return serializelib.update_disk(self, path=path)
+        return serializelib.update_disk(self, path=path, format_name=format_name)
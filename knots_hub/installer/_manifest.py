@@ -0,0 +1,114 @@
+"""
+Describe the content of a directory to allow incremental updates of it.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+
+from knots_hub._utils import get_file_hash
+
+LOGGER = logging.getLogger(__name__)
+
+ManifestEntry = tuple[int, str]
+"""
+The size in bytes of a file and its content hash, or its modification time
+when computed without hashing.
+"""
+
+FileManifest = dict[str, ManifestEntry]
+"""
+A mapping of file path relative to a root directory (posix-style), with its manifest entry.
+"""
+
+MANIFEST_FILENAME = ".hubmanifest"
+"""
+Name of the file storing a published manifest at the root of the directory it describes.
+"""
+
+
+def compute_manifest(
+    directory: Path,
+    hashed: bool = True,
+    exclude: Optional[Callable[[str], bool]] = None,
+) -> FileManifest:
+    """
+    Describe all the files in the given directory.
+
+    Args:
+        directory: filesystem path to an existing directory.
+        hashed:
+            True to identify files with their content hash, which imply to read
+            the full content of each file. Else files are identified with their
+            modification time, which only compares equal to manifests computed
+            the same way.
+        exclude:
+            optional function receiving the relative path (posix-style) of each
+            directory and file, returning True to exclude it from the manifest.
+
+    Returns:
+        manifest of all the files of the directory, except a published manifest.
+    """
+    manifest: FileManifest = {}
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirpath = Path(dirpath)
+        if exclude:
+            dirnames[:] = [
+                dirname
+                for dirname in dirnames
+                if not exclude((dirpath / dirname).relative_to(directory).as_posix())
+            ]
+        for filename in filenames:
+            filepath = dirpath / filename
+            relpath = filepath.relative_to(directory).as_posix()
+            if relpath == MANIFEST_FILENAME or (exclude and exclude(relpath)):
+                continue
+            stat = filepath.stat()
+            if hashed:
+                manifest[relpath] = (stat.st_size, get_file_hash(filepath))
+            else:
+                manifest[relpath] = (stat.st_size, f"mtime:{stat.st_mtime_ns}")
+    return manifest
+
+
+def create_hub_manifest(directory: Path) -> Path:
+    """
+    Publish the manifest of the given hub build directory, next to its content.
+
+    Intended to be called when deploying a new hub build, so users don't need
+    to read the whole build to find what changed. Must be called again every time
+    the build directory content changes.
+
+    Args:
+        directory: filesystem path to an existing hub build directory.
+
+    Returns:
+        filesystem path to the written manifest file.
+    """
+    manifest = compute_manifest(directory)
+    manifest_path = directory / MANIFEST_FILENAME
+    LOGGER.debug(f"writing manifest of {len(manifest)} files to '{manifest_path}'")
+    with manifest_path.open("w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4, sort_keys=True)
+    return manifest_path
+
+
+def read_hub_manifest(directory: Path) -> Optional[FileManifest]:
+    """
+    Get the manifest published in the given hub build directory.
+
+    Args:
+        directory: filesystem path to an existing hub build directory.
+
+    Returns:
+        the published manifest or None if the build doesn't publish one.
+    """
+    manifest_path = directory / MANIFEST_FILENAME
+    if not manifest_path.exists():
+        return None
+    with manifest_path.open("r", encoding="utf-8") as file:
+        content = json.load(file)
+    return {relpath: (size, filehash) for relpath, (size, filehash) in content.items()}
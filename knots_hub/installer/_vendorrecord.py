@@ -1,6 +1,9 @@
 import dataclasses
 import logging
 from pathlib import Path
+from typing import ClassVar
+from typing import Optional
+
 from knots_hub import serializelib
 
 
@@ -35,13 +38,18 @@ class VendorInstallRecord:
     Filesystem path to the installation directory of the vendor.    
     """
 
-    extra_paths: list[Path] = serializelib.PathListField()
+    extra_paths: list[Path] = serializelib.PathListField(missing_factory=list)
     """
     A list of extra paths created for the install of the vendor.
     
     They need to be removed on uninstallation.
     """
 
+    SCHEMA_VERSION: ClassVar[int] = 1
+    """
+    Version of the serialized representation, see :func:`serializelib.register_migration`.
+    """
+
     @classmethod
     def read_from_disk(cls, path: Path) -> "VendorInstallRecord":
         """
@@ -52,16 +60,24 @@ class VendorInstallRecord:
         """
         return serializelib.read_from_disk(cls, path=path)
 
-    def write_to_disk(self, path: Path):
+    def write_to_disk(self, path: Path, format_name: Optional[str] = None):
         """
         Write this instance as a serialized disk file.
+
+        Args:
+            path: filesystem path to file that may exist
+            format_name: name of the serializelib format to write with, json by default.
         """
-        return serializelib.write_to_disk(self, path=path)
+        return serializelib.write_to_disk(self, path=path, format_name=format_name)
 
-    def update_disk(self, path: Path):
+    def update_disk(self, path: Path, format_name: Optional[str] = None):
         """
         Write this instance as a serialized disk file, updating if the file already exists.
 
         Updating means only writing non-Uninitialized value of this instance.
+
+        Args:
+            path: filesystem path to file that may exist
+            format_name: name of the serializelib format to write with, json by default.
         """
-        return serializelib.update_disk(self, path=path)
+        return serializelib.update_disk(self, path=path, format_name=format_name)
@@ -4,16 +4,22 @@ various external software that can be installed on the user system
 
 __all__ = [
     "BaseVendorInstaller",
+    "InstallStep",
+    "InstallStepScheduler",
     "install_vendor",
+    "install_vendors",
     "read_vendor_installer_from_file",
     "RezVendorInstaller",
     "SUPPORTED_VENDORS",
     "uninstall_vendor",
+    "uninstall_vendors",
+    "VendorJobResult",
     "VendorNameError",
 ]
 
 
 from ._base import BaseVendorInstaller
+from ._base import InstallStep
 from ._base import VendorNameError
 from ._python import install_python
 from ._rez import RezVendorInstaller
@@ -21,5 +27,9 @@ from ._rez import RezVendorInstaller
 from ._io import read_vendor_installer_from_file
 from ._io import SUPPORTED_VENDORS
 
+from ._install import InstallStepScheduler
 from ._install import install_vendor
+from ._install import install_vendors
 from ._install import uninstall_vendor
+from ._install import uninstall_vendors
+from ._install import VendorJobResult
@@ -3,7 +3,13 @@ import dataclasses
 import hashlib
 import logging
 from pathlib import Path
+from typing import Any
+from typing import Callable
+from typing import ClassVar
+from typing import Optional
+
 from knots_hub import serializelib
+from knots_hub.download import Downloader
 
 LOGGER = logging.getLogger(__name__)
 
@@ -16,6 +22,32 @@ class VendorNameError(Exception):
     pass
 
 
+@dataclasses.dataclass(frozen=True)
+class InstallStep:
+    """
+    A unit of work needed to install a vendor, that can be executed once the steps it requires are completed.
+    """
+
+    name: str
+    """
+    Identifier of the step, unique across all vendors.
+
+    Two steps with the same name are considered to do the same work, which allow
+    vendors to share prerequisites that are only executed once.
+    """
+
+    function: Callable[[dict[str, Any]], Any]
+    """
+    Callable executing the step. It receives a mapping of required step name: their result,
+    and return an arbitrary result (like a path to an installed file).
+    """
+
+    requires: tuple[str, ...] = ()
+    """
+    Name of the steps that must be completed before this one can be started.
+    """
+
+
 @dataclasses.dataclass
 class BaseVendorInstaller(abc.ABC):
     """
@@ -54,6 +86,11 @@ class BaseVendorInstaller(abc.ABC):
     List of filesystem path to directory that must be created on installation.
     """
 
+    HASH_EXCLUDED_FIELDS: ClassVar[tuple[str, ...]] = ()
+    """
+    Name of the fields not affecting what is installed, that must not trigger an update when changed.
+    """
+
     def __str__(self):
         return f"VendorInstaller:{self.name()}-v{self.version()}"
 
@@ -140,10 +177,64 @@ class BaseVendorInstaller(abc.ABC):
         """
         Get a hash that allow to differenciate this instance against a previously installed one.
         """
-        serialized = self.serialize() + self.name() + str(self.version())
+
+        def postprocess(src: dict) -> dict:
+            for field_name in self.HASH_EXCLUDED_FIELDS:
+                del src[field_name]
+            return {self.name(): src}
+
+        serialized = serializelib.serialize(unserialized=self, post_process=postprocess)
+        serialized = serialized + self.name() + str(self.version())
         serialized = serialized.encode("utf-8")
         return hashlib.md5(serialized).hexdigest()
 
+    def get_dependencies(self) -> list[str]:
+        """
+        Get the name of the other vendors that must be installed before this one.
+        """
+        return []
+
+    def get_artifacts(self) -> dict[str, Any]:
+        """
+        Get the result of the install steps that other vendors may require, once this vendor is installed.
+
+        This allow a vendor depending on this one to use what it installed, even
+        if no install step was executed because it was already up-to-date.
+
+        Returns:
+            mapping of install step name: its result.
+        """
+        return {}
+
+    def get_install_steps(
+        self,
+        downloader: Optional[Downloader] = None,
+    ) -> list[InstallStep]:
+        """
+        Get the units of work needed to install the vendor.
+
+        The default implementation is a single step calling :meth:`install`.
+        Subclasses can override it to expose independent steps that can be
+        executed concurrently or shared with other vendors.
+
+        Args:
+            downloader: object to use to download any file needed for the installation.
+        """
+        return [
+            InstallStep(
+                name=f"{self.name()}:install",
+                function=lambda requirements: self.install(downloader=downloader),
+            )
+        ]
+
+    def get_download_urls(self) -> list[str]:
+        """
+        Get the urls of all the files downloaded by the installation.
+
+        Used to populate a download mirror ahead of the installation.
+        """
+        return []
+
     def make_install_directories(self):
         """
         Create all the directories used for installation, given by the user.
@@ -166,10 +257,15 @@ class BaseVendorInstaller(abc.ABC):
         return serializelib.serialize(unserialized=self, post_process=postprocess)
 
     @abc.abstractmethod
-    def install(self):
+    def install(self, downloader: Optional[Downloader] = None):
         """
         Arbitrary process to install a program.
 
+        Args:
+            downloader:
+                object to use to download any file needed for the installation.
+                A default one is created if not provided.
+
         Developer is responsible for calling :meth:`set_install_completed` at the end
         or to check if an existing install exist.
         """
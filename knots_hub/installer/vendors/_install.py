@@ -1,26 +1,237 @@
+import concurrent.futures
+import contextvars
+import dataclasses
+import functools
 import logging
+import threading
 import time
 from pathlib import Path
+from typing import Any
+from typing import Callable
 from typing import Optional
 
+from knots_hub._logging import log_context
+from knots_hub.download import Downloader
 from ._base import BaseVendorInstaller
-from knots_hub.filesystem import rmtree
+from ._base import InstallStep
+from knots_hub.filesystem import Trash
+from knots_hub.filesystem import remove_tree
 from knots_hub.installer import VendorInstallRecord
+from knots_hub.statestore import FileStateStore
+from knots_hub.statestore import StateStore
 
 LOGGER = logging.getLogger(__name__)
 
 
-def uninstall_vendor(record_file: VendorInstallRecord):
+def sort_install_steps(steps: list[InstallStep]) -> list[InstallStep]:
+    """
+    Order the given steps so each step is after the steps it requires.
+
+    Requirements not part of the given steps are ignored.
+
+    Raises:
+        ValueError: if the steps requirements are cyclic.
+
+    Returns:
+        new list of the same steps, duplicated names removed.
+    """
+    steps_by_name = {}
+    for step in steps:
+        steps_by_name.setdefault(step.name, step)
+
+    ordered: list[InstallStep] = []
+    visiting = set()
+    visited = set()
+
+    def _visit(step: InstallStep):
+        if step.name in visited:
+            return
+        if step.name in visiting:
+            raise ValueError(f"cyclic requirements for install step '{step.name}'")
+        visiting.add(step.name)
+        for required in step.requires:
+            if required in steps_by_name:
+                _visit(steps_by_name[required])
+        visiting.discard(step.name)
+        visited.add(step.name)
+        ordered.append(step)
+
+    for step in steps_by_name.values():
+        _visit(step)
+    return ordered
+
+
+class InstallStepScheduler:
+    """
+    Execute install steps concurrently, each step starting as soon as the steps it requires succeeded.
+
+    Steps are identified by their name: submitting a step with the name of a
+    previously submitted step reuse the previous one. That way prerequisites
+    shared by multiple vendors are only executed once.
+
+    A step fails without being executed if one of its required steps failed.
+
+    Args:
+        max_workers: maximum number of steps executed at the same time.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="vendorstep",
+        )
+        self._futures: dict[str, concurrent.futures.Future] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    def shutdown(self):
+        """
+        Wait for all the submitted steps to finish and release the resources.
+        """
+        self._executor.shutdown(wait=True)
+
+    def provide(self, name: str, result: Any):
+        """
+        Register the result of a step that doesn't need to be executed, like if already installed.
+
+        Does nothing if a step with the same name was already submitted.
+        """
+        with self._lock:
+            if name in self._futures:
+                return
+            future = concurrent.futures.Future()
+            future.set_result(result)
+            self._futures[name] = future
+
+    def submit(self, steps: list[InstallStep]) -> dict[str, concurrent.futures.Future]:
+        """
+        Schedule the execution of the given steps.
+
+        Args:
+            steps:
+                steps to execute. They may require steps previously submitted or
+                provided, or steps part of this list.
+
+        Raises:
+            ValueError: if a step requires an unknown step or requirements are cyclic.
+
+        Returns:
+            mapping of step name: future resolved with the step result, in execution order.
+        """
+        futures = {}
+        with self._lock:
+            ordered = sort_install_steps(steps)
+            known = set(self._futures) | {step.name for step in ordered}
+            for step in ordered:
+                missing = [name for name in step.requires if name not in known]
+                if missing:
+                    raise ValueError(
+                        f"install step '{step.name}' requires unknown steps {missing}"
+                    )
+
+            for step in ordered:
+                future = self._futures.get(step.name)
+                if not future:
+                    future = concurrent.futures.Future()
+                    self._futures[step.name] = future
+                    self._schedule(step, future)
+                futures[step.name] = future
+        return futures
+
+    def run(self, steps: list[InstallStep]) -> dict[str, Any]:
+        """
+        Execute the given steps and wait for them to finish.
+
+        See :meth:`submit` for details.
+
+        Raises:
+            Exception: the error of the first step that failed.
+
+        Returns:
+            mapping of step name: step result
+        """
+        futures = self.submit(steps)
+        concurrent.futures.wait(futures.values())
+        return {name: future.result() for name, future in futures.items()}
+
+    def _schedule(self, step: InstallStep, future: concurrent.futures.Future):
+        requirements = {name: self._futures[name] for name in step.requires}
+        remaining = [len(requirements)]
+        remaining_lock = threading.Lock()
+        # so the step log messages keep the prefix of whoever submitted it
+        context = contextvars.copy_context()
+
+        def _start():
+            for name, required in requirements.items():
+                if required.exception():
+                    error = RuntimeError(
+                        f"cannot execute install step '{step.name}': "
+                        f"required step '{name}' failed"
+                    )
+                    error.__cause__ = required.exception()
+                    future.set_exception(error)
+                    return
+            results = {
+                name: required.result() for name, required in requirements.items()
+            }
+            self._executor.submit(context.run, self._run_step, step, future, results)
+
+        def _on_required_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                _start()
+
+        if not requirements:
+            _start()
+        for required in requirements.values():
+            required.add_done_callback(_on_required_done)
+
+    @staticmethod
+    def _run_step(
+        step: InstallStep,
+        future: concurrent.futures.Future,
+        requirements: dict[str, Any],
+    ):
+        LOGGER.debug(f"starting install step '{step.name}'")
+        try:
+            result = step.function(requirements)
+        except Exception as error:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+
+def uninstall_vendor(
+    record_file: VendorInstallRecord,
+    trash: Optional[Trash] = None,
+):
     """
     Uninstall the previously installed vendor as recorded by the given file.
+
+    Args:
+        record_file: the install record of the vendor to uninstall.
+        trash:
+            where to move the directories to, so they are removed later instead
+            of now. Directories that can't be moved are directly removed.
     """
     for path in [record_file.installed_path] + record_file.extra_paths:
         if path.is_file():
             LOGGER.debug(f"unlink('{path}')")
             path.unlink()
         elif path.is_dir():
-            LOGGER.debug(f"rmtree('{path}')")
-            rmtree(path)
+            if trash and trash.move(path):
+                continue
+            LOGGER.debug(f"remove_tree('{path}')")
+            failures = remove_tree(path).failures
+            if failures:
+                raise failures[0][1]
         else:
             LOGGER.debug(f"skipping already deleted '{path}'")
             # the path doesn't exist anymore (manually deleted somehow)
@@ -30,6 +241,10 @@ def uninstall_vendor(record_file: VendorInstallRecord):
 def install_vendor(
     vendor: BaseVendorInstaller,
     record_path: Path,
+    downloader: Optional[Downloader] = None,
+    scheduler: Optional[InstallStepScheduler] = None,
+    store: Optional[StateStore] = None,
+    trash: Optional[Trash] = None,
 ) -> bool:
     """
     Install OR update the vendor as configured by the user.
@@ -39,10 +254,17 @@ def install_vendor(
         record_path:
             filesystem path to a file that may exist and should record the
             last and future vendor installation configuration.
+        downloader: object to download the files needed for installation.
+        scheduler:
+            object executing the vendor install steps, that may be shared with
+            other vendors. A new one is used if not provided.
+        store: where the install records are stored, json files if not provided.
+        trash: where to move the previous install to, see :func:`uninstall_vendor`.
     """
+    store = store or FileStateStore()
     record_file: Optional[VendorInstallRecord] = None
-    if record_path.exists():
-        record_file = VendorInstallRecord.read_from_disk(record_path)
+    if store.exists(record_path):
+        record_file = store.read(VendorInstallRecord, record_path)
 
     if record_file and vendor.get_hash() == record_file.install_hash:
         # already up-to-date
@@ -50,7 +272,7 @@ def install_vendor(
 
     updating = record_file is not None
     if record_file:
-        uninstall_vendor(record_file)
+        uninstall_vendor(record_file, trash=trash)
 
     if updating:
         LOGGER.debug(f"updating existing vendor '{vendor.name()}'")
@@ -58,13 +280,20 @@ def install_vendor(
         LOGGER.debug(f"installing new vendor '{vendor.name()}'")
 
     try:
-        vendor.install()
+        steps = vendor.get_install_steps(downloader=downloader)
+        if scheduler:
+            scheduler.run(steps)
+        else:
+            with InstallStepScheduler() as scheduler:
+                scheduler.run(steps)
     except:
         if record_file:
             LOGGER.debug(
                 "upcoming vendor install error, removing potential files created."
             )
-            uninstall_vendor(record_file)
+            uninstall_vendor(record_file, trash=trash)
+            # the record doesn't describe what is installed anymore
+            store.delete(record_path)
         raise
 
     record_file = VendorInstallRecord(
@@ -75,5 +304,219 @@ def install_vendor(
         extra_paths=vendor.dirs_to_make,
     )
     LOGGER.debug(f"writing VendorInstallRecord to '{record_path}'")
-    record_file.write_to_disk(record_path)
+    with store.transaction():
+        store.write(record_file, record_path)
+        store.add_history(vendor.name(), "install", record_file.install_hash)
     return True
+
+
+@dataclasses.dataclass(frozen=True)
+class VendorJobResult:
+    """
+    Outcome of installing or uninstalling a single vendor.
+    """
+
+    name: str
+    """
+    Name of the vendor the job was executed for.
+    """
+
+    changed: bool = False
+    """
+    True if the job modified the user system, False if the vendor was already up-to-date.
+    """
+
+    error: Optional[Exception] = None
+    """
+    The exception raised by the job if it failed, else None.
+    """
+
+
+def run_vendor_jobs(
+    jobs: dict[str, Callable[[], Optional[bool]]],
+    max_workers: int = 4,
+    dependencies: Optional[dict[str, list[str]]] = None,
+) -> dict[str, VendorJobResult]:
+    """
+    Execute the given per-vendor jobs concurrently.
+
+    A failing job doesn't stop the other ones; its error is logged and returned
+    in its result. Messages logged by a job are prefixed by its vendor name.
+
+    Args:
+        jobs: mapping of vendor name: callable to execute, returning if the system changed.
+        max_workers: maximum number of jobs executed at the same time.
+        dependencies:
+            optional mapping of vendor name: name of the vendors whose job must
+            succeed before its job can start.
+
+    Raises:
+        ValueError: if the dependencies are cyclic.
+
+    Returns:
+        mapping of vendor name: result of its job, in the same order as the given jobs.
+    """
+    dependencies = dependencies or {}
+
+    def _run_job(name: str, job: Callable[[], Optional[bool]]) -> VendorJobResult:
+        with log_context(name):
+            try:
+                changed = job()
+            except Exception as error:
+                LOGGER.exception(f"vendor job failed: {error}")
+                return VendorJobResult(name=name, error=error)
+        return VendorJobResult(name=name, changed=bool(changed))
+
+    if not jobs:
+        return {}
+
+    results: dict[str, VendorJobResult] = {}
+    pending = dict(jobs)
+    running: dict[concurrent.futures.Future, str] = {}
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(jobs))),
+        thread_name_prefix="vendor",
+    ) as executor:
+        while pending or running:
+
+            for name in list(pending):
+                required = [dep for dep in dependencies.get(name, []) if dep in jobs]
+                if any(dep not in results for dep in required):
+                    continue
+
+                job = pending.pop(name)
+                failed = [dep for dep in required if results[dep].error]
+                if failed:
+                    error = RuntimeError(f"required vendors {failed} failed")
+                    LOGGER.error(f"[{name}] skipped: {error}")
+                    results[name] = VendorJobResult(name=name, error=error)
+                    continue
+
+                running[executor.submit(_run_job, name, job)] = name
+
+            if not running:
+                if pending:
+                    raise ValueError(f"cyclic dependencies between {list(pending)}")
+                break
+
+            done, _ = concurrent.futures.wait(
+                running,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    return {name: results[name] for name in jobs}
+
+
+def _get_directory_dependencies(
+    vendors: list[BaseVendorInstaller],
+) -> dict[str, list[str]]:
+    """
+    Find which vendor must be installed before another to create the parent of its directories.
+
+    Only previous vendors in the list are considered, mimicking vendors installed one after the other.
+    """
+    dependencies = {}
+    for index, vendor in enumerate(vendors):
+        parents = {path.parent for path in [vendor.install_dir] + vendor.dirs_to_make}
+        dependencies[vendor.name()] = [
+            other.name()
+            for other in vendors[:index]
+            if parents.intersection([other.install_dir] + other.dirs_to_make)
+        ]
+    return dependencies
+
+
+def install_vendors(
+    vendors: list[tuple[BaseVendorInstaller, Path]],
+    downloader: Optional[Downloader] = None,
+    max_workers: int = 4,
+    store: Optional[StateStore] = None,
+    trash: Optional[Trash] = None,
+) -> dict[str, VendorJobResult]:
+    """
+    Install OR update the given vendors concurrently.
+
+    A vendor is only installed once the vendors it depends on are installed.
+    A vendor whose directories are created inside a directory of a previous
+    vendor in the list also wait for that previous vendor to be installed.
+
+    The install steps of all the vendors are executed by a shared scheduler,
+    so independent steps run concurrently and steps shared between vendors
+    are only executed once.
+
+    See :func:`install_vendor` for details.
+
+    Args:
+        vendors: list of vendor installer with their install record path.
+        downloader: object to download the files needed for installation.
+        max_workers: maximum number of vendors, and of steps, executed at the same time.
+        store: where the install records are stored, json files if not provided.
+        trash: where to move the previous installs to, see :func:`uninstall_vendor`.
+
+    Returns:
+        mapping of vendor name: result of its install.
+    """
+    names = [vendor.name() for vendor, _ in vendors]
+    dependencies = _get_directory_dependencies([vendor for vendor, _ in vendors])
+    for vendor, _ in vendors:
+        dependencies[vendor.name()] += vendor.get_dependencies()
+
+    with InstallStepScheduler(max_workers=max_workers) as scheduler:
+
+        def _install(vendor: BaseVendorInstaller, record_path: Path) -> bool:
+            missing = [name for name in vendor.get_dependencies() if name not in names]
+            if missing:
+                raise ValueError(f"required vendors {missing} are not configured")
+
+            installed = install_vendor(
+                vendor=vendor,
+                record_path=record_path,
+                downloader=downloader,
+                scheduler=scheduler,
+                store=store,
+                trash=trash,
+            )
+            for step_name, result in vendor.get_artifacts().items():
+                scheduler.provide(step_name, result)
+            return installed
+
+        jobs = {
+            vendor.name(): functools.partial(_install, vendor, record_path)
+            for vendor, record_path in vendors
+        }
+        return run_vendor_jobs(
+            jobs,
+            max_workers=max_workers,
+            dependencies=dependencies,
+        )
+
+
+def uninstall_vendors(
+    record_files: list[VendorInstallRecord],
+    max_workers: int = 4,
+    trash: Optional[Trash] = None,
+) -> dict[str, VendorJobResult]:
+    """
+    Uninstall the given previously installed vendors concurrently.
+
+    Args:
+        record_files: the install record of each vendor to uninstall.
+        max_workers: maximum number of vendors uninstalled at the same time.
+        trash: where to move the installs to, see :func:`uninstall_vendor`.
+
+    Returns:
+        mapping of vendor name: result of its uninstall.
+    """
+
+    def _uninstall(record_file: VendorInstallRecord) -> bool:
+        uninstall_vendor(record_file, trash=trash)
+        return True
+
+    jobs = {
+        record_file.name: functools.partial(_uninstall, record_file)
+        for record_file in record_files
+    }
+    return run_vendor_jobs(jobs, max_workers=max_workers)
@@ -1,6 +1,8 @@
 import dataclasses
 import logging
+from typing import Optional
 
+from knots_hub.download import Downloader
 from ._base import BaseVendorInstaller
 
 
@@ -21,7 +23,7 @@ class KnotsVendorInstaller(BaseVendorInstaller):
     def version(cls) -> int:
         return 1
 
-    def install(self):
+    def install(self, downloader: Optional[Downloader] = None):
         # the current implementation just need the Base install_dir to be created
         #   which is handled by this method:
         self.make_install_directories()
@@ -2,13 +2,11 @@ import logging
 import shutil
 import subprocess
 from pathlib import Path
-
-from pythonning.progress import catch_download_progress
-from pythonning.web import download_file
-from pythonning.filesystem import move_directory_content
+from typing import Optional
 
 from knots_hub import OS
 from knots_hub._utils import format_subprocess_result
+from knots_hub.download import Downloader
 
 LOGGER = logging.getLogger(__name__)
 NUGET_URL = "https://dist.nuget.org/win-x86-commandline/latest/nuget.exe"
@@ -17,17 +15,15 @@ NUGET_URL = "https://dist.nuget.org/win-x86-commandline/latest/nuget.exe"
 def _install_python_windows(
     python_version: str,
     target_dir: Path,
+    downloader: Downloader,
+    nuget_sha256: Optional[str] = None,
 ) -> Path:
+    # imported here as only needed when actually installing
+    from pythonning.filesystem import move_directory_content
+
     url = NUGET_URL
     nuget_path = target_dir / "__nuget.exe"
-
-    LOGGER.info(f"downloading '{url}' to '{nuget_path}' ...")
-    with catch_download_progress() as progress:
-        download_file(
-            url=url,
-            target_file=nuget_path,
-            step_callback=progress.show_progress,
-        )
+    downloader.download(url=url, target_file=nuget_path, sha256=nuget_sha256)
 
     nugest_install_dir = target_dir / "__python.tmp"
     nuget_command = [
@@ -51,18 +47,32 @@ def _install_python_windows(
     move_directory_content(python_src_dir, target_dir)
     shutil.rmtree(nugest_install_dir)
 
-    if OS.is_windows():
-        python_bin_path = target_dir / "python.exe"
-    else:
-        python_bin_path = target_dir / "bin" / "python"
-
+    python_bin_path = get_python_executable(target_dir)
     assert python_bin_path.exists(), python_bin_path
     return python_bin_path
 
 
+def get_python_executable(target_dir: Path) -> Path:
+    """
+    Get the path of the python executable created by :func:`install_python`.
+
+    Args:
+        target_dir: filesystem path to the directory python is installed to.
+
+    Returns:
+        filesystem path to a file that may not exist yet.
+    """
+    if OS.is_windows():
+        return target_dir / "python.exe"
+    else:
+        return target_dir / "bin" / "python"
+
+
 def install_python(
     python_version: str,
     target_dir: Path,
+    downloader: Optional[Downloader] = None,
+    nuget_sha256: Optional[str] = None,
 ):
     """
     Create a python interpreter of the given version at the given location.
@@ -70,6 +80,8 @@ def install_python(
     Args:
         python_version: full python version to install
         target_dir: filesystem path to an empty directory
+        downloader: object to download the files needed for installation.
+        nuget_sha256: optional expected hash of the nuget executable used to install python.
 
     Returns:
         filesystem path to the python executable
@@ -78,6 +90,8 @@ def install_python(
         return _install_python_windows(
             python_version=python_version,
             target_dir=target_dir,
+            downloader=downloader or Downloader(),
+            nuget_sha256=nuget_sha256,
         )
     else:
         OS.raise_unsupported()
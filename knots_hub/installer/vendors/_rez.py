@@ -4,16 +4,20 @@ import shutil
 import subprocess
 import textwrap
 from pathlib import Path
-
-from pythonning.benchmark import timeit
-from pythonning.progress import catch_download_progress
-from pythonning.web import download_file
-from pythonning.filesystem import extract_zip
+from typing import Any
+from typing import Optional
+from typing import Union
 
 from knots_hub import OS
 from knots_hub import serializelib
+from knots_hub.serializelib import UninitializedType
+from knots_hub.download import Downloader
 from ._base import BaseVendorInstaller
+from ._base import InstallStep
+from ._install import InstallStepScheduler
+from ._python import get_python_executable
 from ._python import install_python
+from ._python import NUGET_URL
 from ..._utils import format_subprocess_result
 
 LOGGER = logging.getLogger(__name__)
@@ -21,10 +25,53 @@ LOGGER = logging.getLogger(__name__)
 REZ_BASE_URL = "https://github.com/AcademySoftwareFoundation/rez/archive/refs/tags/{rez_version}.zip"
 
 
+def download_rez(
+    rez_version: str,
+    target_dir: Path,
+    downloader: Optional[Downloader] = None,
+    sha256: Optional[str] = None,
+) -> Path:
+    """
+    Download the rez sources needed by :func:`install_rez`.
+
+    Args:
+        rez_version: full rez version to download from GitHub
+        target_dir: filesystem path to the existing directory rez will be installed to.
+        downloader: object to download the files needed for installation.
+        sha256: optional expected hash of the downloaded zip file.
+
+    Returns:
+        filesystem path to the downloaded zip file in the ``target_dir``.
+    """
+    rez_url = REZ_BASE_URL.format(rez_version=rez_version)
+    rez_zip_path = target_dir / "rez.zip"
+    downloader = downloader or Downloader()
+    downloader.download(url=rez_url, target_file=rez_zip_path, sha256=sha256)
+    return rez_zip_path
+
+
+def get_rez_executable(target_dir: Path) -> Path:
+    """
+    Get the path of the rez executable created by :func:`install_rez`.
+
+    Args:
+        target_dir: filesystem path to the directory rez is installed to.
+
+    Returns:
+        filesystem path to a file that may not exist yet.
+    """
+    if OS.is_windows():
+        return target_dir / "Scripts" / "rez" / "rez.exe"
+    else:
+        return target_dir / "bin" / "rez" / "rez"
+
+
 def install_rez(
     rez_version: str,
     python_executable: Path,
     target_dir: Path,
+    downloader: Optional[Downloader] = None,
+    rez_zip_path: Optional[Path] = None,
 ) -> Path:
     """
     Create a rez installation with the given configuration.
@@ -33,22 +80,22 @@ def install_rez(
         rez_version: full rez version to download from GitHub
         python_executable: filesystem path to the python executable to install rez with.
         target_dir: filesystem path to an empty existing directory
+        downloader: object to download the files needed for installation.
+        rez_zip_path:
+            filesystem path to the rez sources returned by :func:`download_rez`.
+            Downloaded if not provided.
 
     Returns:
         filesystem path to the rez executable in the ``target_dir``.
     """
-    rez_url = REZ_BASE_URL.format(rez_version=rez_version)
+    # imported here as only needed when actually installing
+    from pythonning.filesystem import extract_zip
+
+    if not rez_zip_path:
+        rez_zip_path = download_rez(rez_version, target_dir, downloader=downloader)
+
     rez_tmp_dir = target_dir / "__installer"
     rez_tmp_dir.mkdir()
-    rez_zip_path = target_dir / "rez.zip"
-
-    LOGGER.info(f"downloading '{rez_url}' to '{rez_zip_path}' ...")
-    with catch_download_progress() as progress:
-        download_file(
-            url=rez_url,
-            target_file=rez_zip_path,
-            step_callback=progress.show_progress,
-        )
 
     rez_root = extract_zip(zip_path=rez_zip_path, remove_zip=True)
     rez_installer_path = rez_root / f"rez-{rez_version}" / "install.py"
@@ -67,10 +114,7 @@ def install_rez(
     )
     LOGGER.debug(format_subprocess_result(result))
     shutil.rmtree(rez_tmp_dir)
-    if OS.is_windows():
-        return target_dir / "Scripts" / "rez" / "rez.exe"
-    else:
-        return target_dir / "bin" / "rez" / "rez"
+    return get_rez_executable(target_dir)
 
 
 @dataclasses.dataclass
@@ -85,6 +129,23 @@ class RezVendorInstaller(BaseVendorInstaller):
     rez_version: str = serializelib.StrField(
         doc="a full valid rez version to install from the official GitHub repo."
     )
+    rez_sha256: Union[str, UninitializedType] = serializelib.StrField(
+        doc=(
+            "optional sha256 hash of the rez zip archive downloaded from GitHub. "
+            "The install fails if the downloaded file doesn't match."
+        ),
+        missing_factory=lambda: serializelib.Uninitialized,
+    )
+    nuget_sha256: Union[str, UninitializedType] = serializelib.StrField(
+        doc=(
+            "optional sha256 hash of the nuget executable downloaded to install python. "
+            "The install fails if the downloaded file doesn't match."
+        ),
+        missing_factory=lambda: serializelib.Uninitialized,
+    )
+
+    # only used to verify the downloads, changing them doesn't change the install
+    HASH_EXCLUDED_FIELDS = ("rez_sha256", "nuget_sha256")
 
     @classmethod
     def name(cls) -> str:
@@ -94,32 +155,83 @@ class RezVendorInstaller(BaseVendorInstaller):
     def version(cls) -> int:
         return 2
 
-    def install(self):
-
-        self.make_install_directories()
-
-        python_dir = self.install_dir / "python"
-        python_dir.mkdir()
-
-        # rez has its dedicated python interpreter for proper isolation
-        LOGGER.info(f"installing python-{self.python_version}")
-        with timeit("python installation took ", LOGGER.info):
-            python_exe = install_python(
-                python_version=self.python_version,
-                target_dir=python_dir,
-            )
-
-        rez_dir = self.install_dir / "rez"
-        rez_dir.mkdir()
-
-        LOGGER.info(f"installing rez-{self.version()}")
-        with timeit("rez installation took ", LOGGER.info):
-            rez_exe = install_rez(
+    def get_download_urls(self) -> list[str]:
+        return [NUGET_URL, REZ_BASE_URL.format(rez_version=self.rez_version)]
+
+    @property
+    def python_dir(self) -> Path:
+        """
+        Filesystem path to the directory of the python interpreter dedicated to rez.
+        """
+        return self.install_dir / "python"
+
+    @property
+    def rez_dir(self) -> Path:
+        """
+        Filesystem path to the directory rez is installed to.
+        """
+        return self.install_dir / "rez"
+
+    def get_artifacts(self) -> dict[str, Any]:
+        return {
+            "rez:python": get_python_executable(self.python_dir),
+            "rez:rez": get_rez_executable(self.rez_dir),
+        }
+
+    def get_install_steps(
+        self,
+        downloader: Optional[Downloader] = None,
+    ) -> list[InstallStep]:
+        # imported here as only needed when actually installing
+        from pythonning.benchmark import timeit
+
+        def _make_directories(requirements):
+            self.make_install_directories()
+            self.python_dir.mkdir()
+            self.rez_dir.mkdir()
+
+        def _install_python(requirements) -> Path:
+            # rez has its dedicated python interpreter for proper isolation
+            LOGGER.info(f"installing python-{self.python_version}")
+            with timeit("python installation took ", LOGGER.info):
+                return install_python(
+                    python_version=self.python_version,
+                    target_dir=self.python_dir,
+                    downloader=downloader,
+                    nuget_sha256=self.nuget_sha256 or None,
+                )
+
+        def _download_rez(requirements) -> Path:
+            return download_rez(
                 rez_version=self.rez_version,
-                target_dir=rez_dir,
-                python_executable=python_exe,
+                target_dir=self.rez_dir,
+                downloader=downloader,
+                sha256=self.rez_sha256 or None,
             )
 
+        def _install_rez(requirements) -> Path:
+            LOGGER.info(f"installing rez-{self.version()}")
+            with timeit("rez installation took ", LOGGER.info):
+                return install_rez(
+                    rez_version=self.rez_version,
+                    target_dir=self.rez_dir,
+                    python_executable=requirements["rez:python"],
+                    downloader=downloader,
+                    rez_zip_path=requirements["rez:download"],
+                )
+
+        # the rez sources are downloaded while python is installed
+        return [
+            InstallStep("rez:directories", _make_directories),
+            InstallStep("rez:python", _install_python, ("rez:directories",)),
+            InstallStep("rez:download", _download_rez, ("rez:directories",)),
+            InstallStep("rez:rez", _install_rez, ("rez:python", "rez:download")),
+        ]
+
+    def install(self, downloader: Optional[Downloader] = None):
+        with InstallStepScheduler() as scheduler:
+            scheduler.run(self.get_install_steps(downloader=downloader))
+
     @classmethod
     def get_documentation(cls) -> list[str]:
         doc = super().get_documentation()
@@ -1,18 +1,33 @@
 """
-An API for serialization of dataclass to and from disk as JSON.
+An API for serialization of dataclass to and from disk, as JSON or a compact binary format.
 """
 
+import abc
+import array
+import collections
+import collections.abc
 import dataclasses
+import io
+import itertools
 import json
 import logging
 import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
 import typing
+from typing import Any
 from typing import Callable
+from typing import ClassVar
+from typing import Iterator
 from typing import Optional
 from pathlib import Path
 
-from knots_hub._utils import backup_environ
+from knots_hub import _jsonstream
 from knots_hub._utils import expand_envvars
+from knots_hub._utils import expand_envvars_many
 
 LOGGER = logging.getLogger(__name__)
 
@@ -39,8 +54,43 @@ class UnserializeContext:
     """
 
     environ: dict[str, str]
+    """
+    Environment variables to resolve values with. Must not be modified once the context is created.
+    """
+
     parent_dir: Path
 
+    _expanded: dict[str, str] = dataclasses.field(
+        default_factory=dict,
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    def expandvars(self, value: str) -> str:
+        """
+        Resolve the environment variables in the given string using the context ``environ``.
+
+        See :func:`expand_envvars` for the supported patterns. Results are memoized
+        for the lifetime of the context.
+        """
+        if "$" not in value and "%" not in value:
+            return value
+        expanded = self._expanded.get(value)
+        if expanded is None:
+            expanded = expand_envvars(value, environ=self.environ)
+            self._expanded[value] = expanded
+        return expanded
+
+    def expandvars_many(self, values: typing.Iterable[str]) -> list[str]:
+        """
+        Resolve the environment variables in all the given strings using the context ``environ``.
+
+        Faster than :meth:`expandvars` on each string for large lists, as all
+        of them are resolved in a single pass. Results are not memoized.
+        """
+        return expand_envvars_many(values, environ=self.environ)
+
 
 """-------------------------------------------------------------------------------------
 Fields
@@ -78,25 +128,55 @@ def mkfield(
     unserializer: Callable[[RetT, UnserializeContext], ArgT],
     doc: str = "",
     typehint: str = "",
+    missing_factory: Optional[Callable[[], ArgT]] = None,
+    container: Optional[str] = None,
+    item_serializer: Optional[Callable] = None,
+    item_unserializer: Optional[Callable] = None,
 ):
     """
     Create a dataclass field that can be serialized and unserialized.
 
     It has a default Uninitialized value.
 
+    Fields holding a list or a dict can also declare how to convert their
+    items one by one, so they can be streamed (see :func:`write_to_disk`
+    and :func:`iter_field_from_disk`):
+
+    - ``"list"`` container: ``item_serializer(item)`` and ``item_unserializer(item, context)``
+    - ``"dict"`` container: ``item_serializer(key, value)`` and
+      ``item_unserializer(key, value, context)`` return a ``(key, value)`` tuple.
+
     Args:
         serializer: function to serialize a vlue
         unserializer: function to unserialize a value with a context
         doc: a block of rst formatted text used for static documentation.
         typehint: a string to indicate the expected type of the field once serialized.
+        missing_factory:
+            optional function returning the value to use when the field is missing
+            from the serialized representation, like if it was serialized before
+            the field was added. If not provided, a missing field raise a KeyError
+            unless the dataclass declares a ``SCHEMA_VERSION``, in which case
+            the value is Uninitialized.
+        container: "list" or "dict" if the field can be streamed item by item.
+        item_serializer: function to serialize a single item of a container field.
+        item_unserializer: function to unserialize a single item of a container field.
     """
+    if container not in (None, "list", "dict"):
+        raise ValueError(f"Unsupported container '{container}'")
     return dataclasses.field(
         metadata={
             # wrap to handle Uninitialized value
             "serialize": _serialize_uninitialized_handler(serializer),
             "unserialize": _unserialize_uninitialized_handler(unserializer),
+            # unwrapped for codecs which handle Uninitialized themselves
+            "serializer": serializer,
+            "unserializer": unserializer,
             "documentation": doc,
             "type_hint_serialized": typehint,
+            "missing_factory": missing_factory,
+            "container": container,
+            "item_serializer": item_serializer,
+            "item_unserializer": item_unserializer,
         },
         default=Uninitialized,
     )
@@ -119,54 +199,157 @@ def get_field_typehint(field: dataclasses.Field) -> str:
 # XXX: intentional break of pep8 naming to make them looks like class
 
 
-def StrField(doc=""):
+def StrField(doc="", missing_factory=None):
     def _unserialize(value, context: UnserializeContext):
         return str(value)
 
-    return mkfield(str, _unserialize, doc=doc, typehint="str")
-
+    return mkfield(
+        str,
+        _unserialize,
+        doc=doc,
+        typehint="str",
+        missing_factory=missing_factory,
+    )
 
-def _to_path(value: str, environ: Optional[dict] = None) -> Path:
-    if environ:
-        with backup_environ(clear=True):
-            os.environ.update(environ)
-            value = expand_envvars(value)
 
+def _to_path(value: str, context: Optional[UnserializeContext] = None) -> Path:
+    if context:
+        value = context.expandvars(value)
     return Path(value)
 
 
-def PathField(doc="", expandvars=False):
-    def _unserialize(value, context: UnserializeContext):
-        return _to_path(value, context.environ if expandvars else None)
+def _to_path_strs(
+    values: typing.Iterable[str],
+    context: Optional[UnserializeContext] = None,
+) -> list[str]:
+    """
+    Batch version of :func:`_to_path` which doesn't create the Path objects.
+    """
+    if context:
+        return context.expandvars_many(values)
+    return list(values)
+
+
+class PathList(collections.abc.Sequence):
+    """
+    A read-only list of filesystem paths, stored as strings until accessed.
+
+    Much more compact than a list of :class:`~pathlib.Path`, and faster to create,
+    for the large path lists of install records that are rarely iterated entirely.
+
+    It compares equal to a list of the same paths, and concatenating it with
+    a list returns a list.
+
+    Args:
+        paths: filesystem paths as strings or path-like objects.
+    """
+
+    __slots__ = ("_paths",)
+
+    def __init__(self, paths: typing.Iterable[typing.Union[str, os.PathLike]] = ()):
+        self._paths: tuple[str, ...] = tuple(map(os.fspath, paths))
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PathList(self._paths[index])
+        return Path(self._paths[index])
+
+    def __iter__(self) -> Iterator[Path]:
+        return map(Path, self._paths)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PathList):
+            other = list(other)
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __add__(self, other) -> list[Path]:
+        return list(self) + list(other)
 
-    return mkfield(str, _unserialize, doc=doc, typehint="str")
+    def __radd__(self, other) -> list[Path]:
+        return list(other) + list(self)
 
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self._paths)!r})"
 
-def FloatField(doc=""):
+    def as_strs(self) -> tuple[str, ...]:
+        """
+        Get the paths as strings, without creating any Path object.
+        """
+        return self._paths
+
+
+def PathField(doc="", expandvars=False, missing_factory=None):
+    def _unserialize(value, context: UnserializeContext):
+        return _to_path(value, context if expandvars else None)
+
+    return mkfield(
+        str,
+        _unserialize,
+        doc=doc,
+        typehint="str",
+        missing_factory=missing_factory,
+    )
+
+
+def FloatField(doc="", missing_factory=None):
 
     def _unserialize(value, context: UnserializeContext):
         return float(value)
 
-    return mkfield(float, _unserialize, doc=doc, typehint="float")
+    return mkfield(
+        float,
+        _unserialize,
+        doc=doc,
+        typehint="float",
+        missing_factory=missing_factory,
+    )
+
 
+def PathListField(doc="", expandvars=False, missing_factory=None, lazy=False):
+    """
+    A list of filesystem paths.
+
+    Args:
+        lazy:
+            True to unserialize to a :class:`PathList`, which only creates
+            the Path objects when accessed, instead of a list.
+    """
 
-def PathListField(doc="", expandvars=False):
     def _serialize(src: typing.Iterable[Path]) -> list[str]:
+        if isinstance(src, PathList):
+            return list(src.as_strs())
         return [str(path) for path in src]
 
     def _unserialize(
         src: typing.Iterable[str],
         context: UnserializeContext,
-    ) -> list[Path]:
-        return [
-            _to_path(path, environ=context.environ if expandvars else None)
-            for path in src
-        ]
-
-    return mkfield(_serialize, _unserialize, doc=doc, typehint="list[str]")
+    ) -> typing.Union[list[Path], PathList]:
+        paths = _to_path_strs(src, context if expandvars else None)
+        if lazy:
+            return PathList(paths)
+        return list(map(Path, paths))
+
+    def _unserialize_item(item: str, context: UnserializeContext) -> Path:
+        return _to_path(item, context if expandvars else None)
+
+    return mkfield(
+        _serialize,
+        _unserialize,
+        doc=doc,
+        typehint="list[str]",
+        missing_factory=missing_factory,
+        container="list",
+        item_serializer=str,
+        item_unserializer=_unserialize_item,
+    )
 
 
-def DictOfStrNPathField(doc="", expandvars=False):
+def DictOfStrNPathField(doc="", expandvars=False, missing_factory=None):
     def _serialize(src: dict[str, Path]) -> dict[str, str]:
         return {str(key): str(value) for key, value in src.items()}
 
@@ -174,12 +357,381 @@ def DictOfStrNPathField(doc="", expandvars=False):
         src: dict[str, str],
         context: UnserializeContext,
     ) -> dict[str, Path]:
+        paths = _to_path_strs(src.values(), context if expandvars else None)
+        return dict(zip(map(str, src.keys()), map(Path, paths)))
+
+    def _serialize_item(key: str, value: Path) -> tuple[str, str]:
+        return str(key), str(value)
+
+    def _unserialize_item(
+        key: str,
+        value: str,
+        context: UnserializeContext,
+    ) -> tuple[str, Path]:
+        return str(key), _to_path(value, context if expandvars else None)
+
+    return mkfield(
+        _serialize,
+        _unserialize,
+        doc=doc,
+        typehint="dict[str, str]",
+        missing_factory=missing_factory,
+        container="dict",
+        item_serializer=_serialize_item,
+        item_unserializer=_unserialize_item,
+    )
+
+
+def FileManifestField(doc="", missing_factory=None):
+    """
+    A mapping of relative file path: (file size in bytes, file hash).
+    """
+
+    def _serialize(src: dict[str, tuple[int, str]]) -> dict[str, list]:
         return {
-            str(key): _to_path(value, environ=context.environ if expandvars else None)
-            for key, value in src.items()
+            str(key): [int(size), str(filehash)]
+            for key, (size, filehash) in src.items()
         }
 
-    return mkfield(_serialize, _unserialize, doc=doc, typehint="dict[str, str]")
+    def _unserialize(
+        src: dict[str, list],
+        context: UnserializeContext,
+    ) -> dict[str, tuple[int, str]]:
+        return {
+            str(key): (int(size), str(filehash))
+            for key, (size, filehash) in src.items()
+        }
+
+    def _serialize_item(key: str, value: tuple[int, str]) -> tuple[str, list]:
+        size, filehash = value
+        return str(key), [int(size), str(filehash)]
+
+    def _unserialize_item(
+        key: str,
+        value: list,
+        context: UnserializeContext,
+    ) -> tuple[str, tuple[int, str]]:
+        size, filehash = value
+        return str(key), (int(size), str(filehash))
+
+    return mkfield(
+        _serialize,
+        _unserialize,
+        doc=doc,
+        typehint="dict[str, list[int, str]]",
+        missing_factory=missing_factory,
+        container="dict",
+        item_serializer=_serialize_item,
+        item_unserializer=_unserialize_item,
+    )
+
+
+"""-------------------------------------------------------------------------------------
+Formats
+"""
+
+
+class SerialFormat(abc.ABC):
+    """
+    Convert json-compatible dicts to and from bytes.
+    """
+
+    name: ClassVar[str]
+    """
+    Unique identifier of the format, used to select it.
+    """
+
+    magic: ClassVar[bytes] = b""
+    """
+    Bytes starting any data produced by the format, used to detect it.
+    """
+
+    @abc.abstractmethod
+    def dumps(self, content: dict) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def loads(self, data: bytes) -> dict:
+        """
+        Raises:
+            ValueError: if the data is not valid for this format.
+        """
+        pass
+
+
+class JsonFormat(SerialFormat):
+    """
+    Human-readable indented json, with sorted keys.
+    """
+
+    name = "json"
+
+    def dumps(self, content: dict) -> bytes:
+        return json.dumps(content, indent=4, sort_keys=True).encode("utf-8")
+
+    def loads(self, data: bytes) -> dict:
+        return json.loads(data)
+
+
+# number of: type tags, integers, floats, container sizes, strings, bytes of the strings
+_BINARY_HEADER = struct.Struct("<6I")
+
+_TAG_NONE = ord("N")
+_TAG_TRUE = ord("T")
+_TAG_FALSE = ord("F")
+_TAG_INT = ord("i")
+_TAG_BIGINT = ord("I")
+_TAG_FLOAT = ord("d")
+_TAG_STR = ord("s")
+_TAG_LIST = ord("l")
+_TAG_DICT = ord("m")
+
+
+def _to_little_endian(values: array.array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode: str, data: memoryview) -> array.array:
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class BinaryFormat(SerialFormat):
+    """
+    Compact binary encoding, for large contents like file manifests.
+
+    Values are stored by type in consecutive sections, each prefixed by its
+    length in the header: a one-byte type tag per value, little-endian 64-bit
+    integers and floats, 32-bit sizes of the lists and dicts, and the strings,
+    including dict keys, as their 32-bit lengths followed by a single utf-8 block.
+    Each section is decoded at once, and the values are then assembled
+    following the type tags.
+
+    The encoding is explicit so data written by a hub is readable by any other
+    hub version, whatever python version it is built with.
+    """
+
+    name = "binary"
+    magic = b"\x00KHB\x02"
+
+    def dumps(self, content: dict) -> bytes:
+        tags = bytearray()
+        ints = []
+        floats = []
+        sizes = []
+        strings = []
+
+        def _encode(value):
+            if isinstance(value, str):
+                tags.append(_TAG_STR)
+                strings.append(value)
+            elif value is None:
+                tags.append(_TAG_NONE)
+            elif value is True:
+                tags.append(_TAG_TRUE)
+            elif value is False:
+                tags.append(_TAG_FALSE)
+            elif isinstance(value, int):
+                if -(2**63) <= value < 2**63:
+                    tags.append(_TAG_INT)
+                    ints.append(value)
+                else:
+                    tags.append(_TAG_BIGINT)
+                    strings.append(str(value))
+            elif isinstance(value, float):
+                tags.append(_TAG_FLOAT)
+                floats.append(value)
+            elif isinstance(value, (list, tuple)):
+                tags.append(_TAG_LIST)
+                sizes.append(len(value))
+                for item in value:
+                    _encode(item)
+            elif isinstance(value, dict):
+                tags.append(_TAG_DICT)
+                sizes.append(len(value))
+                for key, item in value.items():
+                    if not isinstance(key, str):
+                        raise TypeError(f"keys must be str, not {type(key).__name__}")
+                    strings.append(key)
+                    _encode(item)
+            else:
+                raise TypeError(
+                    f"Object of type {type(value).__name__} is not serializable"
+                )
+
+        _encode(content)
+        text = "".join(strings).encode("utf-8")
+        return b"".join(
+            [
+                self.magic,
+                _BINARY_HEADER.pack(
+                    len(tags),
+                    len(ints),
+                    len(floats),
+                    len(sizes),
+                    len(strings),
+                    len(text),
+                ),
+                tags,
+                _to_little_endian(array.array("q", ints)),
+                _to_little_endian(array.array("d", floats)),
+                _to_little_endian(array.array("I", sizes)),
+                _to_little_endian(array.array("I", map(len, strings))),
+                text,
+            ]
+        )
+
+    def loads(self, data: bytes) -> dict:
+        if not data.startswith(self.magic):
+            raise ValueError("data doesn't start with the binary format magic bytes")
+        try:
+            content = self._decode(memoryview(data)[len(self.magic) :])
+        except (
+            struct.error,
+            StopIteration,
+            RuntimeError,
+            UnicodeDecodeError,
+        ) as error:
+            raise ValueError(f"corrupted binary data: {error!r}") from error
+        if not isinstance(content, dict):
+            raise ValueError(f"expected a dict in binary data, got {type(content)}")
+        return content
+
+    @staticmethod
+    def _decode(data: memoryview):
+        counts = _BINARY_HEADER.unpack_from(data)
+        tags_count, ints_count, floats_count, sizes_count, strings_count, text_size = (
+            counts
+        )
+        section_sizes = (
+            tags_count,
+            ints_count * 8,
+            floats_count * 8,
+            sizes_count * 4,
+            strings_count * 4,
+            text_size,
+        )
+        if _BINARY_HEADER.size + sum(section_sizes) != len(data):
+            raise ValueError("corrupted binary data: size doesn't match its header")
+
+        sections = []
+        position = _BINARY_HEADER.size
+        for section_size in section_sizes:
+            sections.append(data[position : position + section_size])
+            position += section_size
+
+        text = str(sections[5], "utf-8")
+        strings = []
+        start = 0
+        for length in _from_little_endian("I", sections[4]):
+            strings.append(text[start : start + length])
+            start += length
+
+        next_tag = iter(sections[0]).__next__
+        next_int = iter(_from_little_endian("q", sections[1])).__next__
+        next_float = iter(_from_little_endian("d", sections[2])).__next__
+        next_size = iter(_from_little_endian("I", sections[3])).__next__
+        next_string = iter(strings).__next__
+
+        def _decode():
+            tag = next_tag()
+            if tag == _TAG_STR:
+                return next_string()
+            if tag == _TAG_INT:
+                return next_int()
+            if tag == _TAG_LIST:
+                return [_decode() for _ in range(next_size())]
+            if tag == _TAG_DICT:
+                return {next_string(): _decode() for _ in range(next_size())}
+            if tag == _TAG_FLOAT:
+                return next_float()
+            if tag == _TAG_NONE:
+                return None
+            if tag == _TAG_TRUE:
+                return True
+            if tag == _TAG_FALSE:
+                return False
+            if tag == _TAG_BIGINT:
+                return int(next_string())
+            raise ValueError(f"corrupted binary data: unknown type tag {tag}")
+
+        return _decode()
+
+
+DEFAULT_FORMAT = JsonFormat.name
+"""
+Name of the format used when none is specified.
+"""
+
+_FORMATS: dict[str, SerialFormat] = {}
+
+
+def register_format(serial_format: SerialFormat):
+    """
+    Make the given format available to serialize and unserialize with.
+
+    Args:
+        serial_format: format instance whose name replace any previously registered one.
+    """
+    _FORMATS[serial_format.name] = serial_format
+
+
+def get_format(name: Optional[str] = None) -> SerialFormat:
+    """
+    Get the registered format with the given name.
+
+    Raises:
+        ValueError: if no format is registered with that name.
+
+    Args:
+        name: name of the format, the ``DEFAULT_FORMAT`` if not provided.
+    """
+    try:
+        return _FORMATS[name or DEFAULT_FORMAT]
+    except KeyError:
+        raise ValueError(
+            f"Unknown serialize format '{name}'; available are {list(_FORMATS)}"
+        ) from None
+
+
+def detect_format(data: bytes) -> SerialFormat:
+    """
+    Get the format the given data was produced with, from its magic bytes.
+
+    Data without any known magic bytes is considered to be of the ``DEFAULT_FORMAT``.
+    """
+    for serial_format in _FORMATS.values():
+        if serial_format.magic and data.startswith(serial_format.magic):
+            return serial_format
+    return get_format(DEFAULT_FORMAT)
+
+
+def dumps(content: dict, format_name: Optional[str] = None) -> bytes:
+    """
+    Convert a json-compatible dict to bytes with the given format.
+    """
+    return get_format(format_name).dumps(content)
+
+
+def loads(data: typing.Union[bytes, str]) -> dict:
+    """
+    Convert bytes, in any registered format, back to a json-compatible dict.
+
+    Raises:
+        ValueError: if the data is corrupted.
+    """
+    if isinstance(data, str):
+        return json.loads(data)
+    return detect_format(data).loads(data)
+
+
+register_format(JsonFormat())
+register_format(BinaryFormat())
 
 
 """-------------------------------------------------------------------------------------
@@ -189,33 +741,260 @@ IO
 DCT = typing.TypeVar("DCT")
 DictT = typing.TypeVar("DictT", bound=dict)
 
+SCHEMA_KEY = "__schema__"
+"""
+Key storing the schema version in the serialized representation of dataclasses declaring one.
+"""
+
+_MIGRATIONS: dict[tuple[type, int], Callable[[dict], dict]] = {}
+
+
+def get_schema_version(data_class: typing.Type) -> Optional[int]:
+    """
+    Get the version of the serialized representation of the given dataclass type.
+
+    A dataclass declare its version with a ``SCHEMA_VERSION`` class variable,
+    that must be bumped each time its serialized representation change in a
+    way that need a migration (see :func:`register_migration`).
+
+    Returns:
+        the version or None if the dataclass doesn't declare one, in which
+        case its serialized representation is not versioned.
+    """
+    return getattr(data_class, "SCHEMA_VERSION", None)
+
+
+def register_migration(
+    data_class: typing.Type,
+    from_version: int,
+    function: Callable[[dict], dict],
+):
+    """
+    Register a function converting a serialized representation to the next schema version.
+
+    When unserialized, a representation with an older version is converted by
+    each registered migration, in order, up to the current version. There is no
+    need to register a migration for a version whose only change is added fields,
+    as missing fields get their default value (see ``missing_factory`` in :func:`mkfield`).
+
+    Representations serialized before the dataclass declared a version are version 0.
+
+    Args:
+        data_class: a dataclass Class with serializelib fields and a ``SCHEMA_VERSION``.
+        from_version: version of the representation the function convert from.
+        function:
+            receive a json-compatible dict with the ``from_version`` schema
+            and return it with the ``from_version + 1`` schema.
+    """
+    _MIGRATIONS[(data_class, from_version)] = function
+
+
+class _Codec:
+    """
+    Convert instances of a dataclass type to and from their json-compatible dict representation.
+
+    The fields of the dataclass are only inspected once, at creation.
+
+    Args:
+        data_class: a dataclass Class with serializelib fields.
+    """
+
+    def __init__(self, data_class: typing.Type[DCT]):
+        self.data_class = data_class
+        fields = dataclasses.fields(data_class)
+        self.field_names: tuple[str, ...] = tuple(field.name for field in fields)
+        self.serializers: tuple[tuple[str, Callable], ...] = tuple(
+            (field.name, field.metadata["serializer"]) for field in fields
+        )
+        self.unserializers: tuple[tuple[str, Callable, Optional[Callable]], ...] = (
+            tuple(
+                (
+                    field.name,
+                    field.metadata["unserializer"],
+                    field.metadata.get("missing_factory"),
+                )
+                for field in fields
+            )
+        )
+        # (field name, container, item serializer, item unserializer)
+        self.containers: dict[str, tuple[str, Callable, Callable]] = {
+            field.name: (
+                field.metadata["container"],
+                field.metadata["item_serializer"],
+                field.metadata["item_unserializer"],
+            )
+            for field in fields
+            if field.metadata.get("container")
+        }
+        self.schema_version: Optional[int] = get_schema_version(data_class)
+
+    def encode(self, unserialized: DCT) -> dict:
+        """
+        Convert the given dataclass instance to a json-compatible dict.
+        """
+        content = {}
+        if self.schema_version is not None:
+            content[SCHEMA_KEY] = self.schema_version
+        for name, caster in self.serializers:
+            value = getattr(unserialized, name)
+            if value is Uninitialized:
+                content[name] = Uninitialized.serialized
+            else:
+                content[name] = caster(value)
+        return content
+
+    def iter_encode(self, unserialized: DCT) -> Iterator[tuple[str, typing.Any]]:
+        """
+        Convert the given dataclass instance to json-compatible keys and values, sorted by key.
+
+        The items of container fields are only converted when iterated.
+        """
+        content = {}
+        if self.schema_version is not None:
+            content[SCHEMA_KEY] = self.schema_version
+        for name, caster in self.serializers:
+            value = getattr(unserialized, name)
+            container = self.containers.get(name)
+            if value is Uninitialized:
+                content[name] = Uninitialized.serialized
+            elif container is None:
+                content[name] = caster(value)
+            elif container[0] == "list":
+                content[name] = _jsonstream.StreamedList(map(container[1], value))
+            else:
+                content[name] = _jsonstream.StreamedDict(
+                    itertools.starmap(container[1], value.items())
+                )
+        for name in sorted(content):
+            yield name, content[name]
+
+    def needs_migration(self, version: Optional[int]) -> bool:
+        """
+        True if a content with the given schema version, None if unknown, has a migration to apply.
+        """
+        if self.schema_version is None:
+            return False
+        return any(
+            data_class is self.data_class
+            and (version is None or version <= from_version < self.schema_version)
+            for data_class, from_version in _MIGRATIONS
+        )
+
+    def decode(self, content: dict, context: UnserializeContext) -> DCT:
+        """
+        Create a dataclass instance from its json-compatible dict representation.
+        """
+        content = self.migrate(content)
+        kwargs = {}
+        for name, caster, missing_factory in self.unserializers:
+            # field added after the content was serialized
+            if name not in content:
+                if missing_factory is not None:
+                    kwargs[name] = missing_factory()
+                    continue
+                # only versioned records tolerate any missing field
+                if self.schema_version is not None:
+                    continue
+            value = content[name]
+            if value == Uninitialized.serialized:
+                kwargs[name] = Uninitialized
+            else:
+                kwargs[name] = caster(value, context)
+        return self.data_class(**kwargs)
+
+    def migrate(self, content: dict) -> dict:
+        """
+        Convert the given json-compatible dict to the current schema version of the dataclass.
+        """
+        if self.schema_version is None:
+            return content
+
+        version = content.get(SCHEMA_KEY, 0)
+        if version > self.schema_version:
+            # like when going back to an older hub version; we do our best
+            LOGGER.debug(
+                f"{self.data_class.__name__} serialized with schema {version} "
+                f"newer than {self.schema_version}; ignoring unknown fields."
+            )
+            return content
+
+        while version < self.schema_version:
+            migration = _MIGRATIONS.get((self.data_class, version))
+            if migration:
+                LOGGER.debug(
+                    f"migrating {self.data_class.__name__} from schema {version}"
+                )
+                content = migration(dict(content))
+            version += 1
+        return content
+
+
+_CODECS: dict[type, _Codec] = {}
+
+
+def _get_codec(data_class: typing.Type[DCT]) -> _Codec:
+    """
+    Get the codec of the given dataclass type, created on first call.
+    """
+    codec = _CODECS.get(data_class)
+    if codec is None:
+        codec = _Codec(data_class)
+        _CODECS[data_class] = codec
+    return codec
+
 
 def unserialize(
-    serialized: str,
+    serialized: typing.Union[str, bytes],
     data_class: typing.Type[DCT],
     context: UnserializeContext,
     pre_process: Optional[Callable[[DictT], DictT]] = None,
 ) -> DCT:
     """
-    Create a dataclass instance from a serialized string representation.
+    Create a dataclass instance from a serialized representation.
+
+    A string representation is json while the format of bytes is detected (see :func:`loads`).
+
+    The serialized representation is first migrated to the current schema
+    version of the dataclass, if it declares one (see :func:`register_migration`).
+    Fields still missing get their ``missing_factory`` value, or are left to
+    their Uninitialized default for a dataclass with a schema version.
 
     Args:
         serialized: a serialized representation of an instance of the data_class arg.
         data_class: a dataclass Class with serializelib fields that must match the serialized arg.
         context: a datastructure that help resolving the instance fields values.
         pre_process: optional function to call on the json dict before it is converted to an instance.
+
+    Raises:
+        KeyError: if a field without ``missing_factory`` is missing from the
+            serialized representation of a dataclass without schema version.
     """
-    content = json.loads(serialized)
+    content = loads(serialized)
+    return _decode(content, data_class, context, pre_process=pre_process)
+
 
+def _decode(
+    content: dict,
+    data_class: typing.Type[DCT],
+    context: UnserializeContext,
+    pre_process: Optional[Callable[[DictT], DictT]] = None,
+) -> DCT:
     if pre_process:
-        content = pre_process(content)
+        # a shallow copy as the content may be cached
+        content = pre_process(dict(content))
 
-    kwargs = {}
-    for field in dataclasses.fields(data_class):
-        caster = field.metadata["unserialize"]
-        kwargs[field.name] = caster(content[field.name], context)
+    return _get_codec(data_class).decode(content, context)
 
-    return data_class(**kwargs)
+
+def _encode(
+    unserialized,
+    post_process: Optional[Callable[[DictT], DictT]] = None,
+) -> dict:
+    content = _get_codec(unserialized.__class__).encode(unserialized)
+
+    if post_process:
+        content = post_process(content)
+    return content
 
 
 def serialize(
@@ -223,23 +1002,162 @@ def serialize(
     post_process: Optional[Callable[[DictT], DictT]] = None,
 ) -> str:
     """
-    Convert a dataclass instance to a serialized string representation.
+    Convert a dataclass instance to a serialized json string representation.
 
     Args:
         unserialized: a dataclass instance with serializelib fields.
         post_process: optional function to call on the dict before it is saved to json
     """
-    content = {}
+    content = _encode(unserialized, post_process=post_process)
+    return json.dumps(content, indent=4, sort_keys=True)
 
-    for field in dataclasses.fields(unserialized):
-        caster = field.metadata["serialize"]
-        value = getattr(unserialized, field.name)
-        content[field.name] = caster(value)
 
-    if post_process:
-        content = post_process(content)
+def serialize_bytes(
+    unserialized,
+    post_process: Optional[Callable[[DictT], DictT]] = None,
+    format_name: Optional[str] = None,
+) -> bytes:
+    """
+    Convert a dataclass instance to a serialized representation in the given format.
+
+    Args:
+        unserialized: a dataclass instance with serializelib fields.
+        post_process: optional function to call on the dict before it is serialized.
+        format_name: name of a registered format, the ``DEFAULT_FORMAT`` if not provided.
+    """
+    content = _encode(unserialized, post_process=post_process)
+    return dumps(content, format_name=format_name)
 
-    return json.dumps(content, indent=4, sort_keys=True)
+
+def get_backup_path(path: Path) -> Path:
+    """
+    Get the path of the copy of the last file written by :func:`write_to_disk`.
+
+    Args:
+        path: filesystem path to a serialized disk file.
+    """
+    return path.with_name(path.name + ".backup")
+
+
+def _write_atomic(
+    path: Path,
+    content: typing.Union[bytes, Callable[[typing.BinaryIO], None]],
+):
+    """
+    Write the given bytes to the given file, without a partially written file ever existing at that path.
+
+    The content is written to a temporary file in the same directory, flushed to
+    the disk, then renamed to the final path.
+
+    Args:
+        path: filesystem path of the file to write.
+        content: bytes, or a function writing them to the given binary file object.
+    """
+    tmp_fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(tmp_fd, "wb") as file:
+            if callable(content):
+                content(file)
+            else:
+                file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+    # persist the rename itself; directories can't be opened on Windows
+    if os.name != "nt":
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class _ContentCache:
+    """
+    Keep the content of the last read files, as long as they are not modified on disk.
+
+    A file is considered unmodified if its modification time, size and inode
+    are the same as when it was read.
+
+    Args:
+        max_size: maximum number of files whose content is kept.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self._entries: collections.OrderedDict[str, tuple[tuple, dict]] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_validator(stat: os.stat_result) -> tuple:
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def read(self, path: Path) -> dict:
+        """
+        Get the json-compatible content of the given file, parsing it only if modified.
+
+        The returned dict must not be modified.
+        """
+        key = os.fspath(path)
+        with path.open("rb") as file:
+            validator = self._get_validator(os.fstat(file.fileno()))
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] == validator:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+            content = loads(file.read())
+
+        self._set(key, validator, content)
+        return content
+
+    def refresh(self, path: Path, content: dict):
+        """
+        Set the content of the given file that was just written.
+        """
+        validator = self._get_validator(os.stat(path))
+        self._set(os.fspath(path), validator, content)
+
+    def discard(self, path: Path):
+        """
+        Forget the content of the given file, like when it was written without being parsed.
+        """
+        with self._lock:
+            self._entries.pop(os.fspath(path), None)
+
+    def _set(self, key: str, validator: tuple, content: dict):
+        with self._lock:
+            self._entries[key] = (validator, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_CONTENT_CACHE = _ContentCache()
+
+
+def clear_cache():
+    """
+    Forget the content of all the files read by :func:`read_from_disk`.
+
+    Only needed if a file may have been modified without changing its
+    modification time, size or inode.
+    """
+    _CONTENT_CACHE.clear()
 
 
 def read_from_disk(
@@ -250,6 +1168,14 @@ def read_from_disk(
     """
     Create a dataclass instance from a serialized disk file.
 
+    The file format is detected from its content (see :func:`loads`).
+
+    The file is only parsed again if it was modified since the last call,
+    so reading the same file multiple times is cheap.
+
+    If the file is corrupted, like if the system crashed while it was written,
+    the backup copy of the last written file is read instead.
+
     Args:
         data_class: a dataclass class object which use serializelib fields.
         path: filesystem path to an existing file
@@ -261,40 +1187,202 @@ def read_from_disk(
         environ=os.environ.copy(),
         parent_dir=path.parent,
     )
-    return unserialize(
-        serialized=path.read_text(encoding="utf-8"),
-        data_class=data_class,
-        context=context,
-        pre_process=pre_process,
-    )
+    try:
+        return _decode(
+            _CONTENT_CACHE.read(path),
+            data_class=data_class,
+            context=context,
+            pre_process=pre_process,
+        )
+    except ValueError as error:
+        backup_path = get_backup_path(path)
+        if not backup_path.exists():
+            raise
+        LOGGER.warning(f"corrupted file '{path}' ({error}); reading '{backup_path}'")
+        try:
+            return unserialize(
+                serialized=backup_path.read_bytes(),
+                data_class=data_class,
+                context=context,
+                pre_process=pre_process,
+            )
+        except ValueError:
+            raise error
 
 
 def write_to_disk(
     data_class,
     path: Path,
     post_process: Optional[Callable[[DictT], DictT]] = None,
+    format_name: Optional[str] = None,
+    streamed: bool = False,
 ):
     """
     Write the given dataclass instance as a serialized disk file.
 
+    The write is atomic: the file either has its previous or its new content,
+    even if the process is interrupted. A backup copy is also written next to
+    it, in case the file is corrupted later.
+
+    A streamed write encodes the fields incrementally to the file, so a large
+    container field never needs a second full copy in memory, nor does the
+    serialized json string. It is only supported for the json format.
+
     Args:
         data_class: a dataclass instance object which use serializelib fields.
         path: filesystem path to file that may exist
         post_process:
             a callable called with the dict that is about to be written to disk,
             before the data_class is added.
+        format_name: name of a registered format, the ``DEFAULT_FORMAT`` if not provided.
+        streamed: True to encode the fields incrementally while they are written.
+    """
+    if streamed:
+        _write_streamed(data_class, path, post_process, format_name)
+        return
+
+    content = _encode(data_class, post_process=post_process)
+    serialized = dumps(content, format_name=format_name)
+    _write_atomic(path, serialized)
+    # so reading it back doesn't need to parse it
+    _CONTENT_CACHE.refresh(path, content)
+    # written after, so at any time one of the 2 files has the latest content
+    _write_atomic(get_backup_path(path), serialized)
+
+
+def _write_streamed(
+    data_class,
+    path: Path,
+    post_process: Optional[Callable[[DictT], DictT]],
+    format_name: Optional[str],
+):
+    if post_process:
+        raise ValueError("A streamed write doesn't support a post_process")
+    if get_format(format_name).name != JsonFormat.name:
+        raise ValueError(f"A streamed write only supports the {JsonFormat.name} format")
+
+    items = _get_codec(data_class.__class__).iter_encode(data_class)
+
+    def _dump(file: typing.BinaryIO):
+        text_file = io.TextIOWrapper(file, encoding="utf-8", newline="\n")
+        _jsonstream.dump(items, text_file)
+        text_file.flush()
+        # so closing the wrapper doesn't close the file
+        text_file.detach()
+
+    def _copy(file: typing.BinaryIO):
+        with path.open("rb") as src:
+            shutil.copyfileobj(src, file)
+
+    _CONTENT_CACHE.discard(path)
+    _write_atomic(path, _dump)
+    _write_atomic(get_backup_path(path), _copy)
+
+
+def iter_field_from_disk(
+    data_class: typing.Type[DCT],
+    path: Path,
+    field_name: str,
+) -> Iterator:
     """
-    path.write_text(
-        serialize(data_class, post_process=post_process),
-        encoding="utf-8",
+    Unserialize the items of a list or dict field of a serialized disk file, one at a time.
+
+    For json files, only the requested field is decoded and the file is read
+    by chunks, so the whole content never needs to be in memory. Files in other
+    formats, or whose schema need a migration, are entirely read first.
+
+    Nothing is yielded if the field is missing or Uninitialized.
+
+    Example::
+
+        for path in iter_field_from_disk(VendorInstallRecord, path, "extra_paths"):
+            ...
+
+    Args:
+        data_class: a dataclass class object which use serializelib fields.
+        path: filesystem path to an existing file.
+        field_name: name of a field declaring a "list" or "dict" container (see :func:`mkfield`).
+
+    Returns:
+        an iterator of the unserialized items for a list field, or of
+        ``(key, value)`` tuples for a dict field.
+    """
+    codec = _get_codec(data_class)
+    if field_name not in codec.containers:
+        raise ValueError(
+            f"Field '{field_name}' of {data_class.__name__} can't be streamed."
+        )
+    container, _, item_caster = codec.containers[field_name]
+    context = UnserializeContext(
+        environ=os.environ.copy(),
+        parent_dir=path.parent,
     )
 
+    with path.open("rb") as file:
+        head = file.read(16)
+        if detect_format(head).name == JsonFormat.name:
+            file.seek(0)
+            text_file = io.TextIOWrapper(file, encoding="utf-8")
+            items = _iter_json_field(codec, text_file, field_name, container)
+        else:
+            items = None
+
+        if items is None:
+            content = codec.migrate(_CONTENT_CACHE.read(path))
+            value = content.get(field_name, Uninitialized.serialized)
+            if value == Uninitialized.serialized:
+                return
+            items = value if container == "list" else value.items()
+
+        if container == "list":
+            for item in items:
+                yield item_caster(item, context)
+        else:
+            for key, item in items:
+                yield item_caster(key, item, context)
+
+
+def _iter_json_field(
+    codec: _Codec,
+    file: typing.TextIO,
+    field_name: str,
+    container: str,
+) -> Optional[Iterator]:
+    """
+    Returns:
+        the json-compatible items of the field, an empty iterator if the field
+        is missing, or None if the content need a migration.
+    """
+    reader = _jsonstream.JsonStreamReader(file)
+    version = None
+    for key in reader.iter_keys():
+        if key == SCHEMA_KEY:
+            version = reader.read_value()
+            continue
+        if key != field_name:
+            reader.read_value()
+            continue
+        if codec.needs_migration(version):
+            return None
+        if reader.peek() == '"':
+            # Uninitialized
+            reader.read_value()
+            return iter(())
+        if container == "list":
+            return reader.iter_array()
+        return reader.iter_items()
+
+    if codec.needs_migration(version):
+        return None
+    return iter(())
+
 
 def update_disk(
     data_class,
     path: Path,
     write_post_process: Optional[Callable[[DictT], DictT]] = None,
     read_pre_process: Optional[Callable[[DictT], DictT]] = None,
+    format_name: Optional[str] = None,
 ):
     """
     Write the given dataclass instance as a serialized disk file, updating if the file already exists.
@@ -306,14 +1394,22 @@ def update_disk(
         path: filesystem path to file that may exist
         write_post_process: pre-process for file read call
         read_pre_process: pre-process for file write call
+        format_name:
+            name of a registered format to write the file with, the
+            ``DEFAULT_FORMAT`` if not provided. The existing file can be of any format.
     """
     if path.exists():
         new = read_from_disk(data_class.__class__, path, pre_process=read_pre_process)
-        for field in dataclasses.fields(data_class):
-            value = getattr(data_class, field.name)
+        for field_name in _get_codec(data_class.__class__).field_names:
+            value = getattr(data_class, field_name)
             if value is not Uninitialized:
-                setattr(new, field.name, value)
+                setattr(new, field_name, value)
     else:
         new = data_class
 
-    write_to_disk(new, path, post_process=write_post_process)
+    write_to_disk(
+        new,
+        path,
+        post_process=write_post_process,
+        format_name=format_name,
+    )
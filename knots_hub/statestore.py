@@ -0,0 +1,486 @@
+"""
+Persist the state of the local install, like the hub and vendor install records.
+
+Records are identified by a filesystem path, which is where they are written
+when stored as individual files. A sqlite database can optionally store
+them all in a single file instead.
+"""
+
+import abc
+import contextlib
+import dataclasses
+import logging
+import os
+import sqlite3
+import threading
+import time
+import typing
+from pathlib import Path
+from typing import Iterator
+from typing import Optional
+
+from knots_hub import serializelib
+
+LOGGER = logging.getLogger(__name__)
+
+DCT = typing.TypeVar("DCT")
+
+
+@dataclasses.dataclass(frozen=True)
+class HistoryEntry:
+    """
+    A change that happened to the local install.
+    """
+
+    time: float
+    """
+    Time since epoch at which the change happened.
+    """
+
+    name: str
+    """
+    Name of what changed, like ``hub`` or a vendor name.
+    """
+
+    action: str
+    """
+    Arbitrary name of the change, like ``install`` or ``uninstall``.
+    """
+
+    version: str = ""
+    """
+    Optional version, or install hash, of what changed.
+    """
+
+
+class StateStore(abc.ABC):
+    """
+    A storage of serializelib dataclass instances identified by a filesystem path.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Release any resource held by the store. It can still be used after.
+        """
+        pass
+
+    @abc.abstractmethod
+    def exists(self, path: Path) -> bool:
+        """
+        Return True if a record is stored for the given path.
+        """
+        pass
+
+    @abc.abstractmethod
+    def read_content(self, path: Path) -> Optional[dict]:
+        """
+        Get the json-compatible representation of the record stored for the given path.
+
+        Returns:
+            the record as stored, or None if no record is stored.
+        """
+        pass
+
+    @abc.abstractmethod
+    def read(self, data_class: typing.Type[DCT], path: Path) -> DCT:
+        """
+        Get the record stored for the given path.
+
+        Args:
+            data_class: a dataclass class object which use serializelib fields.
+            path: identifier of the record
+
+        Raises:
+            FileNotFoundError: if no record is stored for the given path.
+        """
+        pass
+
+    def read_many(
+        self,
+        data_class: typing.Type[DCT],
+        paths: list[Path],
+    ) -> dict[Path, DCT]:
+        """
+        Get the records stored for all the given paths, skipping the one not stored.
+
+        Returns:
+            mapping of path: record, in the same order as the given paths.
+        """
+        records = {}
+        for path in paths:
+            try:
+                records[path] = self.read(data_class, path)
+            except FileNotFoundError:
+                continue
+        return records
+
+    @abc.abstractmethod
+    def write(self, data_class, path: Path):
+        """
+        Store the given dataclass instance for the given path, replacing any existing record.
+        """
+        pass
+
+    def update(self, data_class, path: Path):
+        """
+        Store the given dataclass instance, updating the existing record if any.
+
+        Updating means only writing non-Uninitialized value of the instance.
+        """
+        with self.transaction():
+            try:
+                new = self.read(data_class.__class__, path)
+            except FileNotFoundError:
+                new = data_class
+            else:
+                for field in dataclasses.fields(data_class):
+                    value = getattr(data_class, field.name)
+                    if value is not serializelib.Uninitialized:
+                        setattr(new, field.name, value)
+            self.write(new, path)
+
+    @abc.abstractmethod
+    def delete(self, path: Path):
+        """
+        Remove the record stored for the given path, if any.
+        """
+        pass
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Group the changes made in the context, so they are either all stored or none is.
+
+        Transactions can be nested, only the outer one is effective.
+        """
+        yield
+
+    def add_history(self, name: str, action: str, version: str = ""):
+        """
+        Record a change of the local install.
+
+        Args:
+            name: name of what changed, like ``hub`` or a vendor name.
+            action: arbitrary name of the change, like ``install`` or ``uninstall``.
+            version: optional version, or install hash, of what changed.
+        """
+        pass
+
+    def get_history(self, name: Optional[str] = None) -> list[HistoryEntry]:
+        """
+        Get the changes of the local install, oldest first.
+
+        Args:
+            name: only get the changes of what has this name.
+        """
+        return []
+
+
+class FileStateStore(StateStore):
+    """
+    Store each record in its own file at the record path.
+
+    There is no install history and transactions have no effect, but each
+    record is written atomically (see :func:`serializelib.write_to_disk`).
+
+    Args:
+        format_name:
+            name of the serializelib format to write the records with.
+            Records are read in any format.
+    """
+
+    def __init__(self, format_name: Optional[str] = None):
+        self.format_name = format_name
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} format={self.format_name}>"
+
+    def exists(self, path: Path) -> bool:
+        return path.exists()
+
+    def read_content(self, path: Path) -> Optional[dict]:
+        try:
+            return serializelib.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+
+    def read(self, data_class: typing.Type[DCT], path: Path) -> DCT:
+        return serializelib.read_from_disk(data_class, path=path)
+
+    def write(self, data_class, path: Path):
+        serializelib.write_to_disk(data_class, path=path, format_name=self.format_name)
+
+    def update(self, data_class, path: Path):
+        serializelib.update_disk(data_class, path=path, format_name=self.format_name)
+
+    def delete(self, path: Path):
+        path.unlink(missing_ok=True)
+        serializelib.get_backup_path(path).unlink(missing_ok=True)
+
+
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    content BLOB NOT NULL,
+    updated_time REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    name TEXT NOT NULL,
+    action TEXT NOT NULL,
+    version TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS history_name ON history (name);
+"""
+
+
+class SqliteStateStore(StateStore):
+    """
+    Store all the records, and the install history, in a single sqlite database.
+
+    Reading any number of records is a single query on the database primary key,
+    and changes made in a :meth:`transaction` are stored atomically.
+
+    The store can be shared between threads. Multiple processes can use the
+    same database, waiting for each other to finish writing.
+
+    Args:
+        path: filesystem path to a database file that may not exist, but whose parent must.
+        timeout: maximum number of seconds to wait for another process to finish writing.
+        format_name:
+            name of the serializelib format to store the records with.
+            Records are read in any format.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        timeout: float = 30.0,
+        format_name: Optional[str] = None,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.format_name = format_name
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} '{self.path}'>"
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+
+        LOGGER.debug(f"sqlite3.connect('{self.path}')")
+        connection = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            # transactions are explicitly handled by the store
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version > _SCHEMA_VERSION:
+                raise sqlite3.DatabaseError(
+                    f"Database '{self.path}' has schema version {version} which is "
+                    f"newer than the supported {_SCHEMA_VERSION}."
+                )
+            if version < _SCHEMA_VERSION:
+                connection.executescript(
+                    f"BEGIN IMMEDIATE;{_SCHEMA}"
+                    f"PRAGMA user_version = {_SCHEMA_VERSION};COMMIT;"
+                )
+        except BaseException:
+            connection.close()
+            raise
+        self._connection = connection
+        return connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @contextlib.contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            connection = self._connect()
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+
+            # immediate so concurrent processes wait for us to finish writing
+            connection.execute("BEGIN IMMEDIATE")
+            self._depth = 1
+            try:
+                yield
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            else:
+                connection.execute("COMMIT")
+            finally:
+                self._depth = 0
+
+    def _select_contents(self, paths: list[Path]) -> dict[str, bytes]:
+        keys = [str(path) for path in paths]
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT path, content FROM records WHERE path IN ({placeholders})",
+                keys,
+            )
+            return dict(rows.fetchall())
+
+    def exists(self, path: Path) -> bool:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM records WHERE path = ?",
+                (str(path),),
+            )
+            return row.fetchone() is not None
+
+    def read_content(self, path: Path) -> Optional[dict]:
+        content = self._select_contents([path]).get(str(path))
+        return None if content is None else serializelib.loads(content)
+
+    def read(self, data_class: typing.Type[DCT], path: Path) -> DCT:
+        records = self.read_many(data_class, [path])
+        if path not in records:
+            raise FileNotFoundError(f"No record stored for '{path}' in '{self.path}'")
+        return records[path]
+
+    def read_many(
+        self,
+        data_class: typing.Type[DCT],
+        paths: list[Path],
+    ) -> dict[Path, DCT]:
+        contents = self._select_contents(paths)
+        environ = os.environ.copy()
+        records = {}
+        for path in paths:
+            content = contents.get(str(path))
+            if content is None:
+                continue
+            context = serializelib.UnserializeContext(
+                environ=environ,
+                parent_dir=path.parent,
+            )
+            records[path] = serializelib.unserialize(
+                serialized=content,
+                data_class=data_class,
+                context=context,
+            )
+        return records
+
+    def write(self, data_class, path: Path):
+        serialized = serializelib.serialize_bytes(
+            data_class,
+            format_name=self.format_name,
+        )
+        with self.transaction():
+            self._connect().execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                (str(path), data_class.__class__.__name__, serialized, time.time()),
+            )
+
+    def delete(self, path: Path):
+        with self.transaction():
+            self._connect().execute(
+                "DELETE FROM records WHERE path = ?",
+                (str(path),),
+            )
+
+    def add_history(self, name: str, action: str, version: str = ""):
+        with self.transaction():
+            self._connect().execute(
+                "INSERT INTO history (time, name, action, version) VALUES (?, ?, ?, ?)",
+                (time.time(), name, action, version),
+            )
+
+    def get_history(self, name: Optional[str] = None) -> list[HistoryEntry]:
+        query = "SELECT time, name, action, version FROM history"
+        args = ()
+        if name is not None:
+            query += " WHERE name = ?"
+            args = (name,)
+        with self._lock:
+            rows = self._connect().execute(query + " ORDER BY id", args).fetchall()
+        return [HistoryEntry(*row) for row in rows]
+
+
+def get_state_store(
+    database_path: Optional[Path] = None,
+    format_name: Optional[str] = None,
+) -> StateStore:
+    """
+    Get the store to use to persist the state of the local install.
+
+    Args:
+        database_path:
+            filesystem path to a sqlite database that may not exist, to store
+            everything in. If not provided, each record is stored in its own file.
+        format_name: name of the serializelib format to store the records with.
+    """
+    if database_path:
+        return SqliteStateStore(database_path, format_name=format_name)
+    return FileStateStore(format_name=format_name)
+
+
+def migrate_records(
+    source: StateStore,
+    target: StateStore,
+    data_classes: dict[Path, typing.Type],
+) -> list[Path]:
+    """
+    Move the given records from a store to another.
+
+    Records are first all written to the target, in a single transaction,
+    before being deleted from the source. Records already in the target are
+    not overwritten but are still deleted from the source.
+
+    Args:
+        source: store to move the records from.
+        target: store to move the records to.
+        data_classes: mapping of record path: dataclass type of the record.
+
+    Returns:
+        path of the records that have been written to the target.
+    """
+    records = {}
+    for path, data_class in data_classes.items():
+        if target.exists(path):
+            continue
+        try:
+            records[path] = source.read(data_class, path)
+        except FileNotFoundError:
+            continue
+
+    with target.transaction():
+        for path, record in records.items():
+            LOGGER.debug(f"migrating record '{path}' from {source} to {target}")
+            target.write(record, path)
+
+    with source.transaction():
+        for path in data_classes:
+            source.delete(path)
+    return list(records)
@@ -1,16 +1,26 @@
+import concurrent.futures
+import dataclasses
 import logging
 import os
 import shutil
+import stat
 import sys
 import tempfile
 from pathlib import Path
+from typing import Iterable
+from typing import Optional
 
 import knots_hub
 from knots_hub import HubLocalFilesystem
 from knots_hub import OS
-from knots_hub.filesystem import rmtree
+from knots_hub._logging import flush_logging
+from knots_hub.filesystem import Trash
+from knots_hub.filesystem import remove_tree
 from knots_hub.installer import HubInstallRecord
 from knots_hub.installer import VendorInstallRecord
+from knots_hub.installer import get_hub_install_root
+from knots_hub.statestore import FileStateStore
+from knots_hub.statestore import StateStore
 
 LOGGER = logging.getLogger(__name__)
 
@@ -27,8 +37,8 @@ def uninstall_paths(paths: list[Path]):
     # we will let the system automatically delete the tmp directory
     uninstall_dir = Path(tempfile.mkdtemp(prefix=f"{prefix}_"))
 
-    # XXX: we cannot guarantee that all path exists at the exact moment they are deleted.
-    #   example if paths=["/foo", "/foo/bar"], "/foo" being deleted first, we can't delete "/foo/bar".
+    # nested paths would not exist anymore when their turn come
+    paths = collapse_paths(paths)
 
     if OS.is_windows():
         script_path = uninstall_dir / "uninstall.bat"
@@ -62,30 +72,218 @@ def uninstall_paths(paths: list[Path]):
         argv = [prefix, str(script_path)]
 
     LOGGER.debug(f"os.execv({exe}, {argv})")
+    # the process is replaced without the usual exit cleanup
+    flush_logging()
 
     sys.exit(os.execv(exe, argv))
 
 
-def get_paths_to_uninstall(filesystem: HubLocalFilesystem) -> list[Path]:
+def collapse_paths(paths: Iterable[Path]) -> list[Path]:
+    """
+    Remove the duplicated paths and the ones inside any other of the given paths.
+
+    Args:
+        paths: filesystem paths, which are made absolute.
+
+    Returns:
+        the remaining absolute paths, in the order they were given.
+    """
+    absolute_paths = list(dict.fromkeys(Path(os.path.abspath(path)) for path in paths))
+    kept = set()
+    # parents first, so their children can check if they are kept
+    for path in sorted(absolute_paths, key=lambda path_: len(path_.parts)):
+        if not any(parent in kept for parent in path.parents):
+            kept.add(path)
+    return [path for path in absolute_paths if path in kept]
+
+
+@dataclasses.dataclass
+class UninstallPlan:
+    """
+    The paths to remove to uninstall the hub, and the order to remove them in.
+    """
+
+    steps: list[list[Path]]
+    """
+    Paths removed by the running hub, concurrently within a step, one step after the other.
+    """
+
+    deferred: list[Path]
+    """
+    Paths removed by the script the hub hand off to when exiting, like the ones
+    holding the running executable.
+    """
+
+    @property
+    def paths(self) -> list[Path]:
+        """
+        All the paths of the plan, in their removal order.
+        """
+        return [path for step in self.steps for path in step] + self.deferred
+
+
+def plan_uninstall(
+    paths: list[Path],
+    last_paths: Iterable[Path] = (),
+    running_paths: Optional[Iterable[Path]] = None,
+) -> UninstallPlan:
+    """
+    Order the removal of the given paths, removing duplicated and nested ones.
+
+    Args:
+        paths: filesystem paths to remove.
+        last_paths:
+            paths removed in a last step, after all the others, like the ones
+            storing the install records so an interrupted uninstall can be started again.
+        running_paths:
+            filesystem paths used by the current process that can't be removed
+            until it exits. The python executable if not provided.
+
+    Returns:
+        a plan to give to :func:`uninstall`.
+    """
+    if running_paths is None:
+        running_paths = [Path(sys.executable)]
+    running_paths = [Path(os.path.abspath(path)) for path in running_paths]
+    last_paths = {Path(os.path.abspath(path)) for path in last_paths}
+
+    first, last, deferred = [], [], []
+    for path in collapse_paths(paths):
+        if any(path == running or path in running.parents for running in running_paths):
+            deferred.append(path)
+        elif path in last_paths:
+            last.append(path)
+        else:
+            first.append(path)
+
+    return UninstallPlan(
+        steps=[step for step in (first, last) if step], deferred=deferred
+    )
+
+
+def get_path_size(path: Path) -> tuple[int, int]:
+    """
+    Get the number of files and the bytes used by the given file or directory.
+
+    Symlinks are counted as files but never followed.
+
+    Returns:
+        number of files, number of bytes
+    """
+    try:
+        stat_result = os.lstat(path)
+    except FileNotFoundError:
+        return 0, 0
+    if not stat.S_ISDIR(stat_result.st_mode):
+        return 1, stat_result.st_size
+
+    files = 0
+    size = 0
+    dirs = [os.fspath(path)]
+    while dirs:
+        try:
+            entries = os.scandir(dirs.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(entry.path)
+                        continue
+                    size += entry.stat(follow_symlinks=False).st_size
+                except OSError:
+                    pass
+                files += 1
+    return files, size
+
+
+def measure_plan(
+    plan: UninstallPlan,
+    max_workers: int = 8,
+) -> dict[Path, tuple[int, int]]:
+    """
+    Get the number of files and bytes that would be freed by each path of the plan.
+
+    Args:
+        plan: as returned by :func:`plan_uninstall`.
+        max_workers: maximum number of paths measured at the same time.
+
+    Returns:
+        mapping of path: (number of files, number of bytes), in the plan order.
+    """
+    paths = plan.paths
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(get_path_size, paths)))
+
+
+def _remove_path(path: Path):
+    failures = [
+        (failed_path, error)
+        for failed_path, error in remove_tree(path).failures
+        if not isinstance(error, FileNotFoundError)
+    ]
+    if failures:
+        raise failures[0][1]
+
+
+def uninstall(plan: UninstallPlan, max_workers: int = 8):
+    """
+    Remove all the paths of the plan then exit the hub.
+
+    The paths that couldn't be removed by the hub are handed off to
+    :func:`uninstall_paths`, with the deferred ones.
+
+    Args:
+        plan: as returned by :func:`plan_uninstall`.
+        max_workers: maximum number of paths removed at the same time.
+    """
+    failed = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for step in plan.steps:
+            futures = {executor.submit(_remove_path, path): path for path in step}
+            for future in concurrent.futures.as_completed(futures):
+                path = futures[future]
+                try:
+                    future.result()
+                except OSError as error:
+                    LOGGER.debug(f"failed to remove '{path}': {error}")
+                    failed.append(path)
+                else:
+                    LOGGER.debug(f"removed '{path}'")
+
+    sys.exit(uninstall_paths(failed + plan.deferred))
+
+
+def get_paths_to_uninstall(
+    filesystem: HubLocalFilesystem,
+    store: Optional[StateStore] = None,
+) -> list[Path]:
     """
     Get all the paths that need to be removed to fully delete the hub from the local user system.
 
     Args:
         filesystem: collection of paths for storing runtime data
+        store: where the install records are stored, json files if not provided.
 
     Returns:
         list of existing filesystem path (files or directories).
     """
+    store = store or FileStateStore()
     to_uninstall = []
 
     hubrecord_path = filesystem.hubinstall_record_path
-    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
-    paths = [hubrecord.installed_path] + [filesystem.root_dir]
+    hubrecord = store.read(HubInstallRecord, hubrecord_path)
+    paths = [filesystem.root_dir]
+    if hubrecord.installed_path:
+        paths.insert(0, get_hub_install_root(hubrecord.installed_path))
     vendor_record_paths = hubrecord.vendors_record_paths
-    vendor_record_paths = vendor_record_paths.values() if vendor_record_paths else []
+    vendor_record_paths = (
+        list(vendor_record_paths.values()) if vendor_record_paths else []
+    )
 
-    for vendorrecord_path in vendor_record_paths:
-        vendorrecord = VendorInstallRecord.read_from_disk(vendorrecord_path)
+    vendorrecords = store.read_many(VendorInstallRecord, vendor_record_paths)
+    for vendorrecord in vendorrecords.values():
         paths += [vendorrecord.installed_path] + vendorrecord.extra_paths
 
     for path in paths:
@@ -96,10 +294,23 @@ def get_paths_to_uninstall(filesystem: HubLocalFilesystem) -> list[Path]:
     return to_uninstall
 
 
-def uninstall_hub_only(hubinstall_file: HubInstallRecord):
+def uninstall_hub_only(
+    hubinstall_file: HubInstallRecord,
+    trash: Optional[Trash] = None,
+):
     """
-    Only uninstall the hub but not the vendors or additional paths.
+    Only uninstall the hub (all its installed versions) but not the vendors or additional paths.
+
+    Args:
+        hubinstall_file: the install record of the hub.
+        trash:
+            where to move the install to, so it is removed later instead of now.
+            It is directly removed if it can't be moved.
     """
-    installed_path = hubinstall_file.installed_path
-    LOGGER.debug(f"rmtree('{installed_path}')")
-    rmtree(installed_path)
+    install_root = get_hub_install_root(hubinstall_file.installed_path)
+    if trash and trash.move(install_root):
+        return
+    LOGGER.debug(f"remove_tree('{install_root}')")
+    failures = remove_tree(install_root).failures
+    if failures:
+        raise failures[0][1]
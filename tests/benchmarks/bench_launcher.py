@@ -0,0 +1,102 @@
+"""
+Compare the time it takes from a fresh server process start to the hand-off to
+the local hub install, with and without the fast launcher.
+
+The local install is faked and the hand-off subprocess is patched to exit
+immediately, so only the server runtime is measured.
+
+Usage::
+
+    python ./tests/benchmarks/bench_launcher.py [iterations]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import knots_hub
+from knots_hub.installer import HubInstallRecord
+from knots_hub.installer import get_hub_version_dir
+
+# executed in a fresh interpreter, exit as soon as the local hub is started
+DRIVER = """
+import runpy
+import subprocess
+import sys
+
+def _handoff(*args, **kwargs):
+    sys.exit(0)
+
+subprocess.run = _handoff
+
+import knots_hub.constants
+# the full runtime refuses to run on unsupported systems
+knots_hub.constants.OS._current = "win32"
+
+sys.argv = ["knots_hub", "about"]
+runpy.run_module("knots_hub", run_name="__main__")
+"""
+
+
+def measure(environ: dict[str, str], iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start_time = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", DRIVER],
+            env=environ,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start_time)
+    return timings
+
+
+def main(iterations: int = 20):
+    tmp_dir = Path(tempfile.mkdtemp(prefix="knots_hub_bench_"))
+    install_dir = tmp_dir / "hub"
+    data_dir = tmp_dir / "data"
+    data_dir.mkdir()
+
+    version = "1.0.0"
+    version_dir = get_hub_version_dir(install_dir, version)
+    version_dir.mkdir(parents=True)
+    exe_path = version_dir / knots_hub.constants.EXECUTABLE_NAME
+    exe_path.write_text("fake executable")
+
+    HubInstallRecord(
+        installed_time=time.time(),
+        installed_version=version,
+        installed_path=version_dir,
+        vendors_record_paths={},
+        installed_manifest={},
+    ).write_to_disk(data_dir / ".hubinstall")
+
+    environ = os.environ.copy()
+    environ.pop(knots_hub.Environ.IS_RESTARTED, None)
+    environ[knots_hub.Environ.USER_INSTALL_PATH] = str(install_dir)
+    environ[knots_hub.Environ.INSTALLER] = f"{version}={tmp_dir}"
+    environ[knots_hub.Environ.RUNTIME_STORAGE_ROOT] = str(data_dir)
+
+    fast_timings = measure(environ, iterations)
+    environ[knots_hub.Environ.DISABLE_FAST_LAUNCH] = "1"
+    full_timings = measure(environ, iterations)
+
+    fast = statistics.median(fast_timings)
+    full = statistics.median(full_timings)
+    print(f"iterations: {iterations}")
+    print(
+        f"full runtime: median={full * 1000:.1f}ms min={min(full_timings) * 1000:.1f}ms"
+    )
+    print(
+        f"fast launch : median={fast * 1000:.1f}ms min={min(fast_timings) * 1000:.1f}ms"
+    )
+    print(f"speedup     : x{full / fast:.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
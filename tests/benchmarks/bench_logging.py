@@ -0,0 +1,92 @@
+"""
+Compare the number of records per second formatted by the terminal formatter
+of the hub and by its previous implementation.
+
+Usage::
+
+    python ./tests/benchmarks/bench_logging.py [records]
+"""
+
+import logging
+import sys
+import timeit
+
+from knots_hub._logging import ColoredFormatter
+from knots_hub._logging import Colors
+
+FORMAT = (
+    "{level_color}{levelname: <7}{reset}{white_faint} | {asctime} "
+    "[{name}]{reset}{level_color} {message}"
+)
+
+
+class LegacyColoredFormatter(logging.Formatter):
+    """
+    The previous implementation, setting every color on each record.
+    """
+
+    COLOR_BY_LEVEL = ColoredFormatter.COLOR_BY_LEVEL
+
+    def __init__(self, disable_coloring: bool = False, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._disable_coloring = disable_coloring
+
+    def format(self, record):
+        on = not self._disable_coloring
+        level_color = self.COLOR_BY_LEVEL.get(record.levelno, None)
+        if level_color:
+            record.level_color = level_color.value if on else ""
+        for color in Colors:
+            setattr(record, color.name, color.value if on else "")
+
+        message = super().format(record)
+        if not message.endswith(Colors.reset.value) and on:
+            message += Colors.reset.value
+        return message
+
+
+def create_records(count: int) -> list[logging.LogRecord]:
+    levels = [logging.DEBUG] * 8 + [logging.INFO, logging.WARNING]
+    return [
+        logging.makeLogRecord(
+            {
+                "name": "knots_hub.installer",
+                "levelno": levels[index % len(levels)],
+                "levelname": logging.getLevelName(levels[index % len(levels)]),
+                "msg": "copied '%s' (%s bytes)",
+                "args": (f"lib/package/module{index}.pyd", index),
+            }
+        )
+        for index in range(count)
+    ]
+
+
+def measure(label: str, formatter: logging.Formatter, records) -> float:
+    timings = timeit.repeat(
+        lambda: [formatter.format(record) for record in records],
+        number=1,
+        repeat=5,
+    )
+    speed = len(records) / min(timings)
+    print(f"{label:<40}: {speed:,.0f} records/s")
+    return speed
+
+
+def main(count: int = 50000):
+    records = create_records(count)
+    print(f"records: {count}")
+    for disable_coloring in (False, True):
+        kwargs = {"disable_coloring": disable_coloring, "fmt": FORMAT, "style": "{"}
+        legacy = LegacyColoredFormatter(**kwargs)
+        formatter = ColoredFormatter(**kwargs)
+        for record in records[:20]:
+            assert formatter.format(record) == legacy.format(record)
+
+        suffix = "no coloring" if disable_coloring else "coloring"
+        legacy_speed = measure(f"legacy {suffix}", legacy, records)
+        speed = measure(f"precompiled {suffix}", formatter, records)
+        print(f"{'speedup ' + suffix:<40}: x{speed / legacy_speed:.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
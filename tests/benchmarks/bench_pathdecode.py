@@ -0,0 +1,83 @@
+"""
+Compare the per-path and the batch decoding of serializelib path fields,
+on a list of paths like the ones of a large vendor install.
+
+Usage::
+
+    python ./tests/benchmarks/bench_pathdecode.py [paths] [iterations]
+"""
+
+import dataclasses
+import sys
+import timeit
+from pathlib import Path
+
+from knots_hub import serializelib
+from knots_hub._utils import expand_envvars
+
+
+@dataclasses.dataclass
+class SomeRecord:
+    paths: list[Path] = serializelib.PathListField(expandvars=True)
+    lazy_paths: list[Path] = serializelib.PathListField(expandvars=True, lazy=True)
+
+
+def create_paths(count: int) -> list[str]:
+    paths = []
+    for index in range(count):
+        path = f"lib/package{index % 200}/module{index}.pyd"
+        # only a few paths use variables, like in real records
+        if index % 20 == 0:
+            path = f"$KNOTS_ROOT/{path}"
+        paths.append(path)
+    return paths
+
+
+def decode_per_path(paths: list[str], environ: dict[str, str]) -> list[Path]:
+    # the previous implementation, without memoization
+    return [Path(expand_envvars(path, environ=environ)) for path in paths]
+
+
+def measure(label: str, function, iterations: int) -> float:
+    timings = timeit.repeat(function, number=iterations, repeat=5)
+    best = min(timings) / iterations
+    print(f"{label:<40}: {best * 1000:.2f}ms")
+    return best
+
+
+def main(count: int = 100000, iterations: int = 5):
+    environ = {"KNOTS_ROOT": "/opt/knots"}
+    paths = create_paths(count)
+    fields = {field.name: field for field in dataclasses.fields(SomeRecord)}
+    unserialize = fields["paths"].metadata["unserializer"]
+    unserialize_lazy = fields["lazy_paths"].metadata["unserializer"]
+
+    def _context():
+        return serializelib.UnserializeContext(environ=environ, parent_dir=Path())
+
+    expected = decode_per_path(paths, environ)
+    assert unserialize(paths, _context()) == expected
+    assert unserialize_lazy(paths, _context()) == expected
+
+    print(f"paths: {count}, iterations: {iterations}")
+    per_path = measure("per path", lambda: decode_per_path(paths, environ), iterations)
+    batch = measure("batch", lambda: unserialize(paths, _context()), iterations)
+    lazy = measure(
+        "batch lazy", lambda: unserialize_lazy(paths, _context()), iterations
+    )
+    measure(
+        "per path expand only",
+        lambda: [expand_envvars(path, environ=environ) for path in paths],
+        iterations,
+    )
+    measure(
+        "batch expand only",
+        lambda: _context().expandvars_many(paths),
+        iterations,
+    )
+    print(f"{'batch speedup':<40}: x{per_path / batch:.2f}")
+    print(f"{'batch lazy speedup':<40}: x{per_path / lazy:.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,80 @@
+"""
+Compare the size and the speed of the serializelib formats on a hub record
+storing a large manifest, like the one of a hub build with many files.
+
+Usage::
+
+    python ./tests/benchmarks/bench_serializeformats.py [files] [iterations]
+"""
+
+import hashlib
+import sys
+import time
+import timeit
+from pathlib import Path
+
+from knots_hub import serializelib
+from knots_hub.installer import HubInstallRecord
+
+
+def create_record(files: int) -> HubInstallRecord:
+    manifest = {}
+    for index in range(files):
+        relpath = f"lib/package{index % 200}/module{index}.pyd"
+        filehash = hashlib.sha256(relpath.encode("utf-8")).hexdigest()
+        manifest[relpath] = (index * 37 % 1_000_000, filehash)
+
+    return HubInstallRecord(
+        installed_time=time.time(),
+        installed_version="1.2.3",
+        installed_path=Path("/opt/knots-hub/hub-1.2.3"),
+        vendors_record_paths={"rez": Path("/opt/vendors/rez/.vendorrecord")},
+        installed_manifest=manifest,
+    )
+
+
+def measure(label: str, function, iterations: int) -> float:
+    timings = timeit.repeat(function, number=iterations, repeat=5)
+    best = min(timings) / iterations
+    print(f"{label:<40}: {best * 1000:.2f}ms")
+    return best
+
+
+def main(files: int = 50000, iterations: int = 5):
+    context = serializelib.UnserializeContext(environ={}, parent_dir=Path())
+    record = create_record(files)
+
+    print(f"files: {files}, iterations: {iterations}")
+    results = {}
+    for format_name in ("json", "binary"):
+        serialized = serializelib.serialize_bytes(record, format_name=format_name)
+        assert serializelib.unserialize(serialized, HubInstallRecord, context) == record
+
+        print(f"{format_name + ' size':<40}: {len(serialized) / 1024:.1f}KB")
+        measure(
+            f"{format_name} serialize",
+            lambda: serializelib.serialize_bytes(record, format_name=format_name),
+            iterations,
+        )
+        measure(
+            f"{format_name} parse",
+            lambda: serializelib.loads(serialized),
+            iterations,
+        )
+        results[format_name] = (
+            len(serialized),
+            measure(
+                f"{format_name} unserialize",
+                lambda: serializelib.unserialize(serialized, HubInstallRecord, context),
+                iterations,
+            ),
+        )
+
+    json_size, json_time = results["json"]
+    binary_size, binary_time = results["binary"]
+    print(f"{'size ratio':<40}: x{json_size / binary_size:.2f}")
+    print(f"{'unserialize speedup':<40}: x{json_time / binary_time:.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,110 @@
+"""
+Compare the conversion of records to and from their serialized dict
+representation, between the precompiled codecs of serializelib and a
+reflection of the dataclass fields at each call.
+
+Usage::
+
+    python ./tests/benchmarks/bench_serializelib.py [iterations]
+"""
+
+import dataclasses
+import sys
+import time
+import timeit
+from pathlib import Path
+
+from knots_hub import serializelib
+from knots_hub.installer import HubInstallRecord
+from knots_hub.installer import VendorInstallRecord
+
+
+def reflective_encode(unserialized) -> dict:
+    # how serializelib used to work before codecs
+    content = {}
+    schema_version = serializelib.get_schema_version(unserialized.__class__)
+    if schema_version is not None:
+        content[serializelib.SCHEMA_KEY] = schema_version
+    for field in dataclasses.fields(unserialized):
+        caster = field.metadata["serialize"]
+        content[field.name] = caster(getattr(unserialized, field.name))
+    return content
+
+
+def reflective_decode(content: dict, data_class, context):
+    kwargs = {}
+    for field in dataclasses.fields(data_class):
+        if field.name not in content:
+            continue
+        caster = field.metadata["unserialize"]
+        kwargs[field.name] = caster(content[field.name], context)
+    return data_class(**kwargs)
+
+
+def measure(label: str, function, iterations: int) -> float:
+    timings = timeit.repeat(function, number=iterations, repeat=5)
+    best = min(timings) / iterations
+    print(f"{label:<40}: {best * 1_000_000:.2f}us")
+    return best
+
+
+def main(iterations: int = 20000):
+    context = serializelib.UnserializeContext(environ={}, parent_dir=Path())
+    records = [
+        HubInstallRecord(
+            installed_time=time.time(),
+            installed_version="1.2.3",
+            installed_path=Path("/opt/knots-hub/hub-1.2.3"),
+            vendors_record_paths={
+                "rez": Path("/opt/vendors/rez/.vendorrecord"),
+                "knots": Path("/opt/vendors/knots/.vendorrecord"),
+            },
+            installed_manifest={
+                "knots_hub.exe": (4096, "abcdef"),
+                "python311.dll": (8192, "012345"),
+            },
+        ),
+        VendorInstallRecord(
+            name="rez",
+            installed_time=time.time(),
+            install_hash="b83747f87badc05d65c8abfdffdb4ce8",
+            installed_path=Path("/opt/vendors/rez"),
+            extra_paths=[Path("/opt/vendors"), Path("/opt/.vendorroot")],
+        ),
+    ]
+
+    print(f"iterations: {iterations}")
+    for record in records:
+        data_class = record.__class__
+        name = data_class.__name__
+        content = reflective_encode(record)
+        codec = serializelib._get_codec(data_class)
+        assert codec.encode(record) == content
+        assert codec.decode(content, context) == record
+
+        before = measure(
+            f"{name} encode (reflection)",
+            lambda: reflective_encode(record),
+            iterations,
+        )
+        after = measure(
+            f"{name} encode (codec)",
+            lambda: codec.encode(record),
+            iterations,
+        )
+        print(f"{'speedup':<40}: x{before / after:.2f}")
+        before = measure(
+            f"{name} decode (reflection)",
+            lambda: reflective_decode(content, data_class, context),
+            iterations,
+        )
+        after = measure(
+            f"{name} decode (codec)",
+            lambda: codec.decode(content, context),
+            iterations,
+        )
+        print(f"{'speedup':<40}: x{before / after:.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
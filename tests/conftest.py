@@ -1,4 +1,9 @@
+import dataclasses
+import functools
+import http.server
+import threading
 from pathlib import Path
+from typing import Optional
 
 import pytest
 
@@ -8,3 +13,88 @@ _THISDIR = Path(__file__).parent
 @pytest.fixture()
 def data_dir():
     return _THISDIR / "data"
+
+
+@dataclasses.dataclass
+class HttpServer:
+    url: str
+    root_dir: Path
+    requests: list[str]
+    ranges: list[Optional[str]] = dataclasses.field(default_factory=list)
+    """
+    The Range header of each request, None if not specified.
+    """
+    support_range: bool = True
+    """
+    True to answer Range requests with partial content, else the full content is sent.
+    """
+    drop_after: dict[str, int] = dataclasses.field(default_factory=dict)
+    """
+    Mapping of url path: number of bytes sent before dropping the connection, for the next request only.
+    """
+    errors: dict[str, int] = dataclasses.field(default_factory=dict)
+    """
+    Mapping of url path: http error status to answer the next request with.
+    """
+
+
+@pytest.fixture()
+def http_server(tmp_path):
+    """
+    A local http server serving the files of a temporary directory.
+    """
+    root_dir = tmp_path / "http.root"
+    root_dir.mkdir()
+    state = HttpServer(url="", root_dir=root_dir, requests=[])
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def do_GET(self):
+            state.requests.append(self.path)
+            byte_range = self.headers.get("Range")
+            state.ranges.append(byte_range)
+
+            error = state.errors.pop(self.path, None)
+            if error:
+                self.send_error(error)
+                return
+
+            path = Path(self.translate_path(self.path))
+            if not path.is_file():
+                self.send_error(404)
+                return
+
+            content = path.read_bytes()
+            start = 0
+            if byte_range and state.support_range:
+                start = int(byte_range.removeprefix("bytes=").rstrip("-"))
+                self.send_response(206)
+                self.send_header(
+                    "Content-Range",
+                    f"bytes {start}-{len(content) - 1}/{len(content)}",
+                )
+            else:
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(content) - start))
+            self.end_headers()
+
+            content = content[start:]
+            drop_after = state.drop_after.pop(self.path, None)
+            if drop_after is not None:
+                self.wfile.write(content[:drop_after])
+                self.close_connection = True
+                return
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):
+            pass
+
+    handler = functools.partial(Handler, directory=str(root_dir))
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        yield state
+    finally:
+        server.shutdown()
+        server.server_close()
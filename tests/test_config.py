@@ -0,0 +1,35 @@
+import pytest
+
+import knots_hub
+from knots_hub.config import HubConfig
+
+
+def test__HubConfig__record_format(tmp_path, monkeypatch):
+    monkeypatch.setenv(knots_hub.Environ.USER_INSTALL_PATH, str(tmp_path))
+
+    monkeypatch.setenv(knots_hub.Environ.RECORD_FORMAT, "binary")
+    assert HubConfig.from_environment().record_format == "binary"
+
+    monkeypatch.setenv(knots_hub.Environ.RECORD_FORMAT, "jsn")
+    with pytest.raises(ValueError, match="RECORD_FORMAT"):
+        HubConfig.from_environment()
+
+
+@pytest.mark.parametrize(
+    "environ",
+    [knots_hub.Environ.COPY_WORKERS, knots_hub.Environ.VENDOR_WORKERS],
+)
+def test__HubConfig__workers(tmp_path, monkeypatch, environ):
+    monkeypatch.setenv(knots_hub.Environ.USER_INSTALL_PATH, str(tmp_path))
+
+    monkeypatch.setenv(environ, "2")
+    HubConfig.from_environment()
+
+    for value in ("0", "-1", "two"):
+        monkeypatch.setenv(environ, value)
+        with pytest.raises(ValueError):
+            HubConfig.from_environment()
+
+    monkeypatch.setenv(environ, "0")
+    with pytest.raises(ValueError, match=environ):
+        HubConfig.from_environment()
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import urllib.error
+from pathlib import Path
+
+import pytest
+
+from knots_hub.download import DownloadCache
+from knots_hub.download import Downloader
+from knots_hub.download import IntegrityError
+from knots_hub.download import get_mirror_source
+from knots_hub.download import populate_mirror
+
+
+def test__DownloadCache__evict(tmp_path):
+    cache = DownloadCache(tmp_path / "cache", max_size=10)
+    src_path = tmp_path / "file.bin"
+
+    src_path.write_bytes(b"0" * 4)
+    cache.add("https://foo/1", src_path)
+    cache.add("https://foo/2", src_path)
+    os.utime(cache.get("https://foo/1"), (0, 0))
+    os.utime(cache.get("https://foo/2"), (1, 1))
+    # mark as recently used
+    assert cache.get("https://foo/1")
+
+    cache.add("https://foo/3", src_path)
+    assert cache.get("https://foo/1")
+    assert not cache.get("https://foo/2")
+    assert cache.get("https://foo/3")
+
+    sha256 = hashlib.sha256(b"0" * 4).hexdigest()
+    assert not cache.get("https://foo/1", sha256=sha256)
+
+
+def test__Downloader(tmp_path, http_server):
+    content = b"rez archive" * 1000
+    (http_server.root_dir / "rez.zip").write_bytes(content)
+    url = f"{http_server.url}/rez.zip"
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    cache = DownloadCache(tmp_path / "cache", max_size=1024 * 1024)
+    downloader = Downloader(cache=cache)
+
+    target_path = tmp_path / "rez.zip"
+    downloader.download(url, target_path, sha256=sha256)
+    assert target_path.read_bytes() == content
+    assert len(http_server.requests) == 1
+
+    target_path.unlink()
+    downloader.download(url, target_path, sha256=sha256)
+    assert target_path.read_bytes() == content
+    assert len(http_server.requests) == 1
+
+    with pytest.raises(IntegrityError):
+        Downloader().download(url, tmp_path / "rez2.zip", sha256="abcdef")
+    assert not (tmp_path / "rez2.zip").exists()
+
+
+def test__Downloader__mirror(tmp_path, http_server):
+    content = b"rez archive" * 1000
+    (http_server.root_dir / "rez.zip").write_bytes(content)
+    url = f"{http_server.url}/rez.zip"
+    missing_content = b"nuget"
+    (http_server.root_dir / "nuget.exe").write_bytes(missing_content)
+    missing_url = f"{http_server.url}/nuget.exe"
+
+    mirror_dir = http_server.root_dir / "mirror"
+    mirror_dir.mkdir()
+    added = populate_mirror(mirror_dir, [url])
+    assert len(added) == 1
+    assert added[0].read_bytes() == content
+    assert http_server.requests == ["/rez.zip"]
+    assert added[0] == Path(get_mirror_source(str(mirror_dir), url))
+    assert not populate_mirror(mirror_dir, [url])
+
+    # filesystem mirror
+    http_server.requests.clear()
+    downloader = Downloader(mirror=str(mirror_dir))
+    downloader.download(url, tmp_path / "rez.zip")
+    assert (tmp_path / "rez.zip").read_bytes() == content
+    assert http_server.requests == []
+
+    downloader.download(missing_url, tmp_path / "nuget.exe")
+    assert (tmp_path / "nuget.exe").read_bytes() == missing_content
+    assert http_server.requests == ["/nuget.exe"]
+
+    # http mirror
+    http_server.requests.clear()
+    downloader = Downloader(mirror=f"{http_server.url}/mirror")
+    downloader.download(url, tmp_path / "rez.2.zip")
+    assert (tmp_path / "rez.2.zip").read_bytes() == content
+    assert len(http_server.requests) == 1
+    assert http_server.requests[0].startswith("/mirror/")
+
+
+def test__Downloader__resume(tmp_path, http_server):
+    content = os.urandom(3 * 1024 * 1024 + 10)
+    (http_server.root_dir / "rez.zip").write_bytes(content)
+    url = f"{http_server.url}/rez.zip"
+    sha256 = hashlib.sha256(content).hexdigest()
+    downloader = Downloader(retries=2, retry_delay=0.01)
+
+    http_server.drop_after["/rez.zip"] = 1024 * 1024 + 5
+    target_path = tmp_path / "rez.zip"
+    downloader.download(url, target_path, sha256=sha256)
+    assert target_path.read_bytes() == content
+    assert http_server.ranges == [None, f"bytes={1024 * 1024 + 5}-"]
+
+    # server not supporting resume
+    http_server.ranges.clear()
+    http_server.support_range = False
+    http_server.drop_after["/rez.zip"] = 2048
+    target_path = tmp_path / "rez.2.zip"
+    downloader.download(url, target_path, sha256=sha256)
+    assert target_path.read_bytes() == content
+    assert http_server.ranges == [None, "bytes=2048-"]
+
+    # temporary errors are retried
+    http_server.ranges.clear()
+    http_server.errors["/rez.zip"] = 503
+    target_path = tmp_path / "rez.3.zip"
+    downloader.download(url, target_path, sha256=sha256)
+    assert target_path.read_bytes() == content
+    assert len(http_server.ranges) == 2
+
+    # permanent errors are not retried
+    http_server.requests.clear()
+    with pytest.raises(urllib.error.HTTPError):
+        downloader.download(f"{http_server.url}/missing.zip", tmp_path / "missing")
+    assert len(http_server.requests) == 1
+    assert not (tmp_path / "missing").exists()
@@ -126,7 +126,9 @@ def test__main__full(monkeypatch, data_dir, tmp_path, caplog):
     with pytest.raises(SystemExit):
         knots_hub.__main__.main(argv=argv)
 
-    expected_local_exe = install_dir / exe_name
+    expected_local_exe = (
+        knots_hub.installer.get_hub_version_dir(install_dir, "testversion") / exe_name
+    )
     assert expected_local_exe.exists()
     assert SubprocessPatcher.called is True
     assert SubprocessPatcher.exe == expected_local_exe
@@ -146,6 +148,11 @@ def test__main__full(monkeypatch, data_dir, tmp_path, caplog):
         "install_rez",
         InstallRezPatcher.patch,
     )
+    monkeypatch.setattr(
+        knots_hub.installer.vendors._rez,
+        "download_rez",
+        InstallRezPatcher.patch,
+    )
 
     class InstallPythonPatcher:
         called = False
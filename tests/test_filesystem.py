@@ -1,6 +1,15 @@
+import os
+import subprocess
+import sys
 from pathlib import Path
 
+import pytest
+
 from knots_hub import filesystem
+from knots_hub.filesystem import FileLock
+from knots_hub.filesystem import LockTimeoutError
+
+_REPO_ROOT = Path(__file__).parent.parent
 
 
 def test__is_runtime_from_local_install(monkeypatch):
@@ -8,3 +17,140 @@ def test__is_runtime_from_local_install(monkeypatch):
     local_exe = Path(r"C:\Users\lcoll\AppData\Local\knots-hub\knots_hub-v0.7.0.exe")
     monkeypatch.setattr(filesystem, "INTERPRETER_PATH", str(local_exe))
     assert filesystem.is_runtime_from_local_install(local_install)
+
+
+def test__FileLock(tmp_path):
+    lock_path = tmp_path / "install.lock"
+    # a stale lock file left by a crashed process
+    lock_path.write_text('{"pid": 123456789}', encoding="utf-8")
+
+    lock1 = FileLock(lock_path, timeout=0.2, poll_interval=0.01)
+    lock2 = FileLock(lock_path, timeout=0.2, poll_interval=0.01)
+    with lock1:
+        assert lock1.is_locked
+        assert lock1.get_holder()["pid"] == os.getpid()
+        with pytest.raises(LockTimeoutError):
+            lock2.acquire()
+        assert not lock2.is_locked
+
+    with lock2:
+        assert lock2.is_locked
+    assert not lock2.is_locked
+
+
+def test__FileLock__process(tmp_path):
+    lock_path = tmp_path / "install.lock"
+    script = (
+        "import sys, time\n"
+        "from pathlib import Path\n"
+        "from knots_hub.filesystem import FileLock\n"
+        f"lock = FileLock(Path(r'{lock_path}'))\n"
+        "lock.acquire()\n"
+        "print('locked', flush=True)\n"
+        "time.sleep(float(sys.argv[1]))\n"
+    )
+
+    # wait for the other process to release the lock
+    process = subprocess.Popen(
+        [sys.executable, "-c", script, "0.5"],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=_REPO_ROOT,
+    )
+    assert process.stdout.readline().strip() == "locked"
+    lock = FileLock(lock_path, timeout=0.1, poll_interval=0.01)
+    # the holder information stays readable while the file is locked
+    assert lock.get_holder()["pid"] == process.pid
+    with pytest.raises(LockTimeoutError, match=f"'pid': {process.pid}"):
+        lock.acquire()
+    with FileLock(lock_path, timeout=10, poll_interval=0.01):
+        assert process.poll() is not None
+    process.wait()
+
+    # a process dying doesn't leave a stale lock
+    process = subprocess.Popen(
+        [sys.executable, "-c", script, "60"],
+        stdout=subprocess.PIPE,
+        text=True,
+        cwd=_REPO_ROOT,
+    )
+    assert process.stdout.readline().strip() == "locked"
+    process.kill()
+    process.wait()
+    with FileLock(lock_path, timeout=1, poll_interval=0.01) as lock:
+        assert lock.is_locked
+
+
+def test__Trash(tmp_path):
+    trash = filesystem.Trash(tmp_path / "trash", tmp_path / "trash.lock")
+    assert trash.purge() == 0
+
+    install_dir = tmp_path / "install"
+    (install_dir / "lib").mkdir(parents=True)
+    (install_dir / "lib" / "python.dll").write_text("dll")
+    readonly_file = install_dir / "lib" / "readonly.pyd"
+    readonly_file.write_text("pyd")
+    readonly_file.chmod(0o444)
+    some_file = tmp_path / "some_file.txt"
+    some_file.write_text("txt")
+
+    assert trash.move(install_dir)
+    assert trash.move(some_file)
+    assert not install_dir.exists()
+    assert not some_file.exists()
+    assert not trash.move(tmp_path / "missing")
+
+    # same name trashed again
+    install_dir.mkdir()
+    assert trash.move(install_dir)
+    assert len(list(trash.trash_dir.iterdir())) == 3
+
+    # another process is purging
+    with FileLock(trash.lock_path):
+        assert trash.purge() == 0
+
+    # interrupted in the middle of a previous purge
+    trashed = sorted(trash.trash_dir.iterdir())[0]
+    (trashed / "lib" / "python.dll").unlink()
+
+    assert trash.purge() == 3
+    assert not list(trash.trash_dir.iterdir())
+
+
+def test__remove_tree(tmp_path):
+    outside_dir = tmp_path / "outside"
+    outside_dir.mkdir()
+    (outside_dir / "keep.txt").write_text("keep")
+
+    root_dir = tmp_path / "python"
+    for index in range(30):
+        package_dir = root_dir / "lib" / f"package{index}"
+        package_dir.mkdir(parents=True)
+        for file_index in range(10):
+            Path(package_dir, f"module{file_index}.py").write_text("0" * file_index)
+    (root_dir / "empty").mkdir()
+    (root_dir / "link").symlink_to(outside_dir, target_is_directory=True)
+    readonly_dir = root_dir / "lib" / "package0"
+    readonly_file = readonly_dir / "module1.py"
+    readonly_file.chmod(0o444)
+    readonly_dir.chmod(0o555)
+
+    stats = filesystem.remove_tree(root_dir, max_workers=4)
+    assert not root_dir.exists()
+    assert (outside_dir / "keep.txt").exists()
+    assert not stats.failures
+    # 300 modules and the symlink
+    assert stats.files == 301
+    assert stats.bytes == 30 * sum(range(10))
+    # root, lib, empty and the 30 packages
+    assert stats.dirs == 33
+    assert stats.elapsed > 0
+
+    some_file = tmp_path / "some_file.txt"
+    some_file.write_text("txt")
+    stats = filesystem.remove_tree(some_file)
+    assert (stats.files, stats.bytes) == (1, 3)
+    assert not some_file.exists()
+
+    stats = filesystem.remove_tree(tmp_path / "missing")
+    assert isinstance(stats.failures[0][1], FileNotFoundError)
@@ -0,0 +1,80 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import knots_hub
+
+_REPO_ROOT = Path(knots_hub.__file__).parent.parent
+
+
+def get_imported_modules(statement: str) -> list[str]:
+    """
+    Get the name of all the modules imported when executing the given python code.
+    """
+    command = [sys.executable, "-X", "importtime", "-c", statement]
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=_REPO_ROOT,
+    )
+    modules = []
+    # lines formatted as "import time: {self} | {cumulative} | {module}"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        module = line.rsplit("|", 1)[-1].strip()
+        if module == "imported package":
+            continue
+        modules.append(module)
+    return modules
+
+
+def _filter_modules(modules: list[str], prefixes: tuple[str, ...]) -> list[str]:
+    return [
+        module
+        for module in modules
+        if module in prefixes or module.startswith(tuple(p + "." for p in prefixes))
+    ]
+
+
+def test__importtime__package():
+    modules = get_imported_modules("import knots_hub")
+    heavy = ("kloch", "pythonning", "knots_hub.cli", "knots_hub.installer")
+    assert not _filter_modules(modules, heavy)
+
+
+def test__importtime__launcher():
+    modules = get_imported_modules("import knots_hub.__main__")
+    heavy = ("kloch", "pythonning", "knots_hub.cli", "knots_hub.installer")
+    assert not _filter_modules(modules, heavy)
+
+
+def test__importtime__fast_launcher():
+    modules = get_imported_modules("import knots_hub._launcher")
+    heavy = (
+        "kloch",
+        "pythonning",
+        "knots_hub.cli",
+        "knots_hub.installer",
+        "knots_hub.statestore",
+        "sqlite3",
+        "concurrent.futures",
+        "socket",
+    )
+    assert not _filter_modules(modules, heavy)
+
+
+def test__importtime__cli():
+    modules = get_imported_modules("import knots_hub.cli")
+    heavy = (
+        "kloch",
+        "pythonning",
+        "webbrowser",
+        "knots_hub.installer.vendors",
+        "knots_hub.download",
+        "ssl",
+        "urllib.request",
+    )
+    assert not _filter_modules(modules, heavy)
@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import shutil
+
+from knots_hub.filesystem import Trash
+from knots_hub.installer import HubInstallRecord
+from knots_hub.installer import clean_hub_install_root
+from knots_hub.installer import create_hub_manifest
+from knots_hub.installer import get_hub_version_dir
+from knots_hub.installer import install_hub
+from knots_hub.installer import _hub
+
+
+def test__install_hub__incremental(tmp_path):
+    src_dir = tmp_path / "build"
+    src_dir.mkdir()
+    (src_dir / "lib").mkdir()
+    exe_path = src_dir / "knots_hub-v0.1.0.exe"
+    exe_path.write_text("fake executable")
+    lib_path = src_dir / "lib" / "foo.dll"
+    lib_path.write_text("foo")
+    removed_path = src_dir / "lib" / "bar.dll"
+    removed_path.write_text("bar")
+
+    dst_dir = tmp_path / "hub"
+    hubrecord_path = tmp_path / ".hubinstall"
+
+    create_hub_manifest(src_dir)
+    installed_exe = install_hub(src_dir, dst_dir, "0.1.0", hubrecord_path)
+    version_dir = get_hub_version_dir(dst_dir, "0.1.0")
+    assert installed_exe == version_dir / exe_path.name
+    assert (version_dir / "lib" / "bar.dll").exists()
+
+    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
+    assert hubrecord.installed_version == "0.1.0"
+    assert hubrecord.installed_path == version_dir
+    assert set(hubrecord.installed_manifest) == {
+        "knots_hub-v0.1.0.exe",
+        "lib/foo.dll",
+        "lib/bar.dll",
+    }
+
+    removed_path.unlink()
+    lib_path.write_text("foo v2")
+    create_hub_manifest(src_dir)
+    # unchanged files are copied from the previous install, as long as their size match
+    installed_exe.write_text("fake executable"[::-1])
+
+    new_exe = install_hub(src_dir, dst_dir, "0.2.0", hubrecord_path)
+    new_version_dir = get_hub_version_dir(dst_dir, "0.2.0")
+    assert new_exe == new_version_dir / exe_path.name
+    assert new_exe.read_text() == "fake executable"[::-1]
+    assert (new_version_dir / "lib" / "foo.dll").read_text() == "foo v2"
+    assert not (new_version_dir / "lib" / "bar.dll").exists()
+    assert not (new_version_dir / ".hubmanifest").exists()
+    # previous version is still there until cleaned
+    assert installed_exe.exists()
+
+    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
+    assert hubrecord.installed_version == "0.2.0"
+    assert hubrecord.installed_path == new_version_dir
+    assert set(hubrecord.installed_manifest) == {"knots_hub-v0.1.0.exe", "lib/foo.dll"}
+
+    unrelated_path = dst_dir / "notes.txt"
+    unrelated_path.write_text("not from the hub")
+    trash = Trash(tmp_path / "trash", tmp_path / "trash.lock")
+    clean_hub_install_root(dst_dir, new_version_dir, trash)
+    assert sorted(dst_dir.iterdir()) == [new_version_dir, unrelated_path]
+    trashed = list(trash.trash_dir.iterdir())
+    assert len(trashed) == 1
+    assert trashed[0].name.endswith(version_dir.name)
+
+
+def test__clean_hub_install_root__legacy(tmp_path, monkeypatch):
+    src_dir = tmp_path / "build"
+    (src_dir / "lib").mkdir(parents=True)
+    (src_dir / "knots_hub.exe").write_text("fake executable")
+    (src_dir / "lib" / "foo.dll").write_text("foo")
+
+    # hub installed before versioned directories
+    dst_dir = tmp_path / "hub"
+    shutil.copytree(src_dir, dst_dir)
+    (dst_dir / "notes.txt").write_text("not from the hub")
+    hubrecord_path = tmp_path / ".hubinstall"
+    HubInstallRecord(
+        installed_time=0.0,
+        installed_version="0.1.0",
+        installed_path=dst_dir,
+        installed_manifest={"knots_hub.exe": (15, "abc"), "lib/foo.dll": (3, "def")},
+    ).write_to_disk(hubrecord_path)
+
+    install_hub(src_dir, dst_dir, "0.2.0", hubrecord_path)
+    version_dir = get_hub_version_dir(dst_dir, "0.2.0")
+    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
+    assert set(hubrecord.legacy_manifest) == {"knots_hub.exe", "lib/foo.dll"}
+
+    trash = Trash(tmp_path / "trash", tmp_path / "trash.lock")
+
+    # simulate a legacy file still in use
+    original_move = Trash.move
+
+    def _patched_move(self, path):
+        if path.name == "knots_hub.exe":
+            return False
+        return original_move(self, path)
+
+    monkeypatch.setattr(Trash, "move", _patched_move)
+    remaining = clean_hub_install_root(
+        dst_dir, version_dir, trash, hubrecord.legacy_manifest
+    )
+    assert set(remaining) == {"knots_hub.exe"}
+    assert sorted(path.name for path in dst_dir.iterdir()) == [
+        "hub-0.2.0",
+        "knots_hub.exe",
+        "notes.txt",
+    ]
+
+    monkeypatch.setattr(Trash, "move", original_move)
+    remaining = clean_hub_install_root(dst_dir, version_dir, trash, remaining)
+    assert remaining == {}
+    assert sorted(path.name for path in dst_dir.iterdir()) == [
+        "hub-0.2.0",
+        "notes.txt",
+    ]
+
+
+def test__install_hub__interrupted(tmp_path, monkeypatch):
+    src_dir = tmp_path / "build"
+    src_dir.mkdir()
+    (src_dir / "knots_hub-v0.1.0.exe").write_text("fake executable")
+    (src_dir / "foo.dll").write_text("foo")
+
+    dst_dir = tmp_path / "hub"
+    hubrecord_path = tmp_path / ".hubinstall"
+    install_hub(src_dir, dst_dir, "0.1.0", hubrecord_path)
+
+    (src_dir / "foo.dll").write_text("foo v2")
+    (src_dir / "bar.dll").write_text("bar")
+
+    version_dir = get_hub_version_dir(dst_dir, "0.2.0")
+    # simulate an interrupted copy
+    version_dir.mkdir()
+    (version_dir / "bar.dll.part").write_text("b")
+
+    install_hub(src_dir, dst_dir, "0.2.0", hubrecord_path)
+    assert sorted(path.name for path in version_dir.iterdir()) == [
+        "bar.dll",
+        "foo.dll",
+        "knots_hub-v0.1.0.exe",
+    ]
+    assert (version_dir / "bar.dll").read_text() == "bar"
+
+
+def test__install_hub__unpublished_manifest(tmp_path, caplog):
+    src_dir = tmp_path / "build"
+    src_dir.mkdir()
+    (src_dir / "knots_hub.exe").write_text("fake executable")
+    lib_path = src_dir / "foo.dll"
+    lib_path.write_text("foo")
+
+    dst_dir = tmp_path / "hub"
+    hubrecord_path = tmp_path / ".hubinstall"
+    with caplog.at_level(logging.WARNING):
+        install_hub(src_dir, dst_dir, "0.1.0", hubrecord_path)
+    assert "no manifest published" in caplog.text
+
+    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
+    assert hubrecord.installed_manifest["foo.dll"][1].startswith("mtime:")
+
+    version_dir = get_hub_version_dir(dst_dir, "0.1.0")
+    (version_dir / "knots_hub.exe").write_text("fake executable"[::-1])
+    lib_path.write_text("bar")
+    os.utime(lib_path, ns=(0, 0))
+
+    new_version_dir = get_hub_version_dir(dst_dir, "0.2.0")
+    install_hub(src_dir, dst_dir, "0.2.0", hubrecord_path)
+    # unchanged files are copied from the previous install
+    assert (new_version_dir / "knots_hub.exe").read_text() == "fake executable"[::-1]
+    assert (new_version_dir / "foo.dll").read_text() == "bar"
+
+
+def test__clean_hub_install_root__baseline_record(tmp_path, monkeypatch):
+    src_dir = tmp_path / "build"
+    (src_dir / "lib").mkdir(parents=True)
+    (src_dir / "knots_hub.exe").write_text("fake executable")
+    (src_dir / "lib" / "foo.dll").write_text("foo")
+    create_hub_manifest(src_dir)
+
+    # hub installed before manifests and versioned directories
+    dst_dir = tmp_path / "hub"
+    shutil.copytree(src_dir, dst_dir, ignore=shutil.ignore_patterns(".hubmanifest"))
+    hubrecord_path = tmp_path / ".hubinstall"
+    hubrecord_path.write_text(
+        json.dumps(
+            {
+                "installed_time": 0.0,
+                "installed_version": "0.1.0",
+                "installed_path": str(dst_dir),
+            }
+        )
+    )
+
+    install_hub(src_dir, dst_dir, "0.2.0", hubrecord_path)
+    version_dir = get_hub_version_dir(dst_dir, "0.2.0")
+    hubrecord = HubInstallRecord.read_from_disk(hubrecord_path)
+    assert set(hubrecord.legacy_manifest) == {"knots_hub.exe", "lib/foo.dll"}
+
+    # the trash is on another volume than the install
+    monkeypatch.setattr(_hub, "_is_same_volume", lambda *args: False)
+    trash = Trash(tmp_path / "trash", tmp_path / "trash.lock")
+    old_version_dir = get_hub_version_dir(dst_dir, "0.1.5")
+    old_version_dir.mkdir()
+    (old_version_dir / "knots_hub.exe").write_text("fake executable")
+
+    remaining = clean_hub_install_root(
+        dst_dir, version_dir, trash, hubrecord.legacy_manifest
+    )
+    assert remaining == {}
+    assert list(dst_dir.iterdir()) == [version_dir]
+    assert not trash.trash_dir.exists()
@@ -1,3 +1,4 @@
+import json
 import time
 from pathlib import Path
 
@@ -53,3 +54,23 @@ def test__HubInstallRecord__update(tmp_path):
 
     updated_instance = HubInstallRecord.read_from_disk(dst_path)
     assert updated_instance.installed_time == new_time
+
+
+def test__HubInstallRecord__read__older(tmp_path):
+    dst_path = tmp_path / ".hubinstall"
+    # as written by the first hub versions
+    content = {
+        "installed_time": 1435435435,
+        "installed_version": "0.1.0",
+        "installed_path": str(tmp_path),
+    }
+    dst_path.write_text(json.dumps(content), encoding="utf-8")
+
+    instance_read = HubInstallRecord.read_from_disk(dst_path)
+    assert instance_read.installed_version == "0.1.0"
+    assert instance_read.vendors_record_paths == {}
+    assert not instance_read.installed_manifest
+
+    instance_read.write_to_disk(dst_path)
+    content = json.loads(dst_path.read_text(encoding="utf-8"))
+    assert content["__schema__"] == HubInstallRecord.SCHEMA_VERSION
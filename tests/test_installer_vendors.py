@@ -0,0 +1,271 @@
+import dataclasses
+import json
+import logging
+import threading
+from typing import Optional
+
+import pytest
+
+from knots_hub import serializelib
+from knots_hub._logging import LogContextFilter
+from knots_hub.download import Downloader
+from knots_hub.installer import VendorInstallRecord
+from knots_hub.installer.vendors import BaseVendorInstaller
+from knots_hub.installer.vendors import InstallStep
+from knots_hub.installer.vendors import InstallStepScheduler
+from knots_hub.installer.vendors import RezVendorInstaller
+from knots_hub.installer.vendors import install_vendors
+from knots_hub.installer.vendors._install import run_vendor_jobs
+from knots_hub.installer.vendors import uninstall_vendors
+
+
+@dataclasses.dataclass
+class _SlowVendorInstaller(BaseVendorInstaller):
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    @classmethod
+    def name(cls) -> str:
+        return "slow"
+
+    @classmethod
+    def version(cls) -> int:
+        return 1
+
+    def install(self, downloader: Optional[Downloader] = None):
+        # only pass if the other vendor is installed at the same time
+        self.barrier.wait()
+        logging.getLogger(__name__).info("installing")
+        self.make_install_directories()
+
+
+@dataclasses.dataclass
+class _OtherSlowVendorInstaller(_SlowVendorInstaller):
+    @classmethod
+    def name(cls) -> str:
+        return "otherslow"
+
+
+@dataclasses.dataclass
+class _BrokenVendorInstaller(BaseVendorInstaller):
+    @classmethod
+    def name(cls) -> str:
+        return "broken"
+
+    @classmethod
+    def version(cls) -> int:
+        return 1
+
+    def install(self, downloader: Optional[Downloader] = None):
+        raise RuntimeError("broken vendor")
+
+
+def test__install_vendors(tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    caplog.handler.addFilter(LogContextFilter())
+
+    vendor1 = _SlowVendorInstaller(install_dir=tmp_path / "slow", dirs_to_make=[])
+    vendor2 = _OtherSlowVendorInstaller(
+        install_dir=tmp_path / "otherslow", dirs_to_make=[]
+    )
+    vendor3 = _BrokenVendorInstaller(install_dir=tmp_path / "broken", dirs_to_make=[])
+    vendors = [
+        (vendor, tmp_path / f"{vendor.name()}.record")
+        for vendor in [vendor1, vendor2, vendor3]
+    ]
+
+    results = install_vendors(vendors, max_workers=3)
+    assert list(results.keys()) == ["slow", "otherslow", "broken"]
+    assert results["slow"].changed
+    assert not results["slow"].error
+    assert results["otherslow"].changed
+    assert isinstance(results["broken"].error, RuntimeError)
+    assert not results["broken"].changed
+
+    assert vendor1.install_dir.exists()
+    assert vendor2.install_dir.exists()
+    assert (tmp_path / "slow.record").exists()
+    assert (tmp_path / "otherslow.record").exists()
+    assert not (tmp_path / "broken.record").exists()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert "[slow] installing" in messages
+    assert "[otherslow] installing" in messages
+
+    results = install_vendors(vendors[:2], max_workers=2)
+    assert not results["slow"].changed
+    assert not results["otherslow"].changed
+
+    records = [
+        VendorInstallRecord.read_from_disk(tmp_path / "slow.record"),
+        VendorInstallRecord.read_from_disk(tmp_path / "otherslow.record"),
+    ]
+    results = uninstall_vendors(records)
+    assert all(result.changed for result in results.values())
+    assert not vendor1.install_dir.exists()
+    assert not vendor2.install_dir.exists()
+
+
+def test__run_vendor_jobs__dependencies():
+    order = []
+
+    def _job(name: str, fail: bool = False):
+        def _run():
+            order.append(name)
+            if fail:
+                raise RuntimeError(name)
+            return True
+
+        return _run
+
+    jobs = {
+        "a": _job("a"),
+        "b": _job("b", fail=True),
+        "c": _job("c"),
+        "d": _job("d"),
+    }
+    dependencies = {"a": ["c"], "c": ["d"], "d": [], "b": []}
+    results = run_vendor_jobs(jobs, max_workers=4, dependencies=dependencies)
+    assert list(results) == ["a", "b", "c", "d"]
+    assert order.index("d") < order.index("c") < order.index("a")
+    assert all(not results[name].error for name in "acd")
+    assert results["b"].error
+
+    order.clear()
+    dependencies = {"a": ["b"], "c": ["a"], "d": []}
+    results = run_vendor_jobs(jobs, max_workers=4, dependencies=dependencies)
+    assert "a" not in order
+    assert "c" not in order
+    assert isinstance(results["a"].error, RuntimeError)
+    assert isinstance(results["c"].error, RuntimeError)
+    assert results["d"].changed
+
+    dependencies = {"a": ["c"], "c": ["a"]}
+    with pytest.raises(ValueError):
+        run_vendor_jobs(jobs, max_workers=4, dependencies=dependencies)
+
+
+def test__InstallStepScheduler():
+    called = []
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _step(name: str):
+        def _run(requirements):
+            called.append(name)
+            if name in ("python", "download"):
+                # only pass if both steps are executed at the same time
+                barrier.wait()
+            return f"{name}({','.join(sorted(requirements.values()))})"
+
+        return _run
+
+    steps = [
+        InstallStep("install", _step("install"), ("python", "download")),
+        InstallStep("python", _step("python"), ("dirs",)),
+        InstallStep("download", _step("download"), ("dirs",)),
+        InstallStep("dirs", _step("dirs")),
+    ]
+    with InstallStepScheduler(max_workers=4) as scheduler:
+        results = scheduler.run(steps)
+        assert list(results) == ["dirs", "python", "download", "install"]
+        assert results["install"] == "install(download(dirs()),python(dirs()))"
+
+        # shared steps are only executed once
+        called.clear()
+        steps = [
+            InstallStep("other", _step("other"), ("python",)),
+            InstallStep("python", _step("python"), ("dirs",)),
+        ]
+        results = scheduler.run(steps)
+        assert called == ["other"]
+        assert results["other"] == "other(python(dirs()))"
+
+        scheduler.provide("provided", "foo")
+        steps = [InstallStep("last", _step("last"), ("provided",))]
+        assert scheduler.run(steps)["last"] == "last(foo)"
+
+        with pytest.raises(ValueError):
+            scheduler.run([InstallStep("unknown", _step("unknown"), ("missing",))])
+
+        def _fail(requirements):
+            raise OSError("failed")
+
+        called.clear()
+        steps = [
+            InstallStep("fail", _fail),
+            InstallStep("after", _step("after"), ("fail",)),
+        ]
+        with pytest.raises(OSError):
+            scheduler.run(steps)
+        assert not called
+
+
+@dataclasses.dataclass
+class _DependentVendorInstaller(BaseVendorInstaller):
+
+    received = []
+
+    @classmethod
+    def name(cls) -> str:
+        return "dependent"
+
+    @classmethod
+    def version(cls) -> int:
+        return 1
+
+    def get_dependencies(self) -> list[str]:
+        return ["slow"]
+
+    def get_install_steps(self, downloader=None) -> list[InstallStep]:
+        def _install(requirements):
+            self.received.append(requirements["slow:dir"])
+            self.make_install_directories()
+
+        return [InstallStep("dependent:install", _install, ("slow:dir",))]
+
+    def install(self, downloader: Optional[Downloader] = None):
+        pass
+
+
+def test__install_vendors__dependencies(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        _SlowVendorInstaller,
+        "get_artifacts",
+        lambda self: {"slow:dir": self.install_dir},
+    )
+    monkeypatch.setattr(_SlowVendorInstaller, "barrier", threading.Barrier(1))
+
+    vendor1 = _DependentVendorInstaller(install_dir=tmp_path / "dep", dirs_to_make=[])
+    vendor2 = _SlowVendorInstaller(install_dir=tmp_path / "slow", dirs_to_make=[])
+    vendors = [
+        (vendor1, tmp_path / "dependent.record"),
+        (vendor2, tmp_path / "slow.record"),
+    ]
+    results = install_vendors(vendors)
+    assert not results["dependent"].error
+    assert not results["slow"].error
+    assert _DependentVendorInstaller.received == [vendor2.install_dir]
+
+    # missing dependency
+    (tmp_path / "dependent.record").unlink()
+    results = install_vendors(vendors[:1])
+    assert isinstance(results["dependent"].error, ValueError)
+
+
+def test__BaseVendorInstaller__unserialize__missing_key(tmp_path):
+    context = serializelib.UnserializeContext({}, tmp_path)
+    config = {
+        "install_dir": str(tmp_path / "rez"),
+        "dirs_to_make": [],
+        "python_version": "3.10.11",
+        "rez_version": "3.1.1",
+    }
+    # optional fields can be omitted
+    installer = RezVendorInstaller.unserialize(
+        json.dumps({"rez": config}), context=context
+    )
+    assert installer.rez_sha256 is serializelib.Uninitialized
+
+    del config["rez_version"]
+    with pytest.raises(KeyError):
+        RezVendorInstaller.unserialize(json.dumps({"rez": config}), context=context)
@@ -0,0 +1,77 @@
+import json
+
+import knots_hub
+from knots_hub import _launcher
+from knots_hub.config import HubConfig
+from knots_hub.installer import HubInstallRecord
+from knots_hub.statestore import SqliteStateStore
+
+
+def test__get_fast_launch_executable(tmp_path, monkeypatch):
+    monkeypatch.delenv(knots_hub.Environ.IS_RESTARTED, raising=False)
+    monkeypatch.delenv(knots_hub.Environ.DISABLE_FAST_LAUNCH, raising=False)
+
+    install_dir = tmp_path / "hub"
+    version_dir = install_dir / "hub-1.2.0"
+    version_dir.mkdir(parents=True)
+    exe_path = version_dir / knots_hub.constants.EXECUTABLE_NAME
+    exe_path.write_text("fake executable")
+
+    monkeypatch.setenv(knots_hub.Environ.USER_INSTALL_PATH, str(install_dir))
+    monkeypatch.setenv(knots_hub.Environ.INSTALLER, f"1.2.0={tmp_path}")
+    config = HubConfig.from_environment()
+    filesystem = knots_hub.HubLocalFilesystem(root_dir=tmp_path / "data")
+    filesystem.root_dir.mkdir()
+
+    # not installed yet
+    assert not _launcher.get_fast_launch_executable([], config, filesystem)
+
+    hubrecord = {
+        "installed_version": "1.2.0",
+        "installed_path": str(version_dir),
+    }
+    filesystem.hubinstall_record_path.write_text(json.dumps(hubrecord))
+
+    assert _launcher.get_fast_launch_executable([], config, filesystem) == exe_path
+    argv = ["--debug", "kloch", "--", "list"]
+    assert _launcher.get_fast_launch_executable(argv, config, filesystem) == exe_path
+    argv = ["--debug", "uninstall"]
+    assert not _launcher.get_fast_launch_executable(argv, config, filesystem)
+
+    monkeypatch.setenv(knots_hub.Environ.IS_RESTARTED, "1")
+    assert not _launcher.get_fast_launch_executable([], config, filesystem)
+    monkeypatch.delenv(knots_hub.Environ.IS_RESTARTED)
+
+    # update needed
+    monkeypatch.setenv(knots_hub.Environ.INSTALLER, f"1.3.0={tmp_path}")
+    config = HubConfig.from_environment()
+    assert not _launcher.get_fast_launch_executable([], config, filesystem)
+
+    filesystem.hubinstall_record_path.write_text("{corrupted")
+    assert not _launcher.get_fast_launch_executable([], config, filesystem)
+
+
+def test__get_fast_launch_executable__sqlite(tmp_path, monkeypatch):
+    monkeypatch.delenv(knots_hub.Environ.IS_RESTARTED, raising=False)
+    monkeypatch.delenv(knots_hub.Environ.DISABLE_FAST_LAUNCH, raising=False)
+
+    install_dir = tmp_path / "hub"
+    version_dir = install_dir / "hub-1.2.0"
+    version_dir.mkdir(parents=True)
+    exe_path = version_dir / knots_hub.constants.EXECUTABLE_NAME
+    exe_path.write_text("fake executable")
+
+    monkeypatch.setenv(knots_hub.Environ.USER_INSTALL_PATH, str(install_dir))
+    monkeypatch.setenv(knots_hub.Environ.INSTALLER, f"1.2.0={tmp_path}")
+    monkeypatch.setenv(knots_hub.Environ.USE_SQLITE_STATE, "1")
+    config = HubConfig.from_environment()
+    filesystem = knots_hub.HubLocalFilesystem(root_dir=tmp_path / "data")
+    filesystem.root_dir.mkdir()
+
+    assert not _launcher.get_fast_launch_executable([], config, filesystem)
+
+    hubrecord = HubInstallRecord(installed_version="1.2.0", installed_path=version_dir)
+    with SqliteStateStore(filesystem.state_database_path) as store:
+        store.write(hubrecord, filesystem.hubinstall_record_path)
+
+    assert _launcher.get_fast_launch_executable([], config, filesystem) == exe_path
@@ -0,0 +1,108 @@
+import logging
+import logging.handlers
+import queue
+import subprocess
+import sys
+from pathlib import Path
+
+from knots_hub._logging import BoundedQueueHandler
+from knots_hub._logging import ColoredFormatter
+from knots_hub._logging import Colors
+from knots_hub._logging import LogContextFilter
+from knots_hub._logging import log_context
+
+_REPO_ROOT = Path(__file__).parent.parent
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test__BoundedQueueHandler():
+    capture = _ListHandler()
+    listener = logging.handlers.QueueListener(queue.Queue(maxsize=2), capture)
+    handler = BoundedQueueHandler(listener.queue, listener)
+    handler.addFilter(LogContextFilter())
+    logger = logging.getLogger("knots_hub.test__BoundedQueueHandler")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(handler)
+
+    # the listener is not started yet so the queue stays full
+    logger.debug("first")
+    with log_context("vendor"):
+        logger.info("second %s", "arg")
+    logger.debug("dropped")
+    logger.info("dropped too")
+    assert handler.dropped == 2
+
+    handler.start()
+    logger.warning("third")
+    handler.flush()
+    assert capture.messages == [
+        "first",
+        "[vendor] second arg",
+        "dropped 2 log records; the log queue was full",
+        "third",
+    ]
+    assert handler.dropped == 0
+
+    logger.info("last")
+    handler.close()
+    logger.removeHandler(handler)
+    assert capture.messages[-1] == "last"
+
+
+def test__configure_logging__queue(tmp_path):
+    log_path = tmp_path / "hub.log"
+    script = (
+        "import logging, sys\n"
+        "from pathlib import Path\n"
+        "from knots_hub._logging import configure_logging\n"
+        f"configure_logging(logging.INFO, Path(r'{log_path}'), queue_size=10000)\n"
+        "for index in range(1000):\n"
+        "    logging.getLogger('test').debug('record %s', index)\n"
+        "sys.exit(0)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=_REPO_ROOT)
+
+    # the queue is flushed at exit
+    lines = log_path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1000
+    assert lines[-1].endswith("record 999")
+
+
+def test__ColoredFormatter():
+    fmt = "{level_color}{levelname: <7}{reset}{white_faint} | [{name}]{reset} {message}"
+    record = logging.makeLogRecord(
+        {
+            "name": "knots_hub",
+            "levelno": logging.WARNING,
+            "levelname": "WARNING",
+            "msg": "some %s",
+            "args": ("message",),
+        }
+    )
+
+    formatter = ColoredFormatter(fmt=fmt, style="{")
+    assert formatter.format(record) == (
+        f"{Colors.yellow.value}WARNING{Colors.reset.value}"
+        f"{Colors.white_faint.value} | [knots_hub]{Colors.reset.value} some message"
+        f"{Colors.reset.value}"
+    )
+    # nothing is added to the record
+    assert not hasattr(record, "level_color")
+    assert not hasattr(record, "reset")
+
+    formatter = ColoredFormatter(disable_coloring=True, fmt=fmt, style="{")
+    assert formatter.format(record) == "WARNING | [knots_hub] some message"
+
+    # level without color
+    record.levelno = 25
+    record.levelname = "NOTICE"
+    assert formatter.format(record) == "NOTICE  | [knots_hub] some message"
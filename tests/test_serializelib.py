@@ -1,5 +1,10 @@
 import dataclasses
+import json
+import os
 from pathlib import Path
+from typing import ClassVar
+
+import pytest
 
 from knots_hub import serializelib
 
@@ -88,3 +93,456 @@ def test__io(tmp_path):
 
     unserialized_disk = serializelib.read_from_disk(SomeAlbum, disk_path)
     assert unserialized_disk == instance_updated
+
+
+def test__unserialize__missing_field():
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        our_love: float = serializelib.FloatField("track 2")
+
+    @dataclasses.dataclass
+    class SomeVersionedAlbum(SomeAlbum):
+        SCHEMA_VERSION: ClassVar[int] = 1
+
+    context = serializelib.UnserializeContext({}, Path())
+    with pytest.raises(KeyError):
+        serializelib.unserialize(
+            '{"playground": "/some/path"}',
+            data_class=SomeAlbum,
+            context=context,
+        )
+
+    unserialized = serializelib.unserialize(
+        '{"playground": "/some/path"}',
+        data_class=SomeVersionedAlbum,
+        context=context,
+    )
+    assert unserialized.playground == Path("/some/path")
+    assert unserialized.our_love is serializelib.Uninitialized
+
+
+def test__codec__cached(monkeypatch):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        our_love: float = serializelib.FloatField("track 2")
+
+    instance = SomeAlbum(playground=Path("/some/path"))
+    context = serializelib.UnserializeContext({}, Path())
+    serialized = serializelib.serialize(instance)
+    serializelib.unserialize(serialized, data_class=SomeAlbum, context=context)
+
+    def _patched_fields(*args):
+        raise AssertionError("fields must only be inspected once")
+
+    # the dataclass fields are only inspected on first use
+    monkeypatch.setattr(dataclasses, "fields", _patched_fields)
+    assert serializelib.serialize(instance) == serialized
+    unserialized = serializelib.unserialize(
+        serialized,
+        data_class=SomeAlbum,
+        context=context,
+    )
+    assert unserialized == instance
+    assert unserialized.our_love is serializelib.Uninitialized
+
+
+def test__PathField__expandvars(monkeypatch):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField(expandvars=True)
+        dirty_little_animals: list[Path] = serializelib.PathListField(expandvars=True)
+        goodbye: Path = serializelib.PathField()
+
+    monkeypatch.setenv("TRACK", "from os.environ")
+    environ_before = os.environ.copy()
+
+    environ = {"TRACK": "our_love", "ALBUM": "playground"}
+    context = serializelib.UnserializeContext(environ, Path())
+    serialized = {
+        "playground": "/$ALBUM/${TRACK}/$$TRACK/$UNDEFINED",
+        "dirty_little_animals": ["$TRACK", "$$${ALBUM}", "${ALBUM"],
+        "goodbye": "$TRACK",
+    }
+    unserialized = serializelib.unserialize(
+        json.dumps(serialized),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    assert unserialized.playground == Path("/playground/our_love/$TRACK/$UNDEFINED")
+    assert unserialized.dirty_little_animals == [
+        Path("our_love"),
+        Path("$playground"),
+        Path("${ALBUM"),
+    ]
+    assert unserialized.goodbye == Path("$TRACK")
+    assert os.environ == environ_before
+
+
+def test__PathField__expandvars__windows(monkeypatch):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField(expandvars=True)
+        dirty_little_animals: list[Path] = serializelib.PathListField(expandvars=True)
+
+    environ = {
+        "TRACK": "our_love",
+        "ALBUM": "playground",
+        "ProgramFiles(x86)": "program_files",
+        "DIRTY-LITTLE": "animals",
+    }
+    context = serializelib.UnserializeContext(environ, Path())
+    serialized = {
+        "playground": "/%ALBUM%/%%TRACK%%/'$TRACK'/%UNDEFINED%/%TRACK",
+        "dirty_little_animals": [
+            "%TRACK%",
+            "'%ALBUM%'${ALBUM}",
+            "%%",
+            "%ProgramFiles(x86)%/a",
+            "$DIRTY-LITTLE/b",
+        ],
+    }
+    unserialized = serializelib.unserialize(
+        json.dumps(serialized),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    # same result as ntpath.expandvars
+    assert unserialized.playground == Path(
+        "/playground/%TRACK%/'$TRACK'/%UNDEFINED%/%TRACK"
+    )
+    assert unserialized.dirty_little_animals == [
+        Path("our_love"),
+        Path("'%ALBUM%'playground"),
+        Path("%"),
+        Path("program_files/a"),
+        Path("animals/b"),
+    ]
+
+
+def test__write_to_disk__atomic(tmp_path, monkeypatch):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        our_love: float = serializelib.FloatField("track 2")
+
+    disk_path = tmp_path / "some_album.json"
+    instance = SomeAlbum(playground=Path("/some/path"), our_love=3.38)
+    serializelib.write_to_disk(instance, disk_path)
+    assert serializelib.get_backup_path(disk_path).exists()
+
+    # simulate a crash before the file is renamed
+    def _patched_replace(*args):
+        raise KeyboardInterrupt()
+
+    new_instance = dataclasses.replace(instance, our_love=4.0)
+    with monkeypatch.context() as context:
+        context.setattr(os, "replace", _patched_replace)
+        with pytest.raises(KeyboardInterrupt):
+            serializelib.write_to_disk(new_instance, disk_path)
+
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "some_album.json",
+        "some_album.json.backup",
+    ]
+
+    # corrupted file fallback to the backup
+    disk_path.write_text('{"playground": "/som', encoding="utf-8")
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+
+    serializelib.get_backup_path(disk_path).write_text("", encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        serializelib.read_from_disk(SomeAlbum, disk_path)
+
+
+def test__unserialize__schema_migration():
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        tracks: list[Path] = serializelib.PathListField(missing_factory=list)
+        title: str = serializelib.StrField()
+        artist: str = serializelib.StrField()
+
+        SCHEMA_VERSION = 2
+
+    def _migrate_v0(content: dict) -> dict:
+        content["title"] = content.pop("name")
+        return content
+
+    serializelib.register_migration(SomeAlbum, 0, _migrate_v0)
+    context = serializelib.UnserializeContext({}, Path())
+
+    # serialized before any schema was declared
+    unserialized = serializelib.unserialize(
+        json.dumps({"name": "Some Album"}),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    assert unserialized == SomeAlbum(tracks=[], title="Some Album")
+    assert unserialized.artist is serializelib.Uninitialized
+
+    # no migration registered for version 1
+    unserialized = serializelib.unserialize(
+        json.dumps({serializelib.SCHEMA_KEY: 1, "title": "Some Album"}),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    assert unserialized == SomeAlbum(tracks=[], title="Some Album")
+
+    instance = SomeAlbum(tracks=[Path("foo")], title="Other Album", artist="Me")
+    serialized = serializelib.serialize(instance)
+    assert json.loads(serialized)[serializelib.SCHEMA_KEY] == 2
+    unserialized = serializelib.unserialize(serialized, SomeAlbum, context=context)
+    assert unserialized == instance
+
+    # from a newer schema, unknown fields are ignored
+    content = json.loads(serialized)
+    content[serializelib.SCHEMA_KEY] = 3
+    content["year"] = 2024
+    unserialized = serializelib.unserialize(
+        json.dumps(content),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    assert unserialized == instance
+
+
+def test__formats(tmp_path):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        our_love: float = serializelib.FloatField("track 2")
+        manifest: dict = serializelib.FileManifestField()
+
+    instance = SomeAlbum(
+        playground=Path("/some/path"),
+        our_love=3.38,
+        manifest={"lib/foo.dll": (1024, "abcdef"), "🦎.txt": (4, "012345")},
+    )
+    context = serializelib.UnserializeContext({}, Path())
+
+    serialized = serializelib.serialize_bytes(instance, format_name="binary")
+    assert serialized.startswith(serializelib.BinaryFormat.magic)
+    assert serializelib.detect_format(serialized).name == "binary"
+    assert len(serialized) < len(serializelib.serialize_bytes(instance))
+    assert serializelib.unserialize(serialized, SomeAlbum, context) == instance
+
+    serialized = serializelib.serialize_bytes(instance)
+    assert serializelib.detect_format(serialized).name == "json"
+    assert serializelib.unserialize(serialized, SomeAlbum, context) == instance
+
+    with pytest.raises(ValueError):
+        serializelib.serialize_bytes(instance, format_name="unknown")
+
+    disk_path = tmp_path / "some_album"
+    serializelib.write_to_disk(instance, disk_path, format_name="binary")
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+
+    # update to another format
+    serializelib.update_disk(SomeAlbum(our_love=4.0), disk_path)
+    assert disk_path.read_bytes().startswith(b"{")
+    updated = serializelib.read_from_disk(SomeAlbum, disk_path)
+    assert updated == dataclasses.replace(instance, our_love=4.0)
+
+    # truncated binary file fallback to the backup
+    serializelib.write_to_disk(instance, disk_path, format_name="binary")
+    disk_path.write_bytes(disk_path.read_bytes()[:20])
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+
+
+def test__read_from_disk__cache(tmp_path, monkeypatch):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        our_love: float = serializelib.FloatField("track 2")
+
+    parsed = []
+    loads = serializelib.loads
+
+    def _patched_loads(data):
+        parsed.append(data)
+        return loads(data)
+
+    monkeypatch.setattr(serializelib, "loads", _patched_loads)
+
+    disk_path = tmp_path / "some_album.json"
+    instance = SomeAlbum(playground=Path("/some/path"), our_love=3.38)
+    serializelib.write_to_disk(instance, disk_path)
+
+    # the written content is reused
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+    assert not parsed
+
+    # returned instances don't share their state
+    serializelib.read_from_disk(SomeAlbum, disk_path).our_love = 1.0
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+
+    serializelib.update_disk(SomeAlbum(our_love=4.0), disk_path)
+    updated = dataclasses.replace(instance, our_love=4.0)
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == updated
+    assert not parsed
+
+    # modified by another process
+    disk_path.write_text(
+        json.dumps({"playground": "/other/path", "our_love": 5.0}),
+        encoding="utf-8",
+    )
+    expected = SomeAlbum(playground=Path("/other/path"), our_love=5.0)
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == expected
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == expected
+    assert len(parsed) == 1
+
+    serializelib.clear_cache()
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == expected
+    assert len(parsed) == 2
+
+
+def test__write_to_disk__streamed(tmp_path):
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        playground: Path = serializelib.PathField()
+        tracks: list[Path] = serializelib.PathListField(expandvars=True)
+        covers: dict[str, Path] = serializelib.DictOfStrNPathField()
+        manifest: dict = serializelib.FileManifestField()
+        lyrics: list[Path] = serializelib.PathListField()
+
+        SCHEMA_VERSION = 1
+
+    instance = SomeAlbum(
+        playground=Path("/some/path"),
+        tracks=[Path(f"track{index}.wav") for index in range(5000)],
+        covers={"front": Path("front.png"), "🦎": Path("back.png")},
+        manifest={"lib/foo.dll": (1024, "abcdef")},
+    )
+
+    disk_path = tmp_path / "some_album.json"
+    serializelib.write_to_disk(instance, disk_path, streamed=True)
+    content = json.loads(disk_path.read_text(encoding="utf-8"))
+    assert content == json.loads(serializelib.serialize(instance))
+    assert serializelib.read_from_disk(SomeAlbum, disk_path) == instance
+    assert serializelib.get_backup_path(disk_path).read_bytes() == (
+        disk_path.read_bytes()
+    )
+
+    tracks = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "tracks")
+    assert not isinstance(tracks, list)
+    assert list(tracks) == instance.tracks
+    covers = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "covers")
+    assert dict(covers) == instance.covers
+    manifest = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "manifest")
+    assert dict(manifest) == instance.manifest
+    lyrics = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "lyrics")
+    assert list(lyrics) == []
+
+    with pytest.raises(ValueError):
+        list(serializelib.iter_field_from_disk(SomeAlbum, disk_path, "playground"))
+    with pytest.raises(ValueError):
+        serializelib.write_to_disk(
+            instance, disk_path, format_name="binary", streamed=True
+        )
+
+    # other formats are entirely read
+    serializelib.write_to_disk(instance, disk_path, format_name="binary")
+    tracks = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "tracks")
+    assert list(tracks) == instance.tracks
+
+    # not written in order and needing a migration
+    def _migrate_v0(content: dict) -> dict:
+        content["tracks"] = content.pop("songs")
+        return content
+
+    serializelib.register_migration(SomeAlbum, 0, _migrate_v0)
+    disk_path.write_text(
+        json.dumps({"songs": ["$ALBUM/foo"], "covers": {"front": "front.png"}}),
+        encoding="utf-8",
+    )
+    tracks = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "tracks")
+    assert list(tracks) == [Path(os.path.expandvars("$ALBUM/foo"))]
+    covers = serializelib.iter_field_from_disk(SomeAlbum, disk_path, "covers")
+    assert dict(covers) == {"front": Path("front.png")}
+
+
+def test__PathListField__lazy():
+
+    @dataclasses.dataclass
+    class SomeAlbum:
+        tracks: list[Path] = serializelib.PathListField(expandvars=True, lazy=True)
+        covers: dict[str, Path] = serializelib.DictOfStrNPathField(expandvars=True)
+
+    environ = {"TRACK": "our_love", "ALBUM": "playground"}
+    context = serializelib.UnserializeContext(environ, Path())
+    serialized = {
+        "tracks": ["$TRACK", "$$${ALBUM}", "${ALBUM", "}", "plain/path"],
+        "covers": {"front": "${ALBUM}/front.png", "back": "${ALBUM"},
+    }
+    unserialized = serializelib.unserialize(
+        json.dumps(serialized),
+        data_class=SomeAlbum,
+        context=context,
+    )
+    expected = [
+        Path("our_love"),
+        Path("$playground"),
+        Path("${ALBUM"),
+        Path("}"),
+        Path("plain", "path"),
+    ]
+    assert isinstance(unserialized.tracks, serializelib.PathList)
+    assert unserialized.tracks == expected
+    assert unserialized.tracks[1] == Path("$playground")
+    assert unserialized.tracks[-2:] == expected[-2:]
+    assert [Path("foo")] + unserialized.tracks == [Path("foo")] + expected
+    assert unserialized.covers == {
+        "front": Path("playground", "front.png"),
+        "back": Path("${ALBUM"),
+    }
+
+    reserialized = json.loads(serializelib.serialize(unserialized))
+    assert reserialized["tracks"][0] == "our_love"
+    assert serializelib.unserialize(
+        json.dumps(reserialized), SomeAlbum, context
+    ) == dataclasses.replace(unserialized, tracks=expected)
+
+
+def test__BinaryFormat():
+    binary = serializelib.BinaryFormat()
+    content = {
+        "none": None,
+        "bools": [True, False],
+        "ints": [0, -1, 2**63 - 1, -(2**63), 2**80, -(2**80)],
+        "float": 3.38,
+        "nested": {"": [[], {}, "🦎", ("tuple",)]},
+    }
+    data = binary.dumps(content)
+    assert binary.loads(data) == dict(content, nested={"": [[], {}, "🦎", ["tuple"]]})
+
+    with pytest.raises(TypeError):
+        binary.dumps({1: "not a str key"})
+    with pytest.raises(TypeError):
+        binary.dumps({"path": Path()})
+
+    with pytest.raises(ValueError):
+        binary.loads(b"{}")
+    with pytest.raises(ValueError):
+        binary.loads(binary.magic + b"\x00\x01")
+    # valid header with unknown type tags
+    corrupted = bytearray(data)
+    corrupted[len(binary.magic) + serializelib._BINARY_HEADER.size] = ord("?")
+    with pytest.raises(ValueError):
+        binary.loads(bytes(corrupted))
+    for size in range(len(data)):
+        with pytest.raises(ValueError):
+            binary.loads(data[:size])
+    with pytest.raises(ValueError):
+        binary.loads(binary.dumps(["not", "a", "dict"]))
@@ -0,0 +1,99 @@
+import pytest
+
+from knots_hub.installer import HubInstallRecord
+from knots_hub.installer import VendorInstallRecord
+from knots_hub.installer import migrate_hub_records
+from knots_hub.statestore import FileStateStore
+from knots_hub.statestore import SqliteStateStore
+
+
+def test__SqliteStateStore(tmp_path):
+    store = SqliteStateStore(tmp_path / "state.db")
+    record_path = tmp_path / "foo" / ".vendorrecord"
+    other_path = tmp_path / "bar" / ".vendorrecord"
+
+    assert not store.exists(record_path)
+    with pytest.raises(FileNotFoundError):
+        store.read(VendorInstallRecord, record_path)
+
+    record = VendorInstallRecord(
+        name="foo",
+        installed_time=1.0,
+        install_hash="abc",
+        installed_path=tmp_path / "foo",
+        extra_paths=[tmp_path / "foo.extra"],
+    )
+    store.write(record, record_path)
+    assert store.exists(record_path)
+    assert store.read(VendorInstallRecord, record_path) == record
+    assert store.read_content(record_path)["install_hash"] == "abc"
+    assert store.read_many(VendorInstallRecord, [other_path, record_path]) == {
+        record_path: record
+    }
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.write(record, other_path)
+            store.delete(record_path)
+            raise RuntimeError("interrupted")
+
+    assert store.exists(record_path)
+    assert not store.exists(other_path)
+
+    store.update(VendorInstallRecord(install_hash="def"), record_path)
+    store.add_history("foo", "install", "def")
+    store.close()
+
+    # changes are persisted
+    with SqliteStateStore(tmp_path / "state.db") as store:
+        updated = store.read(VendorInstallRecord, record_path)
+        assert updated.install_hash == "def"
+        assert updated.name == "foo"
+        history = store.get_history("foo")
+        assert [(entry.action, entry.version) for entry in history] == [
+            ("install", "def")
+        ]
+        assert not store.get_history("bar")
+
+
+def test__migrate_hub_records(tmp_path):
+    hubrecord_path = tmp_path / ".hubinstall"
+    vendorrecord_path = tmp_path / "foo" / ".vendorrecord"
+    vendorrecord_path.parent.mkdir()
+
+    vendorrecord = VendorInstallRecord(
+        name="foo",
+        installed_time=1.0,
+        install_hash="abc",
+        installed_path=tmp_path / "foo",
+        extra_paths=[],
+    )
+    vendorrecord.write_to_disk(vendorrecord_path)
+    hubrecord = HubInstallRecord(
+        installed_time=2.0,
+        installed_version="1.0.0",
+        installed_path=tmp_path / "hub",
+        vendors_record_paths={"foo": vendorrecord_path},
+        installed_manifest={"foo.exe": (3, "xyz")},
+    )
+    hubrecord.write_to_disk(hubrecord_path)
+
+    json_store = FileStateStore()
+    with SqliteStateStore(tmp_path / "state.db") as sqlite_store:
+        migrated = migrate_hub_records(json_store, sqlite_store, hubrecord_path)
+        assert migrated == [hubrecord_path, vendorrecord_path]
+        assert not hubrecord_path.exists()
+        assert not vendorrecord_path.exists()
+        assert sqlite_store.read(HubInstallRecord, hubrecord_path) == hubrecord
+        assert sqlite_store.read(VendorInstallRecord, vendorrecord_path) == (
+            vendorrecord
+        )
+
+        assert not migrate_hub_records(json_store, sqlite_store, hubrecord_path)
+
+        migrated = migrate_hub_records(sqlite_store, json_store, hubrecord_path)
+        assert migrated == [hubrecord_path, vendorrecord_path]
+        assert not sqlite_store.exists(hubrecord_path)
+
+    assert HubInstallRecord.read_from_disk(hubrecord_path) == hubrecord
+    assert VendorInstallRecord.read_from_disk(vendorrecord_path) == vendorrecord
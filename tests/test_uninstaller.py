@@ -2,10 +2,17 @@ import os
 import subprocess
 import tempfile
 import time
+from pathlib import Path
 from typing import List
 
 import pytest
 
+from knots_hub import OS
+from knots_hub import filesystem
+from knots_hub.uninstaller import collapse_paths
+from knots_hub.uninstaller import measure_plan
+from knots_hub.uninstaller import plan_uninstall
+from knots_hub.uninstaller import uninstall
 from knots_hub.uninstaller import uninstall_paths
 
 
@@ -41,3 +48,95 @@ def test__uninstall_paths(tmp_path, monkeypatch):
     # the deletion is parallel so wait for it to catchup
     time.sleep(0.5)
     assert not tmppatched.exists()
+
+
+def test__plan_uninstall(tmp_path):
+    root_dir = tmp_path / "root"
+    install_dir = tmp_path / "install"
+    running_exe = install_dir / "1.2.3" / "knots_hub.exe"
+
+    paths = [
+        install_dir,
+        root_dir,
+        tmp_path / "vendors" / "rez",
+        tmp_path / "vendors" / "rez" / "bin",
+        tmp_path / "vendors" / "python",
+        tmp_path / "vendors" / ".." / "vendors" / "python",
+        root_dir / "downloads",
+    ]
+    assert collapse_paths(paths) == [
+        install_dir,
+        root_dir,
+        tmp_path / "vendors" / "rez",
+        tmp_path / "vendors" / "python",
+    ]
+
+    plan = plan_uninstall(paths, last_paths=[root_dir], running_paths=[running_exe])
+    assert plan.steps == [
+        [tmp_path / "vendors" / "rez", tmp_path / "vendors" / "python"],
+        [root_dir],
+    ]
+    assert plan.deferred == [install_dir]
+    assert plan.paths[-1] == install_dir
+
+
+def test__uninstall(tmp_path, monkeypatch):
+    executed = []
+
+    def _patch_execv(exe: str, argv: List[str]):
+        executed.append(argv[-1])
+
+    monkeypatch.setattr(os, "execv", _patch_execv)
+    tmppatched = tmp_path / "tmppatched"
+    tmppatched.mkdir()
+    monkeypatch.setattr(tempfile, "mkdtemp", lambda *args, **kwargs: str(tmppatched))
+
+    root_dir = tmp_path / "root"
+    (root_dir / "downloads").mkdir(parents=True)
+    (root_dir / "downloads" / "file.zip").write_bytes(b"0" * 100)
+    (root_dir / ".hubinstall").write_text("{}", encoding="utf-8")
+    vendor_dir = tmp_path / "vendor"
+    (vendor_dir / "bin").mkdir(parents=True)
+    (vendor_dir / "bin" / "rez").write_bytes(b"0" * 20)
+    running_dir = tmp_path / "running"
+    running_dir.mkdir()
+    (running_dir / "knots_hub").write_bytes(b"0" * 3)
+    locked_dir = tmp_path / "locked"
+    (locked_dir / "lib").mkdir(parents=True)
+    (locked_dir / "lib" / "python.dll").write_bytes(b"0" * 5)
+
+    remove_dir = filesystem._remove_dir
+
+    def _patch_remove_dir(path: str):
+        # like a directory opened by another process on Windows
+        if Path(path) == locked_dir / "lib":
+            raise PermissionError(f"in use: {path}")
+        remove_dir(path)
+
+    monkeypatch.setattr(filesystem, "_remove_dir", _patch_remove_dir)
+
+    plan = plan_uninstall(
+        [root_dir, vendor_dir, vendor_dir / "bin", running_dir, locked_dir],
+        last_paths=[root_dir],
+        running_paths=[running_dir / "knots_hub"],
+    )
+    assert measure_plan(plan) == {
+        vendor_dir: (1, 20),
+        root_dir: (2, 102),
+        running_dir: (1, 3),
+        locked_dir: (1, 5),
+    }
+
+    with pytest.raises(SystemExit):
+        uninstall(plan)
+    assert not root_dir.exists()
+    assert not vendor_dir.exists()
+    # left to the hand-off script
+    assert running_dir.exists()
+    assert (locked_dir / "lib").exists()
+    assert len(executed) == 1
+    if not OS.is_windows():
+        script = Path(executed[0]).read_text(encoding="utf-8")
+        assert str(running_dir) in script
+        assert str(locked_dir) in script
+        assert str(vendor_dir) not in script